@@ -1,14 +1,89 @@
-import os, base64, tempfile, logging
+import os, base64, tempfile, logging, threading
 log = logging.getLogger("kaivoxx.config")
 
 DISCORD_TOKEN = os.environ.get("DISCORD_TOKEN") or ""
 GROQ_API_KEY = os.environ.get("GROQ_API_KEY")
 GROQ_API_URL = "https://api.groq.com/openai/v1/chat/completions"
+GROQ_TIMEOUT = float(os.environ.get("GROQ_TIMEOUT", "20"))
+GROQ_MAX_RETRIES = int(os.environ.get("GROQ_MAX_RETRIES", "3"))
+GROQ_MAX_CONCURRENCY = int(os.environ.get("GROQ_MAX_CONCURRENCY", "8"))
+GROQ_GUILD_CONCURRENCY = int(os.environ.get("GROQ_GUILD_CONCURRENCY", "2"))
+# Historial de IA por canal: presupuesto de tokens y tope del resumen de turnos viejos
+HISTORY_TOKEN_BUDGET = int(os.environ.get("HISTORY_TOKEN_BUDGET", "1200"))
+HISTORY_SUMMARY_TOKENS = int(os.environ.get("HISTORY_SUMMARY_TOKENS", "200"))
+# Respuestas de IA en streaming (se publica con los primeros tokens y se edita)
+IA_STREAMING = os.environ.get("IA_STREAMING", "1") == "1"
+STREAM_EDIT_INTERVAL = float(os.environ.get("STREAM_EDIT_INTERVAL", "1.2"))
 
 BOT_PREFIX = "#"
 MAX_QUEUE_LENGTH = int(os.environ.get("MAX_QUEUE_LENGTH", "500"))
 MAX_TTS_CHARS = int(os.environ.get("MAX_TTS_CHARS", "180"))
 TTS_LANGUAGE = os.environ.get("TTS_LANGUAGE", "es")
+TTS_CACHE_BYTES = int(os.environ.get("TTS_CACHE_BYTES", str(8 * 1024 * 1024)))
+# Voz por encima de la música: la canción sale en PCM y se mezcla en proceso,
+# bajando su volumen a TTS_DUCK_VOLUME mientras se habla
+TTS_MIXING = os.environ.get("TTS_MIXING", "1") == "1"
+TTS_DUCK_VOLUME = float(os.environ.get("TTS_DUCK_VOLUME", "0.35"))
+
+# Barra de "Now Playing": refresco mínimo por mensaje, ediciones/s globales y
+# cuántos mensajes por debajo se considera que ya no se ve
+NP_MIN_INTERVAL = float(os.environ.get("NP_MIN_INTERVAL", "5"))
+NP_EDITS_PER_SECOND = float(os.environ.get("NP_EDITS_PER_SECOND", "2"))
+NP_OFFSCREEN_MESSAGES = int(os.environ.get("NP_OFFSCREEN_MESSAGES", "10"))
+
+# Cache de resoluciones de yt-dlp (por id de vídeo, caduca con el expire= de la URL)
+STREAM_CACHE_SIZE = int(os.environ.get("STREAM_CACHE_SIZE", "256"))
+STREAM_CACHE_MARGIN = int(os.environ.get("STREAM_CACHE_MARGIN", "120"))
+
+# Snapshots de colas/historial en SQLite (vacío = desactivado). Las escrituras
+# se agrupan y se vuelcan como mucho cada SNAPSHOT_INTERVAL segundos
+SNAPSHOT_DB = os.environ.get("SNAPSHOT_DB", "")
+SNAPSHOT_INTERVAL = float(os.environ.get("SNAPSHOT_INTERVAL", "10"))
+
+# Cache en disco (Opus/Ogg) de las canciones con al menos AUDIO_CACHE_MIN_PLAYS
+# escuchas; vacío = desactivada
+AUDIO_CACHE_DIR = os.environ.get("AUDIO_CACHE_DIR", "")
+AUDIO_CACHE_BYTES = int(os.environ.get("AUDIO_CACHE_BYTES", str(2 * 1024 ** 3)))
+AUDIO_CACHE_MIN_PLAYS = int(os.environ.get("AUDIO_CACHE_MIN_PLAYS", "3"))
+
+# Cache de búsquedas (texto normalizado -> vídeo). En disco solo si hay SNAPSHOT_DB
+SEARCH_CACHE_SIZE = int(os.environ.get("SEARCH_CACHE_SIZE", "2048"))
+SEARCH_CACHE_DISK_SIZE = int(os.environ.get("SEARCH_CACHE_DISK_SIZE", "20000"))
+
+# Servidor HTTP de /metrics, /healthz y /readyz (0 = desactivado). En Railway
+# basta con su PORT
+METRICS_PORT = int(os.environ.get("METRICS_PORT") or os.environ.get("PORT") or "0")
+
+# Sharding. SHARD_COUNT vacío = un solo shard (commands.Bot); "auto" = los que
+# recomiende Discord; un número = ese total. SHARD_IDS = los shards de este
+# proceso. Con CLUSTERS > 1, main.py lanza ese número de procesos y reparte los
+# shards entre ellos (cada uno con METRICS_PORT + su índice)
+SHARD_COUNT = os.environ.get("SHARD_COUNT", "").strip().lower()
+SHARD_IDS = [int(x) for x in os.environ.get("SHARD_IDS", "").split(",") if x.strip()]
+CLUSTERS = int(os.environ.get("CLUSTERS", "1"))
+CLUSTER_ID = int(os.environ["CLUSTER_ID"]) if os.environ.get("CLUSTER_ID") else None
+CLUSTER_READY_TIMEOUT = float(os.environ.get("CLUSTER_READY_TIMEOUT", "180"))
+
+# Vigilancia del event loop: cada cuánto se mide el retraso y a partir de cuánto
+# bloqueo se registra la pila de lo que lo está bloqueando
+LOOP_MONITOR = os.environ.get("LOOP_MONITOR", "1") == "1"
+LOOP_LAG_INTERVAL = float(os.environ.get("LOOP_LAG_INTERVAL", "0.25"))
+LOOP_LAG_THRESHOLD = float(os.environ.get("LOOP_LAG_THRESHOLD", "0.25"))
+# Perfilado por muestreo: segundos a perfilar al arrancar (0 = no) y dónde dejar los ficheros
+PROFILE_ON_START = float(os.environ.get("PROFILE_ON_START", "0"))
+PROFILE_DIR = os.environ.get("PROFILE_DIR") or os.path.join(tempfile.gettempdir(), "kaivoxx-profiles")
+# Tiempos de arranque por fase: al estar listo se registran y, si hay ruta, se
+# escriben en ese JSON (para que CI los compare)
+STARTUP_REPORT = os.environ.get("STARTUP_REPORT") or ""
+
+# Hilos por tipo de trabajo bloqueante (extracción, TTS)
+YTDL_WORKERS = int(os.environ.get("YTDL_WORKERS", "4"))
+# yt-dlp en procesos aparte (0 = en hilos); cada worker se recicla tras N trabajos
+YTDL_PROCESSES = int(os.environ.get("YTDL_PROCESSES", "0"))
+YTDL_WORKER_MAX_JOBS = int(os.environ.get("YTDL_WORKER_MAX_JOBS", "200"))
+TTS_WORKERS = int(os.environ.get("TTS_WORKERS", "2"))
+# Hilos que ponen al día el FFmpeg PCM al pasar una pista Opus al mezclador
+MIXER_WORKERS = int(os.environ.get("MIXER_WORKERS", "2"))
 
 SYSTEM_PROMPT = (
     "Eres Kaivoxx, una asistente virtual estilo Diva Virtual. "
@@ -42,4 +117,17 @@ def load_cookies_from_env() -> str:
         log.error(f"Error cargando cookies: {e}")
         return None
 
-COOKIE_FILE = load_cookies_from_env()
+_cookie_lock = threading.Lock()
+_cookie_file = ...
+
+def cookie_file() -> str:
+    """
+    Ruta del fichero de cookies para yt-dlp, o None. Se decodifica y escribe la
+    primera vez que se pide (al crear el primer YoutubeDL), no al importar la
+    configuración: el arranque hasta conectar con Discord no lo necesita.
+    """
+    global _cookie_file
+    with _cookie_lock:
+        if _cookie_file is ...:
+            _cookie_file = load_cookies_from_env()
+        return _cookie_file
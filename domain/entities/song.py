@@ -1,10 +1,30 @@
 from dataclasses import dataclass
-from typing import Any
+from typing import Optional
 
-@dataclass
+@dataclass(slots=True)
 class Song:
     url: str
     title: str
     requester_name: str
-    channel: Any
+    # solo el id: el canal se resuelve con bot.get_channel al necesitarlo
+    channel_id: Optional[int]
     source: str = "YouTube"
+    # se rellenan con lo que traiga yt-dlp (al encolar o al resolver el stream)
+    duration: Optional[int] = None
+    thumbnail: Optional[str] = None
+    video_id: Optional[str] = None
+
+    @classmethod
+    def from_info(cls, info: dict, requester_name: str, channel_id: Optional[int]) -> "Song":
+        song = cls(info.get('webpage_url') or info.get('url'), info.get('title', 'Unknown title'), requester_name, channel_id)
+        song.fill_from(info)
+        return song
+
+    def fill_from(self, info: dict):
+        """Completa los campos opcionales que falten a partir de un info de yt-dlp."""
+        if self.duration is None and info.get('duration'):
+            self.duration = int(info['duration'])
+        if self.thumbnail is None:
+            self.thumbnail = info.get('thumbnail')
+        if self.video_id is None and (info.get('ie_key') or info.get('extractor') or '').lower().startswith('youtube'):
+            self.video_id = info.get('id')
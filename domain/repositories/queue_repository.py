@@ -1,26 +1,198 @@
-from collections import deque
-from typing import Deque, Optional, List
+import random
+from itertools import count, islice
+from typing import Dict, Iterable, Iterator, Optional, List, Tuple
 from domain.entities.song import Song
 
+PAGE_SIZE = 50
+BLOCK_SIZE = 64  # ids por bloque; un bloque que pasa del doble se parte en dos
+
 class MusicQueue:
+    """
+    Cola de reproducción indexada.
+
+    Cada canción recibe un id de entrada estable (id -> Song en un dict). El
+    orden vive en una lista de bloques de ids (blocked list): llegar a una
+    posición recorre los bloques, no las canciones, así que borrar o mover por
+    posición cuesta O(n/B + B) en vez de O(n); sacar la cabeza, mirarla y
+    borrar por id solo tocan un bloque. Las páginas empiezan en su bloque sin
+    copiar la cola. Un índice de URLs permite detectar duplicados sin escanear.
+    `version` cambia con cada modificación, para saber si hay algo nuevo que
+    guardar sin comparar colas.
+    """
+
     def __init__(self, limit: int = 500):
-        self._queue: Deque[Song] = deque()
+        self._songs: Dict[int, Song] = {}
+        self._blocks: List[List[int]] = []
+        self._block_of: Dict[int, List[int]] = {}  # id -> su bloque
+        self._urls: Dict[str, int] = {}
+        self._ids = count(1)
         self.limit = limit
+        self.version = 0
+
+    def _index(self, item: Song):
+        self._urls[item.url] = self._urls.get(item.url, 0) + 1
+
+    def _unindex(self, item: Song):
+        left = self._urls.get(item.url, 0) - 1
+        if left > 0:
+            self._urls[item.url] = left
+        else:
+            self._urls.pop(item.url, None)
+
+    # ------------------------------------------------------------ bloques
+
+    def _append(self, entry_id: int):
+        if not self._blocks or len(self._blocks[-1]) >= BLOCK_SIZE:
+            self._blocks.append([])
+        block = self._blocks[-1]
+        block.append(entry_id)
+        self._block_of[entry_id] = block
+
+    def _locate(self, index: int) -> Tuple[int, int]:
+        """(bloque, posición dentro del bloque) de `index`, que debe ser válido."""
+        for b, block in enumerate(self._blocks):
+            if index < len(block):
+                return b, index
+            index -= len(block)
+        raise IndexError(index)
+
+    def _insert(self, index: int, entry_id: int):
+        if index >= len(self._block_of):
+            self._append(entry_id)
+            return
+        b, offset = self._locate(index)
+        block = self._blocks[b]
+        block.insert(offset, entry_id)
+        self._block_of[entry_id] = block
+        if len(block) > 2 * BLOCK_SIZE:
+            tail = block[BLOCK_SIZE:]
+            del block[BLOCK_SIZE:]
+            for moved in tail:
+                self._block_of[moved] = tail
+            self._blocks.insert(b + 1, tail)
+
+    def _detach(self, entry_id: int):
+        block = self._block_of.pop(entry_id)
+        block.remove(entry_id)
+        if not block:
+            for b, other in enumerate(self._blocks):
+                if other is block:
+                    del self._blocks[b]
+                    break
+
+    def _key_at(self, index: int) -> Optional[int]:
+        size = len(self._songs)
+        if index < 0:
+            index += size
+        if not 0 <= index < size:
+            return None
+        b, offset = self._locate(index)
+        return self._blocks[b][offset]
+
+    def _ids_from(self, index: int) -> Iterator[int]:
+        if index >= len(self._songs):
+            return
+        b, offset = self._locate(index)
+        yield from islice(self._blocks[b], offset, None)
+        for block in islice(self._blocks, b + 1, None):
+            yield from block
+
+    def _ids_in_order(self) -> Iterator[int]:
+        for block in self._blocks:
+            yield from block
+
+    # ------------------------------------------------------------ cola
 
     def enqueue(self, item: Song) -> bool:
-        if len(self._queue) >= self.limit:
+        if len(self._songs) >= self.limit:
             return False
-        self._queue.append(item)
+        entry_id = next(self._ids)
+        self._songs[entry_id] = item
+        self._append(entry_id)
+        self._index(item)
+        self.version += 1
         return True
 
+    def enqueue_many(self, items: Iterable[Song]) -> int:
+        """Añade en bloque lo que quepa; la capacidad se comprueba una sola vez."""
+        free = self.limit - len(self._songs)
+        added = 0
+        for item in islice(items, max(free, 0)):
+            entry_id = next(self._ids)
+            self._songs[entry_id] = item
+            self._append(entry_id)
+            self._index(item)
+            added += 1
+        if added:
+            self.version += 1
+        return added
+
     def dequeue(self) -> Optional[Song]:
-        return self._queue.popleft() if self._queue else None
+        if not self._songs:
+            return None
+        return self.remove(self._blocks[0][0])
+
+    def peek(self) -> Optional[Song]:
+        return self._songs[self._blocks[0][0]] if self._songs else None
+
+    def remove(self, entry_id: int) -> Optional[Song]:
+        item = self._songs.pop(entry_id, None)
+        if item is not None:
+            self._detach(entry_id)
+            self._unindex(item)
+            self.version += 1
+        return item
+
+    def remove_at(self, index: int) -> Optional[Song]:
+        key = self._key_at(index)
+        return self.remove(key) if key is not None else None
+
+    def move(self, index: int, new_index: int) -> bool:
+        """Mueve la canción de `index` a `new_index` (posiciones 0-based)."""
+        key = self._key_at(index)
+        if key is None:
+            return False
+        size = len(self._songs)
+        new_index = max(0, min(new_index if new_index >= 0 else new_index + size, size - 1))
+        self._detach(key)
+        self._insert(new_index, key)
+        self.version += 1
+        return True
+
+    def shuffle(self):
+        ids = list(self._ids_in_order())
+        random.shuffle(ids)
+        self._blocks, self._block_of = [], {}
+        for entry_id in ids:
+            self._append(entry_id)
+        self.version += 1
+
+    def contains_url(self, url: str) -> bool:
+        return url in self._urls
 
     def clear(self):
-        self._queue.clear()
+        self._songs.clear()
+        self._blocks.clear()
+        self._block_of.clear()
+        self._urls.clear()
+        self.version += 1
+
+    def items(self) -> Iterator[Tuple[int, Song]]:
+        """Pares (id de entrada, canción) en orden, sin copiar."""
+        return ((entry_id, self._songs[entry_id]) for entry_id in self._ids_in_order())
+
+    def page(self, page: int, per_page: int = PAGE_SIZE) -> Iterator[Song]:
+        ids = islice(self._ids_from(page * per_page), per_page)
+        return (self._songs[entry_id] for entry_id in ids)
+
+    def page_count(self, per_page: int = PAGE_SIZE) -> int:
+        return max(1, (len(self._songs) + per_page - 1) // per_page)
 
     def list_titles(self) -> List[str]:
-        return [s.title for s in self._queue]
+        return [s.title for s in self]
+
+    def __iter__(self) -> Iterator[Song]:
+        return (self._songs[entry_id] for entry_id in self._ids_in_order())
 
     def __len__(self):
-        return len(self._queue)
+        return len(self._songs)
@@ -0,0 +1 @@
+# package init
\ No newline at end of file
@@ -0,0 +1,223 @@
+"""
+Cache en disco de las canciones más escuchadas, ya en Opus/Ogg.
+
+Cada reproducción suma una escucha al vídeo. Al llegar a AUDIO_CACHE_MIN_PLAYS
+se descarga y codifica una sola vez en segundo plano (un FFmpeg a la vez, sin
+bloquear el comando), y las reproducciones siguientes salen del fichero con
+`-c:a copy`: sin yt-dlp, sin red y sin transcodificar. El directorio se limita a
+AUDIO_CACHE_BYTES expulsando lo usado hace más tiempo; cada acierto actualiza el
+mtime del fichero, así el orden LRU sobrevive a los reinicios.
+
+Nada de disco en el event loop: el índice se lee en un hilo al arrancar (o al
+primer uso; mientras tanto todo cuenta como fallo) y el mtime, el renombrado
+y los borrados van a su propio hilo (`audio_cache_executor`), sin competir con
+yt-dlp ni con el TTS por el executor por defecto.
+"""
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from typing import Optional
+import discord
+from config.settings import AUDIO_CACHE_DIR, AUDIO_CACHE_BYTES, AUDIO_CACHE_MIN_PLAYS
+from infrastructure.executors import audio_cache_executor
+from infrastructure.metrics import ffmpeg_seconds
+
+log = logging.getLogger('kaivoxx.audio_cache')
+
+MAX_TRACK_SECONDS = 20 * 60  # sesiones largas y directos no se guardan
+MAX_TRACKED_PLAYS = 10000    # vídeos distintos con contador de escuchas en memoria
+
+
+class AudioDiskCache:
+    def __init__(self, directory: str, max_bytes: int, min_plays: int = 3, executable: str = 'ffmpeg'):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.min_plays = min_plays
+        self.executable = executable
+        self._files: Optional["OrderedDict[str, int]"] = None  # video_id -> bytes, del más antiguo al más reciente
+        self._loading: Optional[asyncio.Future] = None
+        self._plays: "OrderedDict[str, int]" = OrderedDict()
+        self._filling = {}
+        self._fill_lock = asyncio.Lock()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+        self.fills = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.directory) and self.max_bytes > 0
+
+    def _path(self, video_id: str) -> str:
+        return os.path.join(self.directory, f"{video_id}.ogg")
+
+    async def load(self):
+        """Lee el índice del directorio en un hilo, una sola vez."""
+        if not self.enabled or self._files is not None:
+            return
+        if self._loading is None:
+            self._loading = asyncio.ensure_future(self._load())
+        await asyncio.shield(self._loading)
+
+    async def _load(self):
+        try:
+            files = await audio_cache_executor.run(_scan, self.directory)
+        except OSError as e:
+            log.warning(f"No se pudo leer la cache de audio en {self.directory}: {e}")
+            files = OrderedDict()
+        self._files = files
+        self.size = sum(files.values())
+
+    def _index(self) -> Optional["OrderedDict[str, int]"]:
+        """El índice si ya está leído; si no, lo pide en segundo plano y devuelve None."""
+        if self._files is None and self._loading is None:
+            self._loading = asyncio.ensure_future(self._load())
+        return self._files
+
+    def contains(self, video_id: Optional[str]) -> bool:
+        return self.enabled and bool(video_id) and video_id in (self._index() or ())
+
+    def get(self, video_id: Optional[str]) -> Optional[str]:
+        """Ruta del fichero cacheado, o None."""
+        if not self.enabled or not video_id:
+            return None
+        files = self._index()
+        if files is None or video_id not in files:
+            self.misses += 1
+            return None
+        files.move_to_end(video_id)
+        self.hits += 1
+        _in_background(self._touch, asyncio.get_running_loop(), video_id)
+        return self._path(video_id)
+
+    def _touch(self, loop: asyncio.AbstractEventLoop, video_id: str):
+        """En un hilo: mtime al día para el orden LRU; si el fichero ya no está, fuera del índice."""
+        try:
+            os.utime(self._path(video_id))
+        except FileNotFoundError:
+            loop.call_soon_threadsafe(self._forget, video_id)
+
+    def _forget(self, video_id: str):
+        size = (self._files or {}).pop(video_id, None)
+        if size is not None:
+            self.size -= size
+
+    def record_play(self, video_id: Optional[str], resolved: Optional[dict], duration: Optional[int]):
+        """Cuenta una escucha; si el vídeo ya es popular y no está en disco, lo guarda en segundo plano."""
+        if not self.enabled or not video_id:
+            return
+        plays = self._plays.pop(video_id, 0) + 1
+        self._plays[video_id] = plays
+        if len(self._plays) > MAX_TRACKED_PLAYS:
+            self._plays.popitem(last=False)
+        if (
+            resolved is None
+            or plays < self.min_plays
+            or not duration or duration > MAX_TRACK_SECONDS
+            or video_id in self._filling
+            or video_id in (self._index() or ())
+        ):
+            return
+        task = asyncio.create_task(self._fill(video_id, resolved))
+        self._filling[video_id] = task
+        task.add_done_callback(lambda t: self._filling.pop(video_id, None))
+
+    async def _fill(self, video_id: str, resolved: dict):
+        await self.load()
+        async with self._fill_lock:
+            if video_id in self._files:
+                return
+            path = self._path(video_id)
+            tmp = path + '.part'
+            args = ['-nostdin', '-loglevel', 'error', '-y']
+            headers = ''.join(f"{k}: {v}\r\n" for k, v in (resolved.get('http_headers') or {}).items())
+            if headers:
+                args += ['-headers', headers]
+            # 48 kHz estéreo: lo que Discord espera, para poder servirlo con -c:a copy
+            args += ['-i', resolved['url'], '-vn', '-c:a', 'libopus', '-ar', '48000', '-ac', '2',
+                     '-b:a', '128k', '-f', 'ogg', tmp]
+            proc = await asyncio.create_subprocess_exec(
+                self.executable, *args, stdout=asyncio.subprocess.DEVNULL, stderr=asyncio.subprocess.PIPE,
+            )
+            try:
+                _, err = await proc.communicate()
+            except asyncio.CancelledError:
+                proc.kill()
+                await proc.wait()
+                # aunque vuelvan a cancelar, el borrado ya queda encargado al hilo de la cache
+                await asyncio.shield(audio_cache_executor.run(_remove, tmp))
+                raise
+            if proc.returncode != 0:
+                log.info(f"No se pudo cachear {video_id}: {err.decode(errors='replace').strip()[-300:]}")
+                await audio_cache_executor.run(_remove, tmp)
+                return
+            size = await audio_cache_executor.run(_commit, tmp, path)
+            self._files[video_id] = size
+            self.size += size
+            self.fills += 1
+            victims = self._evict()
+            if victims:
+                await audio_cache_executor.run(_remove_all, victims)
+
+    def _evict(self) -> list:
+        """Saca del índice lo usado hace más tiempo hasta caber; devuelve las rutas a borrar."""
+        files, victims = self._files, []
+        while self.size > self.max_bytes and len(files) > 1:
+            video_id, size = files.popitem(last=False)
+            self.size -= size
+            victims.append(self._path(video_id))
+        return victims
+
+    def stats(self) -> dict:
+        return {"files": len(self._files or ()), "bytes": self.size, "hits": self.hits,
+                "misses": self.misses, "fills": self.fills}
+
+
+def _in_background(fn, *args):
+    """Manda `fn` al hilo de la cache sin esperarla; sus errores solo se registran."""
+    job = asyncio.ensure_future(audio_cache_executor.run(fn, *args))
+    job.add_done_callback(lambda f: f.cancelled() or f.exception() and log.warning(f"Cache de audio: {f.exception()}"))
+
+
+def _scan(directory: str) -> "OrderedDict[str, int]":
+    """Índice del directorio por mtime; los restos `.part` de un llenado a medias se borran."""
+    os.makedirs(directory, exist_ok=True)
+    found = []
+    for entry in os.scandir(directory):
+        if entry.name.endswith('.part'):
+            _remove(entry.path)
+        elif entry.name.endswith('.ogg'):
+            st = entry.stat()
+            found.append((st.st_mtime, entry.name[:-4], st.st_size))
+    found.sort()
+    return OrderedDict((video_id, size) for _, video_id, size in found)
+
+
+def _commit(tmp: str, path: str) -> int:
+    os.replace(tmp, path)
+    return os.path.getsize(path)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _remove_all(paths: list):
+    for path in paths:
+        _remove(path)
+
+
+def make_cached_source(path: str, start: float = 0.0, pcm: bool = False):
+    """FFmpeg sobre un fichero de la cache: Opus tal cual (copy) o PCM si hay que mezclar voz."""
+    before_options = f"-ss {start:.2f}" if start > 0 else None
+    with ffmpeg_seconds.time():
+        if pcm:
+            return discord.FFmpegPCMAudio(path, before_options=before_options)
+        return discord.FFmpegOpusAudio(path, codec='copy', before_options=before_options)
+
+
+audio_cache = AudioDiskCache(AUDIO_CACHE_DIR, AUDIO_CACHE_BYTES, AUDIO_CACHE_MIN_PLAYS)
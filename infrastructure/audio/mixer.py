@@ -0,0 +1,186 @@
+import asyncio
+import threading
+from typing import Callable, Optional
+import discord
+from infrastructure.audio.tracked_source import FRAME_SECONDS, TrackedSource
+from infrastructure.executors import mixer_executor
+
+FRAME_SIZE = discord.opus.Encoder.FRAME_SIZE  # 20 ms de PCM s16le estéreo a 48 kHz
+SILENCE = bytes(FRAME_SIZE)
+# Lo que se espera a que el hilo del reproductor aplique el cambio de fuente
+# (en pausa no lee frames); pasado esto se retira y se habla sin mezclar
+SWAP_TIMEOUT = 5.0
+
+# numpy se importa con la primera voz que se mezcla: sin TTS no hace falta y
+# son decenas de ms de arranque
+np = None
+
+
+def _load_numpy():
+    global np
+    if np is None:
+        import numpy
+        np = numpy
+
+
+class MixerSource(discord.AudioSource):
+    """
+    Fuente PCM que deja hablar por encima de la música sin pararla.
+
+    La música sigue sonando desde su FFmpeg; una voz (otra fuente PCM) se suma
+    frame a frame con numpy mientras el volumen de la música baja (ducking) con
+    una rampa corta para que no haya saltos. Sin voz activa, `read()` devuelve
+    el frame de la música tal cual.
+    """
+
+    def __init__(self, music: discord.AudioSource, duck: float = 0.35, voice_gain: float = 1.0,
+                 ramp_frames: int = 10):
+        self.music = music
+        self.duck = duck
+        self.voice_gain = voice_gain
+        self.gain = 1.0
+        self._step = (1.0 - duck) / max(1, ramp_frames)
+        self._voice: Optional[discord.AudioSource] = None
+        self._voice_done: Optional[Callable[[Optional[Exception]], None]] = None
+        self._lock = threading.Lock()
+        if music.is_opus():
+            raise ValueError("MixerSource necesita una fuente PCM")
+
+    @property
+    def speaking(self) -> bool:
+        return self._voice is not None
+
+    def play_overlay(self, voice: discord.AudioSource, after: Callable[[Optional[Exception]], None] = None):
+        """Empieza a mezclar `voice`; si ya había una, la corta. `after` se llama desde el hilo del audio."""
+        _load_numpy()
+        with self._lock:
+            previous, previous_done = self._voice, self._voice_done
+            self._voice, self._voice_done = voice, after
+        if previous is not None:
+            self._finish(previous, previous_done)
+
+    def _finish(self, voice, after, error: Exception = None):
+        try:
+            voice.cleanup()
+        finally:
+            if after:
+                after(error)
+
+    def _next_voice_frame(self) -> Optional[bytes]:
+        voice = self._voice
+        if voice is None:
+            return None
+        try:
+            data = voice.read()
+        except Exception as e:
+            data, error = b'', e
+        else:
+            error = None
+        if data:
+            return data if len(data) == FRAME_SIZE else data.ljust(FRAME_SIZE, b'\x00')
+        with self._lock:
+            if self._voice is not voice:
+                return None
+            done, self._voice, self._voice_done = self._voice_done, None, None
+        self._finish(voice, done, error)
+        return None
+
+    def read(self) -> bytes:
+        music = self.music.read()
+        voice = self._next_voice_frame()
+        target = self.duck if voice is not None else 1.0
+        if voice is None and self.gain >= 1.0:
+            return music  # camino rápido: sin voz ni rampa pendiente
+        if self.gain < target:
+            self.gain = min(target, self.gain + self._step)
+        elif self.gain > target:
+            self.gain = max(target, self.gain - self._step)
+        if not music:
+            # la canción acabó a mitad de frase: que termine la voz antes de cerrar
+            if voice is None:
+                return b''
+            music = SILENCE
+        mixed = np.frombuffer(music, dtype=np.int16).astype(np.float32)
+        mixed *= self.gain
+        if voice is not None:
+            mixed += np.frombuffer(voice, dtype=np.int16) * np.float32(self.voice_gain)
+        np.clip(mixed, -32768, 32767, out=mixed)
+        return mixed.astype(np.int16).tobytes()
+
+    def is_opus(self) -> bool:
+        return False
+
+    def cleanup(self) -> None:
+        with self._lock:
+            voice, done, self._voice, self._voice_done = self._voice, self._voice_done, None, None
+        if voice is not None:
+            self._finish(voice, done)
+        self.music.cleanup()
+
+
+def find_mixer(source) -> Optional[MixerSource]:
+    """Busca un MixerSource dentro de las fuentes envoltorio (TrackedSource, etc.)."""
+    while source is not None:
+        if isinstance(source, MixerSource):
+            return source
+        source = getattr(source, 'original', None)
+    return None
+
+
+def _catch_up(tracked: TrackedSource, music: discord.AudioSource, start: float) -> Optional[float]:
+    """
+    Lee (bloqueante) la nueva fuente hasta alcanzar a la que suena. Devuelve su
+    posición, o None si la pista acabó o se paró/saltó entretanto.
+    """
+    position = start
+    while position < tracked.position:
+        if tracked.ended or tracked.closed or not music.read():
+            return None
+        position += FRAME_SECONDS
+    return position
+
+
+async def _upgrade(tracked: TrackedSource) -> Optional[MixerSource]:
+    start = tracked.position
+    mixer = tracked.make_pcm(start)
+    # FFmpeg tarda en conectar y buscar: se espera fuera del hilo del audio, en
+    # su propio pool para no quitarle hilos a la síntesis de TTS
+    try:
+        at = await mixer_executor.run(_catch_up, tracked, mixer.music, start)
+    except Exception:
+        mixer.cleanup()
+        raise
+    if at is None or tracked.closed:
+        mixer.cleanup()
+        return None
+    loop = asyncio.get_running_loop()
+    swapped = loop.create_future()
+    tracked.swap(mixer, at, lambda ok: loop.call_soon_threadsafe(lambda: swapped.done() or swapped.set_result(ok)))
+    try:
+        ok = await asyncio.wait_for(asyncio.shield(swapped), SWAP_TIMEOUT)
+    except asyncio.TimeoutError:
+        if tracked.cancel_swap(mixer):
+            return None
+        ok = await swapped  # se aplicó (o se cerró) justo ahora: `done` ya está en camino
+    return mixer if ok else None
+
+
+async def ensure_mixer(source) -> Optional[MixerSource]:
+    """
+    MixerSource de la pista en curso. Si la pista suena en Opus copiado (sin
+    mezclador), monta uno al vuelo: un FFmpeg PCM desde la posición actual que,
+    una vez sincronizado, sustituye a la fuente sin cortar la canción.
+    """
+    mixer = find_mixer(source)
+    if mixer is not None or getattr(source, 'make_pcm', None) is None:
+        return mixer
+    if source.mixer_task is None:
+        source.mixer_task = asyncio.ensure_future(_upgrade(source))
+    task = source.mixer_task
+    try:
+        mixer = await asyncio.shield(task)
+    except Exception:
+        mixer = None
+    if mixer is None and source.mixer_task is task:
+        source.mixer_task = None  # que el siguiente TTS lo pueda reintentar
+    return mixer
@@ -0,0 +1,91 @@
+import threading
+import discord
+
+FRAME_SECONDS = 0.02  # discord.py lee un frame de 20 ms en cada read()
+
+
+class TrackedSource(discord.AudioSource):
+    """
+    Envuelve una fuente y cuenta los frames que el reproductor ha consumido.
+
+    Como el AudioPlayer no llama a read() mientras está en pausa, `position` es
+    la posición real de reproducción (pausas incluidas), no el tiempo de reloj.
+    `ended` distingue una fuente que se agotó de una parada desde fuera (stop());
+    `closed` indica que el reproductor ya la soltó (cleanup).
+    """
+
+    def __init__(self, original: discord.AudioSource, start_offset: float = 0.0):
+        self.original = original
+        self.start_offset = start_offset
+        self.frames = 0
+        self.ended = False
+        self.closed = False
+        # si suena en Opus copiado: posición -> MixerSource equivalente (ver ensure_mixer)
+        self.make_pcm = None
+        self.mixer_task = None
+        self._pending = None
+        self._lock = threading.Lock()
+
+    @property
+    def position(self) -> float:
+        return self.start_offset + self.frames * FRAME_SECONDS
+
+    def swap(self, original: discord.AudioSource, at: float, done=None):
+        """
+        Cambia la fuente interna en el hilo del reproductor, entre dos frames.
+        `original` empieza en la posición `at`: antes de usarla se descartan los
+        frames que ya sonaron desde entonces. `done(bool)` avisa del resultado;
+        si la fuente ya se cerró, se descarta `original` y `done(False)` al momento.
+        """
+        with self._lock:
+            if not self.closed:
+                self._pending = (original, at, done)
+                return
+        original.cleanup()
+        if done:
+            done(False)
+
+    def cancel_swap(self, original: discord.AudioSource) -> bool:
+        """Retira un swap que aún no se aplicó (y limpia `original`). False si ya no estaba pendiente."""
+        with self._lock:
+            if self._pending is None or self._pending[0] is not original:
+                return False
+            self._pending = None
+        original.cleanup()
+        return True
+
+    def _apply_swap(self):
+        with self._lock:
+            pending, self._pending = self._pending, None
+        if pending is None:
+            return
+        original, at, done = pending
+        for _ in range(round((self.position - at) / FRAME_SECONDS)):
+            original.read()
+        previous, self.original = self.original, original
+        previous.cleanup()
+        if done:
+            done(True)
+
+    def read(self) -> bytes:
+        if self._pending is not None:
+            self._apply_swap()
+        data = self.original.read()
+        if data:
+            self.frames += 1
+        else:
+            self.ended = True
+        return data
+
+    def is_opus(self) -> bool:
+        return self.original.is_opus()
+
+    def cleanup(self) -> None:
+        with self._lock:
+            self.closed = True
+            pending, self._pending = self._pending, None
+        if pending:
+            pending[0].cleanup()
+            if pending[2]:
+                pending[2](False)
+        self.original.cleanup()
@@ -1,7 +1,15 @@
+import asyncio
 import logging
 import discord
 from discord.ext import commands
-from config.settings import BOT_PREFIX
+from config.settings import (
+    BOT_PREFIX, SHARD_COUNT, SHARD_IDS, LOOP_MONITOR, LOOP_LAG_INTERVAL, LOOP_LAG_THRESHOLD, PROFILE_ON_START, PROFILE_DIR,
+    STARTUP_REPORT,
+)
+from infrastructure.loop_monitor import LoopMonitor
+from infrastructure.startup import startup_timer
+from infrastructure.discord.message_router import MessageRouter
+from infrastructure.discord.views.progress_scheduler import now_playing_scheduler
 
 log = logging.getLogger('kaivoxx.bot')
 
@@ -10,80 +18,74 @@ intents.message_content = True
 intents.members = True
 intents.voice_states = True
 
-bot = commands.Bot(command_prefix=BOT_PREFIX, intents=intents, help_command=None)
+def make_bot(shard_count: str = SHARD_COUNT, shard_ids=SHARD_IDS) -> commands.Bot:
+    """
+    commands.Bot de un solo shard, o AutoShardedBot si hay SHARD_COUNT. Con
+    SHARD_IDS el proceso lleva solo esos shards (modo cluster): colas,
+    historiales y caches siguen siendo locales al proceso y a sus guilds.
+    """
+    kwargs = dict(command_prefix=BOT_PREFIX, intents=intents, help_command=None)
+    if not shard_count:
+        return commands.Bot(**kwargs)
+    if shard_count != "auto":
+        kwargs['shard_count'] = int(shard_count)
+    elif shard_ids:
+        raise ValueError("SHARD_IDS necesita un SHARD_COUNT numérico")
+    if shard_ids:
+        kwargs['shard_ids'] = list(shard_ids)
+    return commands.AutoShardedBot(**kwargs)
+
+bot = make_bot()
+loop_monitor = LoopMonitor(LOOP_LAG_INTERVAL, LOOP_LAG_THRESHOLD)
+# las rutas (ia, habla) las registra ia_commands al importarse en create_bot
+message_router = MessageRouter(BOT_PREFIX)
+
+async def _setup_hook():
+    # discord.py lo llama tras el login por HTTP y antes de abrir el gateway
+    startup_timer.mark("login")
+    message_router.bind(bot.user.id)
+
+bot.setup_hook = _setup_hook
 
 @bot.event
 async def on_ready():
-    log.info(f"Bot conectado como {bot.user}")
+    first_ready = startup_timer.mark("ready")
+    shards = f" (shards {sorted(bot.shards)} de {bot.shard_count})" if bot.shard_count else ""
+    log.info(f"Bot conectado como {bot.user}{shards}")
     activity = discord.Activity(type=discord.ActivityType.listening, name="#help 🎵 | 💜 Tu asistente musical y de IA favorita (IA en proceso)")
     await bot.change_presence(status=discord.Status.online, activity=activity)
+    from integration.snapshots import start_snapshots
+    from integration.health_server import start_health_server
+    from infrastructure.ytdlp.ytdlp_client import warm_ytdl
+    from infrastructure.audio.disk_cache import audio_cache
+    start_snapshots(bot)
+    await start_health_server(bot)
+    if first_ready:
+        startup_timer.log_report(STARTUP_REPORT)
+    # yt-dlp (import, extractores, cookies) se carga ya conectados, no antes
+    asyncio.create_task(warm_ytdl())
+    asyncio.create_task(audio_cache.load())
+    if LOOP_MONITOR:
+        loop_monitor.start()
+    if PROFILE_ON_START and not getattr(bot, '_startup_profiled', False):
+        bot._startup_profiled = True
+        from infrastructure.profiler import profile_to_file
+        task = asyncio.create_task(profile_to_file(PROFILE_ON_START, PROFILE_DIR))
+        task.add_done_callback(lambda t: t.cancelled() or log.info(f"Perfil de arranque: {t.exception() or t.result()}"))
 
-# on_message: handle mentions and IA
 @bot.event
 async def on_message(message: discord.Message):
+    now_playing_scheduler.note_message(message.channel.id, message.id)
     if message.author.bot:
         return
-    content = (message.content or "").strip()
-    mention_prefixes = []
-    if bot.user:
-        mention_prefixes = [f"<@{bot.user.id}>", f"<@!{bot.user.id}>"]
-    is_ia = content.startswith(f"{BOT_PREFIX}ia")
-    is_habla = content.startswith(f"{BOT_PREFIX}habla")
-    is_mention_direct = bot.user and bot.user.mentioned_in(message)
-    for mp in mention_prefixes:
-        if content.startswith(mp):
-            after = content[len(mp):].strip()
-            if after.lower().startswith("ia ") or after.lower() == "ia":
-                is_ia = True
-                content = after[len("ia"):].strip()
-            elif after.lower().startswith("habla ") or after.lower() == "habla":
-                is_habla = True
-                content = after[len("habla"):].strip()
-            else:
-                is_mention_direct = True
-                content = after
-            break
-    if is_ia and content.startswith(f"{BOT_PREFIX}ia"):
-        content = content[len(f"{BOT_PREFIX}ia"):].strip()
-    if is_habla and content.startswith(f"{BOT_PREFIX}habla"):
-        content = content[len(f"{BOT_PREFIX}habla"):].strip()
-    handled = False
-    if is_ia or is_habla or is_mention_direct:
-        handled = True
-        prompt = content.strip()
-        if not prompt:
-            await message.channel.send("💜 Dime qué quieres que responda.")
-            return
-        async with message.channel.typing():
-            from infrastructure.ia.groq_client import groq_chat_response
-            response = await __import__('asyncio').to_thread(groq_chat_response, f"chan_{message.channel.id}", prompt)
-        await message.channel.send(response)
-        # habla por voz si corresponde
-        if (is_habla or False) and message.guild and len(response) <= 180:
-            author_voice = message.author.voice
-            vc = message.guild.voice_client
-            from infrastructure.tts.gtts_client import speak_text_in_voice
-            from infrastructure.discord.views.embeds import embed_success, embed_warning
-            if not author_voice or not author_voice.channel:
-                await message.channel.send("💜 Para que hable, debes estar en un canal de voz y usar `#habla` o mencionar y decir 'habla'.")
-            else:
-                user_channel = author_voice.channel
-                if not vc:
-                    try:
-                        vc = await user_channel.connect()
-                        await message.channel.send(embed=embed_success("Conectada al canal", f"Me uní a **{user_channel.name}** para hablar 🎤"))
-                    except Exception:
-                        log.exception('No pude unirme al canal de voz')
-                        await message.channel.send(embed=embed_warning("No pude unirme", "No tengo permisos para unirme al canal de voz o ocurrió un error."))
-                        return
-                if vc.channel.id != user_channel.id:
-                    await message.channel.send(embed=embed_warning("Ya estoy en otro canal", "Estoy en otro canal de voz. Pide que me unan al mismo canal o usa `#join`."))
-                else:
-                    ok = await speak_text_in_voice(vc, response) if 'speak_text_in_voice' in globals() else await __import__('infrastructure.tts.gtts_client', fromlist=['speak_text_in_voice']).speak_text_in_voice(vc, response)
-                    if not ok:
-                        await message.channel.send("⚠️ No pude reproducir la voz. Comprueba permisos y que ffmpeg esté disponible.")
-    if not handled:
+    routed = message_router.match(message.content or "", message.mentions)
+    if routed is None:
+        return  # camino rápido: ni prefijo ni mención
+    handler, text = routed
+    if handler is None:
         await bot.process_commands(message)
+    else:
+        await handler(message, text)
 
 def create_bot():
     # import commands to register them
@@ -91,7 +93,9 @@ def create_bot():
         import infrastructure.discord.commands.music_commands as _mc
         import infrastructure.discord.commands.ia_commands as _ia
         import infrastructure.discord.commands.help_command as _hc
+        import infrastructure.discord.commands.admin_commands as _ac
         # views are imported on demand
     except Exception as e:
         logging.exception('Error importing commands: %s', e)
+    startup_timer.mark("create_bot")
     return bot
@@ -0,0 +1,169 @@
+"""
+Modo multiproceso: varios procesos del bot en la misma máquina, cada uno con
+un bloque de shards (un "cluster").
+
+El lanzador no se conecta a Discord: pide el número de shards recomendado (si
+SHARD_COUNT es "auto"), reparte los ids en CLUSTERS bloques contiguos y arranca
+`main.py` una vez por bloque con SHARD_COUNT/SHARD_IDS/CLUSTER_ID en el entorno.
+Los arranques van de uno en uno: el siguiente cluster no identifica hasta que
+el anterior responde en /readyz (o, sin puerto de métricas, tras la espera que
+impone el límite de IDENTIFY). Si un cluster muere se relanza, también en turno.
+Todo el estado (colas, historiales, caches) vive en cada proceso, y también
+sus ficheros: cada cluster tiene su propio AUDIO_CACHE_DIR y SNAPSHOT_DB.
+"""
+import asyncio
+import logging
+import math
+import os
+import signal
+import sys
+from typing import Dict, List, Optional
+import aiohttp
+
+log = logging.getLogger('kaivoxx.launcher')
+
+GATEWAY_BOT_URL = "https://discord.com/api/v10/gateway/bot"
+IDENTIFY_INTERVAL = 5.0  # Discord: un IDENTIFY cada 5 s por bucket de max_concurrency
+RESTART_BACKOFF = (1, 5, 15, 60)
+HEALTHY_UPTIME = 300.0  # un cluster que llegó a estar listo o duró esto vuelve al backoff inicial
+
+
+async def fetch_gateway_info(token: str) -> dict:
+    """{'shards': recomendados, 'max_concurrency': IDENTIFY simultáneos permitidos}."""
+    headers = {"Authorization": f"Bot {token}"}
+    async with aiohttp.ClientSession() as session:
+        async with session.get(GATEWAY_BOT_URL, headers=headers) as resp:
+            resp.raise_for_status()
+            data = await resp.json()
+    limit = data.get("session_start_limit") or {}
+    return {"shards": int(data["shards"]), "max_concurrency": int(limit.get("max_concurrency", 1))}
+
+
+def plan_clusters(shard_count: int, clusters: int) -> List[List[int]]:
+    """Reparte 0..shard_count-1 en bloques contiguos lo más parejos posible."""
+    clusters = max(1, min(clusters, shard_count))
+    base, extra = divmod(shard_count, clusters)
+    plan, start = [], 0
+    for i in range(clusters):
+        size = base + (1 if i < extra else 0)
+        plan.append(list(range(start, start + size)))
+        start += size
+    return plan
+
+
+def _per_cluster_file(path: str, index: int) -> str:
+    root, ext = os.path.splitext(path)
+    return f"{root}.cluster-{index}{ext}"
+
+
+def cluster_env(base: Dict[str, str], index: int, shard_ids: List[int], shard_count: int,
+                metrics_port: int) -> Dict[str, str]:
+    env = dict(base)
+    # nada de disco compartido: cada proceso limpia, indexa y expulsa solo lo suyo
+    if env.get("AUDIO_CACHE_DIR"):
+        env["AUDIO_CACHE_DIR"] = os.path.join(env["AUDIO_CACHE_DIR"], f"cluster-{index}")
+    for key in ("SNAPSHOT_DB", "STARTUP_REPORT"):
+        if env.get(key):
+            env[key] = _per_cluster_file(env[key], index)
+    env.update({
+        "SHARD_COUNT": str(shard_count),
+        "SHARD_IDS": ",".join(map(str, shard_ids)),
+        "CLUSTER_ID": str(index),
+        "METRICS_PORT": str(metrics_port + index if metrics_port else 0),
+    })
+    env.pop("PORT", None)  # si no, todos heredarían el mismo puerto de Railway
+    return env
+
+
+class ClusterLauncher:
+    def __init__(self, plan: List[List[int]], shard_count: int, argv: List[str], metrics_port: int = 0,
+                 max_concurrency: int = 1, ready_timeout: float = 180.0):
+        self.plan = plan
+        self.shard_count = shard_count
+        self.argv = argv
+        self.metrics_port = metrics_port
+        self.max_concurrency = max_concurrency
+        self.ready_timeout = ready_timeout
+        self.procs: Dict[int, asyncio.subprocess.Process] = {}
+        self.restarts = 0
+        self._stopping = False
+        self._start_lock: Optional[asyncio.Lock] = None
+
+    async def _wait_ready(self, index: int, proc: asyncio.subprocess.Process) -> bool:
+        """True si respondió en /readyz; sin puerto de métricas solo se espera el turno de IDENTIFY."""
+        if not self.metrics_port:
+            identifies = math.ceil(len(self.plan[index]) / self.max_concurrency)
+            await asyncio.sleep(IDENTIFY_INTERVAL * identifies)
+            return False
+        url = f"http://127.0.0.1:{self.metrics_port + index}/readyz"
+        deadline = asyncio.get_running_loop().time() + self.ready_timeout
+        async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=2)) as session:
+            while proc.returncode is None and asyncio.get_running_loop().time() < deadline:
+                try:
+                    async with session.get(url) as resp:
+                        if resp.status == 200:
+                            log.info(f"Cluster {index} listo")
+                            return True
+                except aiohttp.ClientError:
+                    pass
+                await asyncio.sleep(1)
+        if proc.returncode is None:
+            log.warning(f"Cluster {index} no está listo tras {self.ready_timeout:.0f}s; sigo con el siguiente")
+        return False
+
+    async def _supervise(self, index: int):
+        failures = 0
+        env = cluster_env(os.environ, index, self.plan[index], self.shard_count, self.metrics_port)
+        loop = asyncio.get_running_loop()
+        while not self._stopping:
+            async with self._start_lock:
+                if self._stopping:
+                    return
+                log.info(f"Arrancando cluster {index} (shards {self.plan[index]})")
+                started = loop.time()
+                proc = await asyncio.create_subprocess_exec(sys.executable, *self.argv, env=env)
+                self.procs[index] = proc
+                ready = await self._wait_ready(index, proc)
+            code = await proc.wait()
+            if self._stopping:
+                return
+            if ready or loop.time() - started >= HEALTHY_UPTIME:
+                failures = 0  # un fallo aislado no arrastra el backoff de los anteriores
+            delay = RESTART_BACKOFF[min(failures, len(RESTART_BACKOFF) - 1)]
+            failures += 1
+            self.restarts += 1
+            log.warning(f"Cluster {index} terminó con código {code}; se relanza en {delay}s")
+            await asyncio.sleep(delay)
+
+    def stop(self):
+        self._stopping = True
+        for proc in self.procs.values():
+            if proc.returncode is None:
+                proc.terminate()
+
+    async def run(self):
+        self._start_lock = asyncio.Lock()  # FIFO: los clusters arrancan en orden
+        loop = asyncio.get_running_loop()
+        for sig in (signal.SIGTERM, signal.SIGINT):
+            try:
+                loop.add_signal_handler(sig, self.stop)
+            except (NotImplementedError, RuntimeError):
+                pass
+        try:
+            await asyncio.gather(*(self._supervise(i) for i in range(len(self.plan))))
+        finally:
+            self.stop()
+            await asyncio.gather(*(p.wait() for p in self.procs.values()), return_exceptions=True)
+
+
+async def launch(token: str, shard_count: str, clusters: int, metrics_port: int, ready_timeout: float,
+                 argv: List[str]):
+    max_concurrency = 1
+    if shard_count in ("", "auto"):
+        info = await fetch_gateway_info(token)
+        total, max_concurrency = info["shards"], info["max_concurrency"]
+    else:
+        total = int(shard_count)
+    plan = plan_clusters(total, clusters)
+    log.info(f"{total} shards en {len(plan)} clusters: {plan}")
+    await ClusterLauncher(plan, total, argv, metrics_port, max_concurrency, ready_timeout).run()
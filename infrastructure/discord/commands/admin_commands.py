@@ -0,0 +1,29 @@
+import discord
+from discord.ext import commands
+from infrastructure.discord.bot_client import bot
+from infrastructure.discord.views.embeds import embed_info, embed_warning
+from infrastructure.profiler import profile_to_file
+from config.settings import PROFILE_DIR
+
+MAX_PROFILE_SECONDS = 120
+_profiling = False
+
+
+@bot.command(name="profile", hidden=True)
+@commands.is_owner()
+async def cmd_profile(ctx, seconds: float = 15):
+    global _profiling
+    if _profiling:
+        await ctx.send(embed=embed_warning("Ya estoy perfilando", "Espera a que termine el perfil en curso."))
+        return
+    seconds = max(1.0, min(seconds, MAX_PROFILE_SECONDS))
+    _profiling = True
+    try:
+        await ctx.send(embed=embed_info("Perfilando…", f"⏱ Muestreando todos los hilos durante **{seconds:.0f}s**."))
+        path = await profile_to_file(seconds, PROFILE_DIR)
+    finally:
+        _profiling = False
+    try:
+        await ctx.send(f"🔥 Perfil listo (`{path}`), formato folded para flamegraph/speedscope.", file=discord.File(path))
+    except discord.HTTPException:
+        await ctx.send(f"🔥 Perfil listo en `{path}` (demasiado grande para adjuntarlo).")
@@ -15,6 +15,9 @@ async def cmd_help(ctx):
         "**#skip / #s** → Salta la canción actual\n"
         "**#stop** → Detiene la música y borra la cola\n"
         "**#queue / #q** → Muestra la cola de reproducción\n"
+        "**#remove / #rm <n>** → Quita la canción n de la cola\n"
+        "**#move / #mv <n> <m>** → Mueve la canción n a la posición m\n"
+        "**#shuffle / #sh** → Mezcla la cola\n"
         "**#now** → Muestra la canción actual\n\n"
         "### 🤖 **Comandos de IA**\n"
         "**#ia / #i** → Habla con la IA (solo texto)\n"
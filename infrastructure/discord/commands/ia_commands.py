@@ -1,10 +1,13 @@
-from infrastructure.discord.bot_client import bot
-from infrastructure.ia.groq_client import groq_chat_response
+import logging
+from infrastructure.discord.bot_client import bot, message_router
+from infrastructure.discord.views.streaming import reply_with_ia
 from integration.queue_shim import music_queues
-from infrastructure.discord.views.embeds import embed_info
+from infrastructure.discord.views.embeds import embed_info, embed_success, embed_warning
+from infrastructure.tts.gtts_client import speak_text_in_voice
 from infrastructure.discord.commands.music_commands import play_music
 from typing import Union
-import asyncio
+
+log = logging.getLogger('kaivoxx.ia')
 
 # Protección contra doble ejecución
 _habla_processing = set()
@@ -37,12 +40,12 @@ async def cmd_ia(ctx, *, prompt: str):
     music_query = detect_music_request(prompt)
     print(f"Debug: Prompt: {prompt}, Music query: {music_query}")  # Debug
     async with ctx.typing():
-        response = await asyncio.to_thread(
-            groq_chat_response,
+        await reply_with_ia(
+            ctx,
             f"chan_{ctx.channel.id}",
-            prompt
+            prompt,
+            guild_id=ctx.guild.id if ctx.guild else None
         )
-    await ctx.send(response)
 
     if music_query:
         print(f"Debug: Calling play_music with {music_query}")  # Debug
@@ -50,14 +53,53 @@ async def cmd_ia(ctx, *, prompt: str):
         await play_music(ctx, music_query)
 
 
+async def _reply_to_message(message, prompt: str, speak: bool):
+    """`#ia`/`#habla` y las menciones al bot (vía message_router): responde y, si toca, lo dice por voz."""
+    if not prompt:
+        await message.channel.send("💜 Dime qué quieres que responda.")
+        return
+    async with message.channel.typing():
+        response, ok = await reply_with_ia(message.channel, f"chan_{message.channel.id}", prompt,
+                                           guild_id=message.guild.id if message.guild else None)
+    # un error o una respuesta cortada ya se ven en el chat: no se leen en voz
+    if not speak or not ok or not message.guild or len(response) > 180:
+        return
+    author_voice = message.author.voice
+    if not author_voice or not author_voice.channel:
+        await message.channel.send("💜 Para que hable, debes estar en un canal de voz y usar `#habla` o mencionar y decir 'habla'.")
+        return
+    user_channel = author_voice.channel
+    vc = message.guild.voice_client
+    if not vc:
+        try:
+            vc = await user_channel.connect()
+            await message.channel.send(embed=embed_success("Conectada al canal", f"Me uní a **{user_channel.name}** para hablar 🎤"))
+        except Exception:
+            log.exception('No pude unirme al canal de voz')
+            await message.channel.send(embed=embed_warning("No pude unirme", "No tengo permisos para unirme al canal de voz o ocurrió un error."))
+            return
+    if vc.channel.id != user_channel.id:
+        await message.channel.send(embed=embed_warning("Ya estoy en otro canal", "Estoy en otro canal de voz. Pide que me unan al mismo canal o usa `#join`."))
+        return
+    if not await speak_text_in_voice(vc, response):
+        await message.channel.send("⚠️ No pude reproducir la voz. Comprueba permisos y que ffmpeg esté disponible.")
+
+
+@message_router.route("ia", default=True)
+async def route_ia(message, prompt: str):
+    await _reply_to_message(message, prompt, speak=False)
+
+
+@message_router.route("habla")
+async def route_habla(message, prompt: str):
+    await _reply_to_message(message, prompt, speak=True)
+
+
 @bot.command(
     name="habla",
     aliases=["Habla", "HABLA", "h", "voz", "Voz", "tts", "TTS"]
 )
 async def cmd_habla(ctx, *, prompt: str = None):
-    from infrastructure.tts.gtts_client import speak_text_in_voice
-    from infrastructure.discord.views.embeds import embed_success, embed_warning
-
     if ctx.message.id in _habla_processing:
         return
     _habla_processing.add(ctx.message.id)
@@ -68,13 +110,15 @@ async def cmd_habla(ctx, *, prompt: str = None):
             return
 
         async with ctx.typing():
-            response = await asyncio.to_thread(
-                groq_chat_response,
+            response, ok = await reply_with_ia(
+                ctx,
                 f"chan_{ctx.channel.id}",
-                prompt
+                prompt,
+                guild_id=ctx.guild.id if ctx.guild else None
             )
 
-        await ctx.send(response)
+        if not ok:
+            return
 
         if len(response) > 180:
             await ctx.send(
@@ -137,8 +181,9 @@ async def cmd_habla(ctx, *, prompt: str = None):
 )
 async def cmd_limpiar_ia(ctx):
     key = f"chan_{ctx.channel.id}"
-    from infrastructure.ia.groq_client import conversation_history
+    from infrastructure.ia.groq_client import conversation_history, load_history
 
+    await load_history(key)
     if key in conversation_history:
         del conversation_history[key]
         await ctx.send("🧠 Memoria limpiada. Empezamos de cero 💜✨")
@@ -167,13 +212,13 @@ async def cmd_resumen(ctx, *, texto: str = None):
     prompt = f"Resume el siguiente texto de forma clara y corta:\n\n{texto}"
 
     async with ctx.typing():
-        response = await asyncio.to_thread(
-            groq_chat_response,
+        await reply_with_ia(
+            ctx,
             f"temp_resumen_{ctx.message.id}",
-            prompt
+            prompt,
+            guild_id=ctx.guild.id if ctx.guild else None,
+            prefix="📌 **Resumen:**\n"
         )
 
     from infrastructure.ia.groq_client import conversation_history
     conversation_history.pop(f"temp_resumen_{ctx.message.id}", None)
-
-    await ctx.send(f"📌 **Resumen:**\n{response}")
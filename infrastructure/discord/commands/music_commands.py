@@ -1,15 +1,29 @@
 from infrastructure.discord.bot_client import bot
 from integration.queue_shim import ensure_queue_for_guild, music_queues
-from infrastructure.ytdlp.ytdlp_client import extract_info, build_ffmpeg_source
+from infrastructure.ytdlp.ytdlp_client import extract_info, resolve_stream, make_ffmpeg_source, DEFAULT_VOICE_KBPS
+from integration.snapshots import take_resume_offset
+from integration.playlist_ingest import is_playlist_url, start_ingestion, cancel_ingestion
+from integration.prefetch import schedule_prefetch, take_prefetched, invalidate as invalidate_prefetch
+from integration import recovery
 from infrastructure.discord.views.embeds import embed_info, embed_music, embed_success, embed_warning, embed_error
 from infrastructure.discord.views.now_playing import send_now_playing_embed
-from config.settings import BOT_PREFIX, MAX_QUEUE_LENGTH
+from infrastructure.discord.views.progress_scheduler import now_playing_scheduler
+from config.settings import BOT_PREFIX, MAX_QUEUE_LENGTH, TTS_MIXING, TTS_DUCK_VOLUME
 from domain.entities.song import Song
+from infrastructure.audio.tracked_source import TrackedSource
+from infrastructure.audio.mixer import MixerSource
+from infrastructure.audio.disk_cache import audio_cache, make_cached_source
+from infrastructure.ytdlp.stream_cache import extract_video_id, pick_stream
 import asyncio
+import logging
 import discord
+from itertools import islice
 
 # Decorator (copiado)
 from discord.ext import commands
+
+log = logging.getLogger('kaivoxx.music')
+
 def requires_same_voice_channel_after_join():
     async def predicate(ctx):
         vc = ctx.voice_client
@@ -33,15 +47,20 @@ async def cmd_join(ctx):
             return
         vc = await channel.connect()
         await ctx.send(embed=embed_success("Conectada al canal", f"Me uní a **{channel.name}** 🎧"))
+        # si había una cola guardada de antes de un reinicio, sigue donde iba
+        await ensure_queue_for_guild(ctx.guild.id)
+        await start_playback_if_needed(ctx.guild)
     else:
         await ctx.send(embed=embed_warning("No estás en un canal", "Debes unirte primero a un canal de voz."))
 
 @bot.command(name="leave", aliases=["l", "L", "Leave", "LEAVE"])
 async def cmd_leave(ctx):
     if ctx.voice_client:
+        cancel_ingestion(ctx.guild.id)
         await ctx.voice_client.disconnect()
-        q = music_queues.get(ctx.guild.id)
-        if q: q.clear()
+        (await ensure_queue_for_guild(ctx.guild.id)).clear()
+        invalidate_prefetch(ctx.guild.id)
+        recovery.forget(ctx.guild.id)
         await ctx.send(embed=embed_success("Desconectada", "Me desconecté del canal y limpié la cola 🧹"))
     else:
         await ctx.send(embed=embed_warning("No estoy conectada", "No estoy en ningún canal de voz."))
@@ -70,26 +89,29 @@ async def play_music(ctx, search: str):
         vc = await ctx.author.voice.channel.connect()
 
     queue = await ensure_queue_for_guild(ctx.guild.id)
+    if is_playlist_url(search):
+        # la playlist se va cargando en segundo plano y suena desde la primera entrada
+        start_ingestion(ctx, search, queue, lambda: start_playback_if_needed(ctx.guild))
+        return
     await ctx.send(embed=embed_info("Buscando en YouTube…", f"🔍 **{search}**"))
 
     info = await extract_info(search if (search.startswith('http://') or search.startswith('https://') or search.startswith('spotify:')) else f"ytsearch:{search}")
     songs_added = 0
 
     if isinstance(info, dict) and 'entries' in info and info['entries']:
-        for count, entry in enumerate(info['entries']):
-            if count >= 200: break
-            url = entry.get('webpage_url') or entry.get('url')
-            title = entry.get('title', 'Unknown title')
-            if queue.enqueue(Song(url, title, str(ctx.author), ctx.channel)):
-                songs_added += 1
+        requester = str(ctx.author)
+        songs_added = queue.enqueue_many(
+            Song.from_info(entry, requester, ctx.channel.id)
+            for entry in islice(info['entries'], 200) if entry
+        )
         await ctx.send(embed=embed_music(
             "Playlist / Mix añadido",
             f"🎶 Se añadieron **{songs_added} canciones** (máximo 200).\n📂 Cola actual: **{len(queue)}** / {queue.limit}"
         ))
     else:
-        url = info.get('webpage_url') or info.get('url')
-        title = info.get('title', 'Unknown title')
-        if queue.enqueue(Song(url, title, str(ctx.author), ctx.channel)):
+        song = Song.from_info(info, str(ctx.author), ctx.channel.id)
+        title = song.title
+        if queue.enqueue(song):
             songs_added = 1
         await ctx.send(embed=embed_music(
             "Canción añadida",
@@ -117,26 +139,29 @@ async def cmd_play(ctx, *, search: str):
         vc = await ctx.author.voice.channel.connect()
 
     queue = await ensure_queue_for_guild(ctx.guild.id)
+    if is_playlist_url(search):
+        # la playlist se va cargando en segundo plano y suena desde la primera entrada
+        start_ingestion(ctx, search, queue, lambda: start_playback_if_needed(ctx.guild))
+        return
     await ctx.send(embed=embed_info("Buscando en YouTube…", f"🔍 **{search}**"))
 
     info = await extract_info(search if (search.startswith('http://') or search.startswith('https://') or search.startswith('spotify:')) else f"ytsearch:{search}")
     songs_added = 0
 
     if isinstance(info, dict) and 'entries' in info and info['entries']:
-        for count, entry in enumerate(info['entries']):
-            if count >= 200: break
-            url = entry.get('webpage_url') or entry.get('url')
-            title = entry.get('title', 'Unknown title')
-            if queue.enqueue(Song(url, title, str(ctx.author), ctx.channel)):
-                songs_added += 1
+        requester = str(ctx.author)
+        songs_added = queue.enqueue_many(
+            Song.from_info(entry, requester, ctx.channel.id)
+            for entry in islice(info['entries'], 200) if entry
+        )
         await ctx.send(embed=embed_music(
             "Playlist / Mix añadido",
             f"🎶 Se añadieron **{songs_added} canciones** (máximo 200).\n📂 Cola actual: **{len(queue)}** / {queue.limit}"
         ))
     else:
-        url = info.get('webpage_url') or info.get('url')
-        title = info.get('title', 'Unknown title')
-        if queue.enqueue(Song(url, title, str(ctx.author), ctx.channel)):
+        song = Song.from_info(info, str(ctx.author), ctx.channel.id)
+        title = song.title
+        if queue.enqueue(song):
             songs_added = 1
         await ctx.send(embed=embed_music(
             "Canción añadida",
@@ -146,24 +171,78 @@ async def cmd_play(ctx, *, search: str):
     # start playback
     await start_playback_if_needed(ctx.guild)
 
+def _channel_kbps(vc) -> int:
+    bitrate = getattr(getattr(vc, 'channel', None), 'bitrate', None)
+    return bitrate // 1000 if bitrate else DEFAULT_VOICE_KBPS
+
+async def _on_track_end(guild: 'discord.Guild', song: Song, source: TrackedSource, err):
+    if err:
+        log.warning(f"Error de reproducción en la guild {guild.id}: {err}")
+    recovery.note_end(guild.id, song, source, err)
+    await start_playback_if_needed(guild)
+
 async def start_playback_if_needed(guild: 'discord.Guild'):
     vc = guild.voice_client
     if not vc or not vc.is_connected(): return
+    if recovery.is_held(guild.id): return
     queue = music_queues.get(guild.id)
-    if not queue or len(queue) == 0: return
-    if not vc.is_playing():
-        song = queue.dequeue()
-        if not song: return
-        try:
-            source = await build_ffmpeg_source(song.url)
-            vc.play(source, after=lambda err: asyncio.run_coroutine_threadsafe(start_playback_if_needed(guild), bot.loop) or (print(f"Playback error: {err}" if err else "")))
-            # store current song in a simple dict on the bot
-            bot._current_song = getattr(bot, '_current_song', {})
-            bot._current_song[guild.id] = song
+    if (not queue or len(queue) == 0) and not recovery.has_pending(guild.id): return
+    if vc.is_playing() or vc.is_paused():
+        # ya suena algo: dejamos preparada la siguiente
+        schedule_prefetch(guild.id, queue)
+        return
+    # una canción cortada a medias va antes que la cola
+    resumed = recovery.take(guild.id)
+    song = resumed[0] if resumed else queue.dequeue()
+    if not song: return
+    try:
+        offset = resumed[1] if resumed else take_resume_offset(guild.id, song)
+        video_id = song.video_id or extract_video_id(song.url)
+        cached = audio_cache.get(video_id)
+        resolved = None
+        if cached:
+            # canción popular ya en disco: ni yt-dlp ni transcodificar
+            build = lambda start, pcm: make_cached_source(cached, start=start, pcm=pcm)
+            opus = True
+        else:
+            if resumed:
+                # URL cacheada si sigue viva; si no, re-resolver con un tope de espera
+                resolved = await asyncio.wait_for(resolve_stream(song.url), recovery.RESOLVE_TIMEOUT)
+            else:
+                resolved = await take_prefetched(guild.id, song) or await resolve_stream(song.url)
+            song.fill_from(resolved)
+            kbps = _channel_kbps(vc)
+            stream = pick_stream(resolved, kbps)
+            build = lambda start, pcm: make_ffmpeg_source(stream, start=start, pcm=pcm, bitrate=kbps)
+            opus = stream.get('acodec') == 'opus'
+        if not resumed:
+            audio_cache.record_play(song.video_id or video_id, resolved, song.duration)
+        if TTS_MIXING and not opus:
+            source = MixerSource(build(offset, True), duck=TTS_DUCK_VOLUME)
+        else:
+            source = build(offset, False)
+        source = TrackedSource(source, start_offset=offset)
+        if TTS_MIXING and opus:
+            # Opus copiado sin recodificar; el mezclador solo se monta si hay que hablar encima
+            source.make_pcm = lambda start: MixerSource(build(start, True), duck=TTS_DUCK_VOLUME)
+        vc.play(source, after=lambda err: asyncio.run_coroutine_threadsafe(_on_track_end(guild, song, source, err), bot.loop))
+        # store current song in a simple dict on the bot
+        bot._current_song = getattr(bot, '_current_song', {})
+        bot._current_song[guild.id] = song
+        if resumed:
+            # mismo mensaje de now playing: que su barra siga a la fuente nueva
+            now_playing_scheduler.retarget(guild.id, source)
+        else:
             asyncio.create_task(send_now_playing_embed(bot, song))
-        except Exception:
-            import logging; logging.exception("Error iniciando reproducción")
-            asyncio.create_task(song.channel.send("❌ Error al preparar el audio. Saltando..."))
+        schedule_prefetch(guild.id, queue)
+    except Exception:
+        log.exception("Error iniciando reproducción")
+        channel = bot.get_channel(song.channel_id)
+        if channel:
+            asyncio.create_task(channel.send("❌ Error al preparar el audio. Saltando..."))
+        if resumed:
+            # no se pudo retomar a tiempo: seguimos con la cola
+            asyncio.create_task(start_playback_if_needed(guild))
 
 @bot.command(name="skip", aliases=["sk", "SK", "Skip", "next", "Next"])
 @requires_same_voice_channel_after_join()
@@ -180,13 +259,53 @@ async def cmd_skip(ctx):
 async def cmd_stop(ctx):
     vc = ctx.voice_client
     if vc:
+        cancel_ingestion(ctx.guild.id)
+        (await ensure_queue_for_guild(ctx.guild.id)).clear()
+        invalidate_prefetch(ctx.guild.id)
+        recovery.forget(ctx.guild.id)
         vc.stop()
-        q = music_queues.get(ctx.guild.id)
-        if q: q.clear()
         await ctx.send(embed=embed_error("Reproducción detenida", "🛑 Cola eliminada y música detenida."))
     else:
         await ctx.send(embed=embed_warning("Nada reproduciéndose", "No hay música sonando."))
 
+def _head_may_have_changed(guild: 'discord.Guild', queue):
+    """Si suena algo, la siguiente puede ser otra: se prepara la cabeza nueva."""
+    vc = guild.voice_client
+    if vc and (vc.is_playing() or vc.is_paused()):
+        schedule_prefetch(guild.id, queue)
+
+@bot.command(name="remove", aliases=["rm", "RM", "Remove", "quitar"])
+@requires_same_voice_channel_after_join()
+async def cmd_remove(ctx, position: int):
+    queue = await ensure_queue_for_guild(ctx.guild.id)
+    song = queue.remove_at(position - 1) if position > 0 else None
+    if not song:
+        await ctx.send(embed=embed_warning("Posición no válida", f"La cola tiene **{len(queue)}** canciones."))
+        return
+    _head_may_have_changed(ctx.guild, queue)
+    await ctx.send(embed=embed_success("Quitada de la cola", f"🗑 **{song.title}**"))
+
+@bot.command(name="move", aliases=["mv", "MV", "Move", "mover"])
+@requires_same_voice_channel_after_join()
+async def cmd_move(ctx, position: int, new_position: int):
+    queue = await ensure_queue_for_guild(ctx.guild.id)
+    if position < 1 or not queue.move(position - 1, max(new_position, 1) - 1):
+        await ctx.send(embed=embed_warning("Posición no válida", f"La cola tiene **{len(queue)}** canciones."))
+        return
+    _head_may_have_changed(ctx.guild, queue)
+    await ctx.send(embed=embed_success("Cola reordenada", f"↕ Movida de la posición {position} a la {min(max(new_position, 1), len(queue))}."))
+
+@bot.command(name="shuffle", aliases=["sh", "SH", "Shuffle", "mezclar"])
+@requires_same_voice_channel_after_join()
+async def cmd_shuffle(ctx):
+    queue = await ensure_queue_for_guild(ctx.guild.id)
+    if len(queue) < 2:
+        await ctx.send(embed=embed_info("Nada que mezclar", "La cola necesita al menos dos canciones."))
+        return
+    queue.shuffle()
+    _head_may_have_changed(ctx.guild, queue)
+    await ctx.send(embed=embed_success("Cola mezclada", f"🔀 {len(queue)} canciones en orden aleatorio."))
+
 @bot.command(name="queue", aliases=["q", "Q", "Queue", "QUEUE"])
 @requires_same_voice_channel_after_join()
 async def cmd_queue(ctx):
@@ -195,14 +314,8 @@ async def cmd_queue(ctx):
         await ctx.send(embed=embed_info("Cola vacía", "No hay canciones en la cola 🎵"))
         return
     from infrastructure.discord.views.now_playing import QueueView, build_queue_embed
-    total = len(queue)
-    total_pages = max(1, (total + 50 - 1) // 50)
     view = QueueView(author_id=ctx.author.id, guild_id=ctx.guild.id, initial_page=0)
-    options = [discord.SelectOption(label=f"Página {i+1}", description=f"{i*50+1}-{min((i+1)*50, total)} canciones", value=str(i)) for i in range(total_pages)]
-    for child in view.children:
-        if isinstance(child, discord.ui.Select):
-            child.options = options
-            child.placeholder = f"Ir a página (1/{total_pages})"
+    view.set_page_options(queue)
     embed = build_queue_embed(queue, 0)
     await ctx.send(embed=embed, view=view)
 
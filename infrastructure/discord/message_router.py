@@ -0,0 +1,69 @@
+"""
+Enrutado de on_message.
+
+Con el intent de message_content llega cada mensaje de cada guild, y casi
+ninguno es para el bot. El router descarta esos en tiempo constante (un
+`startswith` con una tupla precompilada y mirar si la lista de menciones está
+vacía) y solo parte el texto de los que empiezan por el prefijo o por una
+mención al bot.
+
+Las rutas (`ia`, `habla`) son una única tabla para `#ia texto` y para
+`@Kaivoxx ia texto`; una mención sin palabra conocida va a la ruta por
+defecto. Lo que lleva prefijo y no es una ruta sigue a `process_commands`.
+"""
+from typing import Awaitable, Callable, Dict, Optional, Sequence, Tuple
+
+Handler = Callable[..., Awaitable[None]]
+
+
+class MessageRouter:
+    def __init__(self, prefix: str):
+        self.prefix = prefix
+        self.routes: Dict[str, Handler] = {}
+        self.default: Optional[Handler] = None
+        self.user_id: Optional[int] = None
+        self._mention_prefixes: Tuple[str, ...] = ()
+        self._starts: Tuple[str, ...] = (prefix,)
+
+    def route(self, word: str, default: bool = False):
+        """Decorador: `handler(message, texto)` para `#word texto` y `@bot word texto`."""
+        def decorator(handler: Handler) -> Handler:
+            self.routes[word] = handler
+            if default:
+                self.default = handler
+            return handler
+        return decorator
+
+    def bind(self, user_id: int):
+        """Precompila las menciones del bot (`<@id>` y la forma antigua `<@!id>`)."""
+        self.user_id = user_id
+        self._mention_prefixes = (f"<@{user_id}>", f"<@!{user_id}>")
+        self._starts = (self.prefix, *self._mention_prefixes)
+
+    def _mentioned(self, mentions: Sequence) -> bool:
+        return any(user.id == self.user_id for user in mentions)
+
+    def match(self, content: str, mentions: Sequence = ()) -> Optional[Tuple[Optional[Handler], str]]:
+        """
+        `(handler, texto)` si el mensaje es para el bot; handler None significa
+        comando normal (process_commands). None si no es para el bot.
+        """
+        if not content.startswith(self._starts):
+            if mentions and self._mentioned(mentions):
+                return self.default, content.strip()
+            return None
+        if content.startswith(self.prefix):
+            parts = content[len(self.prefix):].split(None, 1)
+            handler = self.routes.get(parts[0]) if parts else None
+            if handler is None:
+                return None, content
+            return handler, parts[1].strip() if len(parts) > 1 else ""
+        for mention in self._mention_prefixes:
+            if content.startswith(mention):
+                after = content[len(mention):].strip()
+                parts = after.split(None, 1)
+                handler = self.routes.get(parts[0].lower()) if parts else None
+                if handler is None:
+                    return self.default, after
+                return handler, parts[1].strip() if len(parts) > 1 else ""
+        return None
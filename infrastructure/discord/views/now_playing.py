@@ -1,6 +1,11 @@
-import discord, asyncio, time, logging
+import discord, logging
 from infrastructure.discord.views.embeds import embed_music
-from integration.queue_shim import music_queues
+from infrastructure.discord.views.progress_scheduler import now_playing_scheduler
+from integration.queue_shim import music_queues, ensure_queue_for_guild
+from domain.repositories.queue_repository import PAGE_SIZE
+from integration.prefetch import invalidate as invalidate_prefetch
+from integration.playlist_ingest import cancel_ingestion
+from integration import recovery
 
 log = logging.getLogger('kaivoxx.views')
 now_playing_messages = {}
@@ -50,39 +55,68 @@ class NowPlayingView(discord.ui.View):
             return
         vc = interaction.guild.voice_client
         if vc:
+            cancel_ingestion(interaction.guild.id)
+            (await ensure_queue_for_guild(interaction.guild.id)).clear()
+            invalidate_prefetch(interaction.guild.id)
+            recovery.forget(interaction.guild.id)
             vc.stop()
-            queue = music_queues.get(interaction.guild.id)
-            if queue:
-                queue.clear()
             await interaction.response.send_message("🛑 Música detenida y cola vaciada", ephemeral=True)
         else:
             await interaction.response.send_message("❌ No hay música sonando.", ephemeral=True)
 
+def build_queue_embed(queue, page: int):
+    total_pages = queue.page_count()
+    page = max(0, min(page, total_pages - 1))
+    start = page * PAGE_SIZE
+    lines = [f"`{start + i}.` {song.title}" for i, song in enumerate(queue.page(page), 1)]
+    embed = embed_music(f"Cola de reproducción ({len(queue)})", "\n".join(lines)[:4000] or "No hay canciones en la cola 🎵")
+    embed.set_footer(text=f"Página {page + 1}/{total_pages}")
+    return embed
+
+class QueueView(discord.ui.View):
+    def __init__(self, author_id, guild_id, initial_page=0):
+        super().__init__(timeout=120)
+        self.author_id = author_id
+        self.guild_id = guild_id
+        self.page = initial_page
+
+    def set_page_options(self, queue):
+        total, total_pages = len(queue), queue.page_count()
+        options = [
+            discord.SelectOption(label=f"Página {i+1}", description=f"{i*PAGE_SIZE+1}-{min((i+1)*PAGE_SIZE, total)} canciones", value=str(i))
+            for i in range(min(total_pages, 25))
+        ]
+        self.page_select.options = options
+        self.page_select.placeholder = f"Ir a página ({self.page + 1}/{total_pages})"
+
+    @discord.ui.select(placeholder="Ir a página", options=[discord.SelectOption(label="Página 1", value="0")])
+    async def page_select(self, interaction: discord.Interaction, select: discord.ui.Select):
+        if interaction.user.id != self.author_id:
+            await interaction.response.send_message("⚠️ Solo quien pidió la cola puede cambiar de página.", ephemeral=True)
+            return
+        queue = music_queues.get(self.guild_id)
+        if not queue or len(queue) == 0:
+            await interaction.response.edit_message(embed=embed_music("Cola vacía", "No hay canciones en la cola 🎵"), view=None)
+            return
+        self.page = int(select.values[0])
+        self.set_page_options(queue)
+        await interaction.response.edit_message(embed=build_queue_embed(queue, self.page), view=self)
+
 async def send_now_playing_embed(bot, song):
-    guild_id = song.channel.guild.id
+    channel = bot.get_channel(song.channel_id)
+    if channel is None:
+        return
+    guild_id = channel.guild.id
     view = NowPlayingView(bot, guild_id)
     embed = embed_music("Now Playing ✨", f"**[{song.title}]({song.url})**")
-    if "watch?v=" in song.url:
-        embed.set_thumbnail(url=f"https://img.youtube.com/vi/{song.url.split('=')[1]}/hqdefault.jpg")
+    thumbnail = song.thumbnail or (f"https://img.youtube.com/vi/{song.video_id}/hqdefault.jpg" if song.video_id else None)
+    if thumbnail:
+        embed.set_thumbnail(url=thumbnail)
     embed.add_field(name="Requested by", value=f"💜 {song.requester_name}", inline=True)
     embed.add_field(name="Source", value="YouTube 🎵", inline=True)
     embed.add_field(name="Time Elapsed", value="0:00", inline=False)
-    msg = await song.channel.send(embed=embed, view=view)
+    vc = channel.guild.voice_client
+    source = vc.source if vc else None
+    msg = await channel.send(embed=embed, view=view)
     now_playing_messages[guild_id] = msg
-    asyncio.create_task(update_now_playing_bar(bot, guild_id, song))
-
-async def update_now_playing_bar(bot, guild_id, song):
-    start_time = time.time()
-    msg = now_playing_messages.get(guild_id)
-    if not msg: return
-    while True:
-        vc = msg.guild.voice_client
-        if not vc or not vc.is_playing(): break
-        elapsed = int(time.time() - start_time)
-        embed = msg.embeds[0]
-        embed.set_field_at(2, name="Time Elapsed", value=f"{elapsed//60:02}:{elapsed%60:02}", inline=False)
-        try:
-            await msg.edit(embed=embed)
-        except Exception:
-            break
-        await asyncio.sleep(1)
+    now_playing_scheduler.track(guild_id, msg, source)
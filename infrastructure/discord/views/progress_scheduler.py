@@ -0,0 +1,183 @@
+"""
+Planificador único de las barras de "Now Playing".
+
+En vez de una tarea por canción editando cada segundo, una sola tarea recorre
+los mensajes vivos y reparte un presupuesto global de ediciones por segundo:
+con más guilds, cada mensaje se refresca menos a menudo. Solo se edita si el
+texto cambió, se ignoran los mensajes que ya quedaron enterrados en el chat y
+se frena solo cuando Discord devuelve 429 o tarda en responder.
+"""
+import asyncio
+import logging
+import time
+import discord
+from config.settings import NP_MIN_INTERVAL, NP_EDITS_PER_SECOND, NP_OFFSCREEN_MESSAGES
+
+log = logging.getLogger('kaivoxx.views')
+
+ELAPSED_FIELD = 2
+SLOW_EDIT_SECONDS = 1.0
+MAX_PENALTY = 8.0
+
+
+def format_position(seconds: float) -> str:
+    seconds = int(seconds)
+    return f"{seconds // 60:02}:{seconds % 60:02}"
+
+
+class _Entry:
+    __slots__ = ("msg", "source", "shown", "next_due", "buried")
+
+    def __init__(self, msg, source):
+        self.msg = msg
+        self.source = source
+        self.shown = None
+        self.next_due = 0.0
+        self.buried = 0
+
+
+class NowPlayingScheduler:
+    def __init__(self, min_interval: float = 5.0, edits_per_second: float = 2.0,
+                 offscreen_after: int = 10, tick: float = 0.5):
+        self.min_interval = min_interval
+        self.edits_per_second = edits_per_second
+        self.offscreen_after = offscreen_after
+        self.tick = tick
+        self.penalty = 1.0
+        self._entries = {}        # guild_id -> _Entry
+        self._by_channel = {}     # channel_id -> guild_id
+        self._detached = {}       # guild_id -> _Entry que dejó de sonar (por si se retoma)
+        self._paused_until = 0.0
+        self._task = None
+
+    def interval(self) -> float:
+        """Cada mensaje se refresca cada `interval` s; crece con el número de mensajes vivos."""
+        spread = len(self._entries) / self.edits_per_second if self.edits_per_second else 0
+        return max(self.min_interval, spread) * self.penalty
+
+    def track(self, guild_id: int, msg, source):
+        self.untrack(guild_id)
+        self._add(guild_id, _Entry(msg, source))
+
+    def _add(self, guild_id: int, entry: _Entry):
+        self._entries[guild_id] = entry
+        self._by_channel[entry.msg.channel.id] = guild_id
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    def untrack(self, guild_id: int):
+        self._detached.pop(guild_id, None)
+        entry = self._entries.pop(guild_id, None)
+        if entry and self._by_channel.get(entry.msg.channel.id) == guild_id:
+            del self._by_channel[entry.msg.channel.id]
+        return entry
+
+    def _detach(self, guild_id: int):
+        """Deja de actualizarlo, pero lo guarda por si la canción se retoma (`retarget`)."""
+        entry = self.untrack(guild_id)
+        if entry is not None:
+            self._detached[guild_id] = entry
+
+    def retarget(self, guild_id: int, source) -> bool:
+        """
+        La misma canción sigue en otra fuente (retomada tras un corte o tras un
+        TTS sin mezclador): el mensaje pasa a seguir `source`, aunque ya se
+        hubiera dejado de actualizar al pararse la anterior.
+        """
+        entry = self._entries.get(guild_id) or self._detached.pop(guild_id, None)
+        if entry is None:
+            return False
+        entry.source = source
+        entry.next_due = 0.0
+        if guild_id not in self._entries:
+            self._add(guild_id, entry)
+        return True
+
+    def note_message(self, channel_id: int, message_id: int):
+        """Llamado en cada mensaje: cuenta cuánto se ha enterrado el embed en el canal."""
+        guild_id = self._by_channel.get(channel_id)
+        if guild_id is None:
+            return
+        entry = self._entries.get(guild_id)
+        if entry and entry.msg.id != message_id:
+            entry.buried += 1
+
+    def _render(self, entry: _Entry):
+        """Texto a mostrar, o None si el mensaje ya no debe actualizarse."""
+        vc = entry.msg.guild.voice_client
+        if not vc or not vc.is_connected() or not (vc.is_playing() or vc.is_paused()):
+            return None
+        if vc.source is not entry.source:
+            return None
+        position = getattr(entry.source, "position", None)
+        if position is None:
+            return None
+        return format_position(position)
+
+    async def _edit(self, entry: _Entry, text: str) -> bool:
+        embed = entry.msg.embeds[0]
+        embed.set_field_at(ELAPSED_FIELD, name="Time Elapsed", value=text, inline=False)
+        started = time.monotonic()
+        try:
+            await entry.msg.edit(embed=embed)
+        except discord.NotFound:
+            return False
+        except discord.HTTPException as e:
+            if e.status == 429:
+                retry_after = getattr(e, "retry_after", None) or 5.0
+                self._paused_until = time.monotonic() + retry_after
+                self.penalty = min(MAX_PENALTY, self.penalty * 2)
+                log.warning(f"Now playing: 429, pausando ediciones {retry_after:.1f}s")
+                return True
+            log.warning(f"Now playing: error editando ({e.status})")
+            return True
+        took = time.monotonic() - started
+        if took > SLOW_EDIT_SECONDS:
+            # discord.py espera los 429 por dentro: una edición lenta es la señal
+            self.penalty = min(MAX_PENALTY, self.penalty * 1.5)
+        else:
+            self.penalty = max(1.0, self.penalty * 0.95)
+        entry.shown = text
+        return True
+
+    async def run_once(self):
+        now = time.monotonic()
+        if now < self._paused_until:
+            return
+        budget = max(1, int(self.edits_per_second * self.tick))
+        interval = self.interval()
+        due = sorted((e.next_due, gid) for gid, e in self._entries.items() if e.next_due <= now)
+        for _, guild_id in due:
+            entry = self._entries.get(guild_id)
+            if entry is None:
+                continue
+            text = self._render(entry)
+            if text is None:
+                self._detach(guild_id)
+                continue
+            entry.next_due = now + interval
+            if entry.buried >= self.offscreen_after or text == entry.shown:
+                continue
+            if budget <= 0:
+                entry.next_due = now
+                continue
+            budget -= 1
+            if not await self._edit(entry, text):
+                self.untrack(guild_id)
+            if time.monotonic() < self._paused_until:
+                return
+
+    async def _run(self):
+        while self._entries:
+            try:
+                await self.run_once()
+            except Exception:
+                log.exception("Error en el planificador de now playing")
+            await asyncio.sleep(self.tick)
+
+
+now_playing_scheduler = NowPlayingScheduler(
+    min_interval=NP_MIN_INTERVAL,
+    edits_per_second=NP_EDITS_PER_SECOND,
+    offscreen_after=NP_OFFSCREEN_MESSAGES,
+)
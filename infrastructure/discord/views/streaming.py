@@ -0,0 +1,61 @@
+import time
+import logging
+from typing import Tuple
+from config.settings import STREAM_EDIT_INTERVAL, IA_STREAMING
+from infrastructure.ia.groq_client import groq_chat_reply, groq_chat_stream
+
+log = logging.getLogger('kaivoxx.views')
+
+DISCORD_MAX_CHARS = 2000
+
+
+async def send_streaming_reply(channel, chunks, prefix: str = "", interval: float = STREAM_EDIT_INTERVAL) -> str:
+    """
+    Publica una respuesta en cuanto llegan los primeros tokens y la va editando.
+
+    Las ediciones se agrupan: como mucho una cada `interval` segundos, para no
+    pasarnos del rate limit de edición de Discord (5 cada 5 s por canal). Al
+    terminar se hace una última edición con el texto completo. Devuelve el texto.
+    """
+    text = ""
+    msg = None
+    shown = ""
+    last_edit = 0.0
+    async for piece in chunks:
+        text += piece
+        if not text.strip():
+            continue
+        render = (prefix + text)[:DISCORD_MAX_CHARS]
+        now = time.monotonic()
+        if msg is None:
+            msg = await channel.send(render)
+            shown, last_edit = render, now
+        elif now - last_edit >= interval and render != shown:
+            try:
+                await msg.edit(content=render)
+                shown, last_edit = render, now
+            except Exception:
+                log.exception("No se pudo editar la respuesta en streaming")
+    final = (prefix + text.strip())[:DISCORD_MAX_CHARS]
+    if msg is None:
+        if text.strip():
+            await channel.send(final)
+    elif final != shown:
+        await msg.edit(content=final)
+    return text.strip()
+
+
+async def reply_with_ia(channel, context_key: str, prompt: str, guild_id=None, prefix: str = "") -> Tuple[str, bool]:
+    """
+    Responde con la IA en `channel`, en streaming si IA_STREAMING está activo.
+    Devuelve (texto publicado, ok): ok es False si la IA falló o el stream se
+    cortó, y entonces el texto lleva el aviso de error (no hay que leerlo en voz).
+    """
+    if IA_STREAMING:
+        outcome = {"ok": True}
+        chunks = groq_chat_stream(context_key, prompt, guild_id=guild_id, outcome=outcome)
+        text = await send_streaming_reply(channel, chunks, prefix=prefix)
+        return text, outcome["ok"]
+    response, ok = await groq_chat_reply(context_key, prompt, guild_id=guild_id)
+    await channel.send(f"{prefix}{response}")
+    return response, ok
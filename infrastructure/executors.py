@@ -0,0 +1,181 @@
+"""
+Pools de hilos dedicados por tipo de trabajo bloqueante.
+
+yt-dlp y gTTS ya no comparten el executor por defecto de asyncio: una playlist
+grande no puede dejar sin hilos al TTS. (Groq va por aiohttp, sin hilos.)
+Sincronizar el FFmpeg PCM del mezclador con la canción también va aparte.
+SQLite tiene un único hilo propio: la conexión vive siempre en él. La cache de
+audio en disco (escaneo, mtime, renombrados y borrados) tiene el suyo.
+Cada pool lleva la cuenta de tareas en espera y del tiempo que esperan.
+Con YTDL_PROCESSES > 0 la extracción va además a un pool de procesos
+(`ProcessExecutor`), fuera del GIL del event loop.
+"""
+import asyncio
+import logging
+import multiprocessing
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from config.settings import YTDL_WORKERS, TTS_WORKERS, MIXER_WORKERS
+
+log = logging.getLogger('kaivoxx.executors')
+
+
+class BoundedExecutor:
+    def __init__(self, name: str, max_workers: int):
+        self.name = name
+        self.max_workers = max_workers
+        self._pool = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix=f"kaivoxx-{name}")
+        self._lock = threading.Lock()
+        self.queued = 0
+        self.running = 0
+        self.completed = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+        self.last_wait = 0.0
+
+    def _wrap(self, fn, args, submitted: float):
+        def _call():
+            waited = time.monotonic() - submitted
+            with self._lock:
+                self.queued -= 1
+                self.running += 1
+                self.wait_total += waited
+                self.last_wait = waited
+                if waited > self.wait_max:
+                    self.wait_max = waited
+            try:
+                return fn(*args)
+            finally:
+                with self._lock:
+                    self.running -= 1
+                    self.completed += 1
+        return _call
+
+    async def run(self, fn, *args):
+        with self._lock:
+            self.queued += 1
+        call = self._wrap(fn, args, time.monotonic())
+        return await asyncio.get_running_loop().run_in_executor(self._pool, call)
+
+    def stats(self) -> dict:
+        with self._lock:
+            started = self.completed + self.running
+            return {
+                "workers": self.max_workers,
+                "queued": self.queued,
+                "running": self.running,
+                "completed": self.completed,
+                "wait_avg": self.wait_total / started if started else 0.0,
+                "wait_max": self.wait_max,
+                "wait_last": self.last_wait,
+            }
+
+    def shutdown(self):
+        self._pool.shutdown(wait=False, cancel_futures=True)
+
+
+class ProcessExecutor:
+    """
+    Pool de procesos con la misma interfaz que BoundedExecutor (`run`, `stats`).
+
+    Se crea al primer uso (o con `warm`), con `spawn`: cada worker importa solo lo
+    que necesita la función que ejecuta, y su `initializer` deja preparado el
+    estado caro (p. ej. un YoutubeDL con cookies); `initargs` puede ser una
+    función que los devuelva, evaluada al crear el pool. Cada worker se recicla tras
+    `max_tasks_per_child` trabajos para acotar lo que crece su memoria. Solo
+    sabemos cuántas tareas hay en vuelo, no cuánto esperó cada una.
+    """
+
+    def __init__(self, name: str, max_workers: int, max_tasks_per_child: int = None,
+                 initializer=None, initargs=()):
+        self.name = name
+        self.max_workers = max_workers
+        self.max_tasks_per_child = max_tasks_per_child
+        self.initializer = initializer
+        self.initargs = initargs
+        self._pool = None
+        self._lock = threading.Lock()
+        self.in_flight = 0
+        self.completed = 0
+        self.broken = 0
+
+    def _get_pool(self) -> ProcessPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                kwargs = {}
+                initargs = self.initargs() if callable(self.initargs) else self.initargs
+                if self.max_tasks_per_child and sys.version_info >= (3, 11):
+                    kwargs['max_tasks_per_child'] = self.max_tasks_per_child
+                self._pool = ProcessPoolExecutor(
+                    max_workers=self.max_workers, mp_context=multiprocessing.get_context('spawn'),
+                    initializer=self.initializer, initargs=initargs, **kwargs,
+                )
+            return self._pool
+
+    def _discard(self, pool):
+        with self._lock:
+            if self._pool is pool:
+                self._pool = None
+                self.broken += 1
+        pool.shutdown(wait=False, cancel_futures=True)
+
+    async def run(self, fn, *args):
+        with self._lock:
+            self.in_flight += 1
+        try:
+            for attempt in (1, 2):
+                pool = self._get_pool()
+                try:
+                    return await asyncio.wrap_future(pool.submit(fn, *args))
+                except BrokenProcessPool:
+                    # un worker murió (OOM, señal): se rehace el pool y se reintenta una vez
+                    log.warning(f"Pool de procesos '{self.name}' roto, se recrea")
+                    self._discard(pool)
+                    if attempt == 2:
+                        raise
+        finally:
+            with self._lock:
+                self.in_flight -= 1
+                self.completed += 1
+
+    async def warm(self, fn):
+        """Arranca todos los workers ya (initializer incluido) en vez de en la primera petición."""
+        await asyncio.gather(*(self.run(fn) for _ in range(self.max_workers)))
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "workers": self.max_workers,
+                "queued": max(0, self.in_flight - self.max_workers),
+                "running": min(self.in_flight, self.max_workers),
+                "completed": self.completed,
+                "broken": self.broken,
+            }
+
+    def shutdown(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool:
+            pool.shutdown(wait=False, cancel_futures=True)
+
+
+ytdl_executor = BoundedExecutor("ytdl", YTDL_WORKERS)
+tts_executor = BoundedExecutor("tts", TTS_WORKERS)
+snapshot_executor = BoundedExecutor("snapshot", 1)
+mixer_executor = BoundedExecutor("mixer", MIXER_WORKERS)
+audio_cache_executor = BoundedExecutor("audio_cache", 1)
+
+
+# los que se exponen en /metrics; register_executor añade los opcionales
+_executors = [ytdl_executor, tts_executor, snapshot_executor, mixer_executor, audio_cache_executor]
+
+
+def register_executor(executor):
+    _executors.append(executor)
+
+
+def executor_stats() -> dict:
+    return {ex.name: ex.stats() for ex in _executors}
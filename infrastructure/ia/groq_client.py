@@ -1,37 +1,243 @@
-import requests
-from config.settings import SYSTEM_PROMPT, GROQ_API_URL
+import asyncio
+import contextlib
+import json
+import random
+import time
+import weakref
+from typing import Tuple
+import aiohttp
+from config.settings import (
+    SYSTEM_PROMPT, GROQ_API_URL, GROQ_TIMEOUT, GROQ_MAX_RETRIES,
+    GROQ_MAX_CONCURRENCY, GROQ_GUILD_CONCURRENCY,
+)
+from infrastructure.ia.history import ConversationHistory
+from infrastructure.persistence.snapshot_store import snapshot_store
+from infrastructure.metrics import groq_seconds
 import os
 import logging
 
 log = logging.getLogger('kaivoxx.groq')
 conversation_history = {}
+# canales cuyo historial ya se buscó en el snapshot / se recuperó de él
+_history_checked = set()
+restored_histories = set()
 
-def add_to_history(context_key: str, role: str, content: str, max_len: int = 10):
-    history = conversation_history.setdefault(context_key, [])
-    if not history:
-        history.append({"role": "system", "content": SYSTEM_PROMPT})
-    history.append({"role": role, "content": content})
-    conversation_history[context_key] = history[-max_len:]
+RETRY_STATUSES = {429, 500, 502, 503, 504}
 
-def groq_chat_response(context_key: str, user_prompt: str):
-    add_to_history(context_key, "user", user_prompt)
+
+class GroqError(RuntimeError):
+    pass
+
+
+def retry_delay(attempt: int, retry_after=None, base: float = 0.5, cap: float = 8.0) -> float:
+    """Backoff exponencial con jitter completo; si el servidor manda Retry-After, manda él."""
+    if retry_after is not None:
+        try:
+            return max(0.0, float(retry_after))
+        except (TypeError, ValueError):
+            pass
+    return random.uniform(0, min(cap, base * (2 ** attempt)))
+
+
+class GroqClient:
+    """
+    Cliente asyncio para la API de Groq (compatible OpenAI).
+
+    Mantiene una sesión aiohttp con keep-alive, limita la concurrencia global y
+    por guild, y reintenta 429/5xx con backoff respetando `Retry-After`.
+    """
+
+    def __init__(self, api_url: str, timeout: float = 20, max_retries: int = 3,
+                 max_concurrency: int = 8, guild_concurrency: int = 2,
+                 base_delay: float = 0.5, max_delay: float = 8.0):
+        self.api_url = api_url
+        self.timeout = timeout
+        self.max_retries = max_retries
+        self.guild_concurrency = guild_concurrency
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self._global = asyncio.Semaphore(max_concurrency)
+        # se liberan solos cuando ninguna petición de esa guild los usa
+        self._guild_sems = weakref.WeakValueDictionary()
+        self._session = None
+
+    def _guild_semaphore(self, guild_id):
+        sem = self._guild_sems.get(guild_id)
+        if sem is None:
+            sem = asyncio.Semaphore(self.guild_concurrency)
+            self._guild_sems[guild_id] = sem
+        return sem
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(limit=0, keepalive_timeout=60)
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.timeout),
+            )
+        return self._session
+
+    def _headers(self):
+        return {"Authorization": f"Bearer {os.environ.get('GROQ_API_KEY')}", "Content-Type": "application/json"}
+
+    @contextlib.asynccontextmanager
+    async def _request(self, payload: dict, timeout: aiohttp.ClientTimeout = None):
+        """Hace el POST reintentando 429/5xx y errores de conexión; entrega la respuesta buena."""
+        session = self._get_session()
+        started = time.perf_counter()
+        kwargs = {"timeout": timeout} if timeout else {}
+        for attempt in range(self.max_retries + 1):
+            retry_after = None
+            try:
+                resp = await session.post(self.api_url, headers=self._headers(), json=payload, **kwargs)
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                error = e
+            else:
+                if resp.status not in RETRY_STATUSES:
+                    groq_seconds.observe(time.perf_counter() - started)
+                    try:
+                        resp.raise_for_status()
+                        yield resp
+                    finally:
+                        resp.release()
+                    return
+                retry_after = resp.headers.get("Retry-After")
+                error = GroqError(f"Groq respondió {resp.status}")
+                resp.release()
+            if attempt == self.max_retries:
+                raise error
+            delay = min(retry_delay(attempt, retry_after, self.base_delay, self.max_delay), self.timeout)
+            log.warning(f"Groq: reintento {attempt + 1}/{self.max_retries} en {delay:.2f}s ({error})")
+            await asyncio.sleep(delay)
+
+    async def chat(self, payload: dict, guild_id=None) -> dict:
+        async with self._guild_semaphore(guild_id), self._global:
+            async with self._request(payload) as resp:
+                return await resp.json()
+
+    async def stream_chat(self, payload: dict, guild_id=None):
+        """
+        Igual que `chat` pero con `stream: true`: va entregando los trozos de texto
+        del SSE según llegan. Solo se reintenta antes de empezar a recibir.
+        Sin tope total: una respuesta larga pero viva no se corta; lo que se
+        limita es conectar y el silencio entre trozos.
+        """
+        payload = dict(payload, stream=True)
+        timeout = aiohttp.ClientTimeout(total=None, sock_connect=self.timeout, sock_read=self.timeout)
+        async with self._guild_semaphore(guild_id), self._global:
+            async with self._request(payload, timeout) as resp:
+                async for piece in iter_sse_deltas(resp.content):
+                    yield piece
+
+    async def close(self):
+        if self._session and not self._session.closed:
+            await self._session.close()
+
+
+async def iter_sse_deltas(lines):
+    """Parsea un stream SSE estilo OpenAI y devuelve el texto de cada `delta`."""
+    async for raw in lines:
+        line = raw.decode("utf-8", "replace").strip() if isinstance(raw, bytes) else raw.strip()
+        if not line.startswith("data:"):
+            continue
+        data = line[len("data:"):].strip()
+        if data == "[DONE]":
+            return
+        try:
+            chunk = json.loads(data)
+        except ValueError:
+            log.warning(f"Groq stream: línea SSE inválida: {data[:80]}")
+            continue
+        for choice in chunk.get("choices") or []:
+            piece = (choice.get("delta") or {}).get("content")
+            if piece:
+                yield piece
+
+
+groq_client = GroqClient(
+    GROQ_API_URL,
+    timeout=GROQ_TIMEOUT,
+    max_retries=GROQ_MAX_RETRIES,
+    max_concurrency=GROQ_MAX_CONCURRENCY,
+    guild_concurrency=GROQ_GUILD_CONCURRENCY,
+)
+
+
+async def load_history(context_key: str):
+    """Recupera del snapshot el historial del canal la primera vez que se usa."""
+    if not snapshot_store.enabled or context_key in conversation_history or context_key in _history_checked:
+        return
+    _history_checked.add(context_key)
+    data = await snapshot_store.load_history(context_key)
+    if data and context_key not in conversation_history:
+        conversation_history[context_key] = ConversationHistory.from_snapshot(data)
+        restored_histories.add(context_key)
+
+def add_to_history(context_key: str, role: str, content: str):
+    history = conversation_history.get(context_key)
+    if history is None:
+        history = conversation_history[context_key] = ConversationHistory()
+    history.add(role, content)
+
+def _build_payload(context_key: str, pending_prompt: str = None) -> dict:
     messages = [{"role": "system", "content": SYSTEM_PROMPT}]
-    for msg in conversation_history.get(context_key, []):
-        if msg["role"] in ("user","assistant"):
-            messages.append(msg)
-    payload = {
+    history = conversation_history.get(context_key)
+    if history is not None:
+        messages.extend(history.as_messages())
+    if pending_prompt is not None:
+        messages.append({"role": "user", "content": pending_prompt})
+    return {
         "model": "llama-3.1-8b-instant",
         "messages": messages,
         "temperature": 0.6,
         "max_tokens": 300
     }
-    headers = {"Authorization": f"Bearer {os.environ.get('GROQ_API_KEY')}", "Content-Type": "application/json"}
+
+IA_ERROR_REPLY = "❌ Tuve un problema pensando… inténtalo otra vez 💜"
+
+async def groq_chat_response(context_key: str, user_prompt: str, guild_id=None):
+    return (await groq_chat_reply(context_key, user_prompt, guild_id=guild_id))[0]
+
+async def groq_chat_reply(context_key: str, user_prompt: str, guild_id=None) -> Tuple[str, bool]:
+    """Como `groq_chat_response`, pero dice si salió bien: (texto, False) si se devuelve el aviso de error."""
+    await load_history(context_key)
+    add_to_history(context_key, "user", user_prompt)
+    payload = _build_payload(context_key)
     try:
-        response = requests.post(GROQ_API_URL, headers=headers, json=payload, timeout=20)
-        response.raise_for_status()
-        content = response.json()["choices"][0]["message"]["content"].strip()
+        data = await groq_client.chat(payload, guild_id=guild_id)
+        content = data["choices"][0]["message"]["content"].strip()
         add_to_history(context_key, "assistant", content)
-        return content
+        return content, True
     except Exception:
         log.exception("Error Groq IA")
-        return "❌ Tuve un problema pensando… inténtalo otra vez 💜"
+        return IA_ERROR_REPLY, False
+
+STREAM_CUT_NOTICE = "\n\n⚠️ *Se cortó la respuesta a medias… inténtalo otra vez 💜*"
+
+async def groq_chat_stream(context_key: str, user_prompt: str, guild_id=None, outcome: dict = None):
+    """
+    Versión en streaming de `groq_chat_response`: entrega el texto por trozos.
+    El historial (pregunta y respuesta) solo se guarda si el stream termina bien;
+    si se corta a medias, el último trozo es un aviso para que no parezca completa.
+    Como un generador no devuelve nada, el fallo se anota en `outcome["ok"]`.
+    """
+    await load_history(context_key)
+    payload = _build_payload(context_key, pending_prompt=user_prompt)
+    parts = []
+    try:
+        async for piece in groq_client.stream_chat(payload, guild_id=guild_id):
+            parts.append(piece)
+            yield piece
+    except Exception:
+        log.exception("Error Groq IA (stream)")
+        if outcome is not None:
+            outcome["ok"] = False
+        if not parts:
+            yield IA_ERROR_REPLY
+        else:
+            yield STREAM_CUT_NOTICE
+        return
+    content = "".join(parts).strip()
+    if content:
+        add_to_history(context_key, "user", user_prompt)
+        add_to_history(context_key, "assistant", content)
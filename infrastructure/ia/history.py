@@ -0,0 +1,92 @@
+"""
+Historial de conversación acotado por tokens.
+
+En vez de guardar los últimos N mensajes (que pueden ser enormes), cada canal
+tiene un presupuesto de tokens. Cuando se supera, los turnos más antiguos se
+compactan en un resumen corto que viaja como mensaje de sistema.
+"""
+import re
+from collections import deque
+from config.settings import HISTORY_TOKEN_BUDGET, HISTORY_SUMMARY_TOKENS
+
+MESSAGE_OVERHEAD = 4  # tokens de rol/separadores que añade el formato chat
+SUMMARY_LINE_CHARS = 160
+_SENTENCE_END = re.compile(r"(?<=[.!?…])\s")
+
+ROLE_NAMES = {"user": "Usuario", "assistant": "Kaivoxx"}
+
+
+def estimate_tokens(text: str) -> int:
+    """Aproximación barata (~4 caracteres por token) sin cargar un tokenizer."""
+    return MESSAGE_OVERHEAD + (len(text) + 3) // 4
+
+
+def _summary_line(role: str, content: str) -> str:
+    first = _SENTENCE_END.split(" ".join(content.split()), 1)[0]
+    if len(first) > SUMMARY_LINE_CHARS:
+        first = first[:SUMMARY_LINE_CHARS - 1].rstrip() + "…"
+    return f"- {ROLE_NAMES.get(role, role)}: {first}"
+
+
+class ConversationHistory:
+    def __init__(self, budget: int = HISTORY_TOKEN_BUDGET, summary_budget: int = HISTORY_SUMMARY_TOKENS):
+        self.budget = budget
+        self.summary_budget = summary_budget
+        self._turns = deque()      # (mensaje, tokens)
+        self._summary = deque()    # (línea, tokens)
+        self.tokens = 0
+        self.summary_tokens = 0
+        self.version = 0
+        self.saved_version = None  # versión ya guardada en snapshot, si la hay
+
+    def add(self, role: str, content: str):
+        tokens = estimate_tokens(content)
+        self._turns.append(({"role": role, "content": content}, tokens))
+        self.tokens += tokens
+        self._compact()
+        self.version += 1
+
+    def _compact(self):
+        # siempre se conserva el último turno aunque por sí solo supere el presupuesto
+        while self.tokens + self.summary_tokens > self.budget and len(self._turns) > 1:
+            msg, tokens = self._turns.popleft()
+            self.tokens -= tokens
+            line = _summary_line(msg["role"], msg["content"])
+            line_tokens = estimate_tokens(line) - MESSAGE_OVERHEAD
+            self._summary.append((line, line_tokens))
+            self.summary_tokens += line_tokens
+            while self.summary_tokens > self.summary_budget and self._summary:
+                _, dropped = self._summary.popleft()
+                self.summary_tokens -= dropped
+
+    @property
+    def summary(self) -> str:
+        return "\n".join(line for line, _ in self._summary)
+
+    def as_messages(self) -> list:
+        messages = []
+        if self._summary:
+            messages.append({"role": "system", "content": f"Resumen de lo hablado antes:\n{self.summary}"})
+        messages.extend(msg for msg, _ in self._turns)
+        return messages
+
+    def to_snapshot(self) -> dict:
+        return {"turns": [[msg, tokens] for msg, tokens in self._turns],
+                "summary": [[line, tokens] for line, tokens in self._summary]}
+
+    @classmethod
+    def from_snapshot(cls, data: dict) -> "ConversationHistory":
+        history = cls()
+        for msg, tokens in data.get("turns", []):
+            history._turns.append((msg, tokens))
+            history.tokens += tokens
+        for line, tokens in data.get("summary", []):
+            history._summary.append((line, tokens))
+            history.summary_tokens += tokens
+        # por si el presupuesto configurado bajó desde que se guardó
+        history._compact()
+        history.saved_version = history.version
+        return history
+
+    def __len__(self):
+        return len(self._turns)
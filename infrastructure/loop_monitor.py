@@ -0,0 +1,67 @@
+"""
+Vigilancia del event loop.
+
+Una tarea del loop duerme `interval` y anota cuánto tarda de más en despertar
+(histograma `kaivoxx_event_loop_lag_seconds`). Un hilo aparte mira el último
+latido: si el loop lleva más de `interval + threshold` sin latir, algo lo está
+bloqueando y se registra la pila actual del hilo del loop, una vez por bloqueo.
+En reposo cuesta un despertar por intervalo en cada lado.
+"""
+import asyncio
+import logging
+import sys
+import threading
+import time
+import traceback
+from typing import Optional
+from infrastructure.metrics import Histogram, loop_lag_seconds
+
+log = logging.getLogger('kaivoxx.loop')
+
+
+class LoopMonitor:
+    def __init__(self, interval: float = 0.25, threshold: float = 0.25, histogram: Histogram = loop_lag_seconds):
+        self.interval = interval
+        self.threshold = threshold
+        self.histogram = histogram
+        self.stalls = 0
+        self.last_stall_stack: Optional[str] = None
+        self._last_beat = time.perf_counter()
+        self._loop_thread: Optional[int] = None
+        self._reported = False
+        self._task: Optional[asyncio.Task] = None
+        self._stop = threading.Event()
+
+    async def _heartbeat(self):
+        while True:
+            start = time.perf_counter()
+            self._last_beat = start
+            self._reported = False
+            await asyncio.sleep(self.interval)
+            self.histogram.observe(max(0.0, time.perf_counter() - start - self.interval))
+
+    def _watch(self):
+        while not self._stop.wait(self.interval):
+            blocked = time.perf_counter() - self._last_beat
+            if blocked <= self.interval + self.threshold or self._reported:
+                continue
+            self._reported = True
+            self.stalls += 1
+            frame = sys._current_frames().get(self._loop_thread)
+            self.last_stall_stack = "".join(traceback.format_stack(frame)) if frame else "(sin pila)"
+            log.warning(f"Event loop bloqueado {blocked:.2f}s; pila del loop:\n{self.last_stall_stack}")
+
+    def start(self):
+        """Se llama desde el loop. Idempotente."""
+        if self._task and not self._task.done():
+            return
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.perf_counter()
+        self._stop.clear()
+        self._task = asyncio.get_running_loop().create_task(self._heartbeat())
+        threading.Thread(target=self._watch, name="kaivoxx-loop-watchdog", daemon=True).start()
+
+    def stop(self):
+        self._stop.set()
+        if self._task:
+            self._task.cancel()
@@ -0,0 +1,111 @@
+"""
+Métricas en formato de texto de Prometheus, sin dependencias.
+
+Los histogramas tienen cubetas fijas: observar es un bisect y tres sumas bajo un
+lock sin contención, así que se puede llamar en cada operación del camino
+caliente (también desde los hilos de los executors). Los gauges no se
+actualizan: se calculan con una función al pedir /metrics.
+"""
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from typing import Callable, Dict, Union
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0)
+
+
+class Histogram:
+    def __init__(self, name: str, help: str, buckets=DEFAULT_BUCKETS):
+        self.name = name
+        self.help = help
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)
+        self._sum = 0.0
+        self._lock = threading.Lock()
+
+    def observe(self, value: float):
+        i = bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[i] += 1
+            self._sum += value
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    @property
+    def count(self) -> int:
+        return sum(self._counts)
+
+    def render(self) -> str:
+        with self._lock:
+            counts, total = list(self._counts), self._sum
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} histogram"]
+        cumulative = 0
+        for bound, n in zip(self.buckets, counts):
+            cumulative += n
+            lines.append(f'{self.name}_bucket{{le="{bound}"}} {cumulative}')
+        cumulative += counts[-1]
+        lines.append(f'{self.name}_bucket{{le="+Inf"}} {cumulative}')
+        lines.append(f"{self.name}_sum {total}")
+        lines.append(f"{self.name}_count {cumulative}")
+        return "\n".join(lines)
+
+
+GaugeValue = Union[float, Dict[str, float]]
+
+
+class Gauge:
+    """`fn` devuelve un número, o {valor_de_etiqueta: número} si se indica `label`."""
+
+    def __init__(self, name: str, help: str, fn: Callable[[], GaugeValue], label: str = None):
+        self.name = name
+        self.help = help
+        self.fn = fn
+        self.label = label
+
+    def render(self) -> str:
+        lines = [f"# HELP {self.name} {self.help}", f"# TYPE {self.name} gauge"]
+        value = self.fn()
+        if self.label:
+            for key, v in value.items():
+                lines.append(f'{self.name}{{{self.label}="{key}"}} {v}')
+        else:
+            lines.append(f"{self.name} {value}")
+        return "\n".join(lines)
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}
+
+    def histogram(self, name: str, help: str, buckets=DEFAULT_BUCKETS) -> Histogram:
+        return self._metrics.setdefault(name, Histogram(name, help, buckets))
+
+    def gauge(self, name: str, help: str, fn: Callable[[], GaugeValue], label: str = None) -> Gauge:
+        gauge = self._metrics[name] = Gauge(name, help, fn, label)
+        return gauge
+
+    def render(self) -> str:
+        return "\n".join(m.render() for m in self._metrics.values()) + "\n"
+
+
+registry = Registry()
+
+ytdl_seconds = registry.histogram("kaivoxx_ytdlp_extract_seconds", "Duración de cada extracción de yt-dlp")
+groq_seconds = registry.histogram("kaivoxx_groq_latency_seconds", "Tiempo hasta la respuesta de Groq (reintentos incluidos)")
+tts_seconds = registry.histogram("kaivoxx_tts_synthesis_seconds", "Duración de cada síntesis de gTTS")
+ffmpeg_seconds = registry.histogram(
+    "kaivoxx_ffmpeg_source_build_seconds", "Tiempo en crear la fuente FFmpeg",
+    buckets=(0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0),
+)
+discord_rest_seconds = registry.histogram("kaivoxx_discord_rest_seconds", "Latencia de las peticiones REST a Discord")
+loop_lag_seconds = registry.histogram(
+    "kaivoxx_event_loop_lag_seconds", "Retraso del event loop sobre el intervalo esperado",
+    buckets=(0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0),
+)
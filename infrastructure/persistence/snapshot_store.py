@@ -0,0 +1,108 @@
+"""
+Snapshots en SQLite para sobrevivir a reinicios y redeploys.
+
+Guarda por guild la cola, la canción actual y su posición, por canal el
+historial de IA, y la cache de búsquedas de YouTube, como JSON. Todo el acceso a SQLite pasa por un único hilo
+(`snapshot_executor`), así que el event loop nunca toca disco y la conexión no
+se comparte entre hilos. Quien escribe manda lotes ya agrupados (`write`): la
+agrupación y el ritmo de volcado los decide `integration/snapshots.py`.
+"""
+import json
+import logging
+import sqlite3
+import threading
+import time
+from typing import Dict, Optional
+from config.settings import SNAPSHOT_DB
+from infrastructure.executors import BoundedExecutor, snapshot_executor
+
+log = logging.getLogger('kaivoxx.snapshots')
+
+_SCHEMA = (
+    "CREATE TABLE IF NOT EXISTS guild_state (guild_id INTEGER PRIMARY KEY, data TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS chat_history (context_key TEXT PRIMARY KEY, data TEXT NOT NULL)",
+    "CREATE TABLE IF NOT EXISTS search_cache (query TEXT PRIMARY KEY, data TEXT NOT NULL, updated REAL NOT NULL)",
+)
+
+
+class SnapshotStore:
+    def __init__(self, path: str, executor: BoundedExecutor = snapshot_executor):
+        self.path = path
+        self.executor = executor
+        self._local = threading.local()
+        self.writes = 0
+
+    @property
+    def enabled(self) -> bool:
+        return bool(self.path)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            for stmt in _SCHEMA:
+                conn.execute(stmt)
+            conn.commit()
+        return conn
+
+    def _load(self, table: str, column: str, key) -> Optional[dict]:
+        row = self._conn().execute(f"SELECT data FROM {table} WHERE {column} = ?", (key,)).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def _write(self, guilds: Dict[int, Optional[dict]], histories: Dict[str, Optional[dict]]):
+        conn = self._conn()
+        with conn:
+            for table, column, items in (("guild_state", "guild_id", guilds), ("chat_history", "context_key", histories)):
+                deletes = [(k,) for k, v in items.items() if v is None]
+                upserts = [(k, json.dumps(v, separators=(',', ':'))) for k, v in items.items() if v is not None]
+                if deletes:
+                    conn.executemany(f"DELETE FROM {table} WHERE {column} = ?", deletes)
+                if upserts:
+                    conn.executemany(f"INSERT OR REPLACE INTO {table} ({column}, data) VALUES (?, ?)", upserts)
+        self.writes += 1
+
+    def _write_searches(self, entries: Dict[str, dict], keep: int):
+        conn = self._conn()
+        now = time.time()
+        with conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO search_cache (query, data, updated) VALUES (?, ?, ?)",
+                [(k, json.dumps(v, separators=(',', ':')), now) for k, v in entries.items()],
+            )
+            conn.execute(
+                "DELETE FROM search_cache WHERE query NOT IN "
+                "(SELECT query FROM search_cache ORDER BY updated DESC LIMIT ?)", (keep,)
+            )
+        self.writes += 1
+
+    async def load_guild(self, guild_id: int) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        return await self.executor.run(self._load, "guild_state", "guild_id", guild_id)
+
+    async def load_history(self, context_key: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        return await self.executor.run(self._load, "chat_history", "context_key", context_key)
+
+    async def load_search(self, query: str) -> Optional[dict]:
+        if not self.enabled:
+            return None
+        return await self.executor.run(self._load, "search_cache", "query", query)
+
+    async def write_searches(self, entries: Dict[str, dict], keep: int):
+        """Guarda búsquedas resueltas y recorta la tabla a las `keep` más recientes."""
+        if not self.enabled or not entries:
+            return
+        await self.executor.run(self._write_searches, entries, keep)
+
+    async def write(self, guilds: Dict[int, Optional[dict]], histories: Dict[str, Optional[dict]]):
+        """Vuelca un lote en una sola transacción. Un valor None borra la fila."""
+        if not self.enabled or not (guilds or histories):
+            return
+        await self.executor.run(self._write, guilds, histories)
+
+
+snapshot_store = SnapshotStore(SNAPSHOT_DB)
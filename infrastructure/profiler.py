@@ -0,0 +1,66 @@
+"""
+Perfilado por muestreo del proceso entero.
+
+Un hilo toma `sys._current_frames()` cada `interval` segundos durante la ventana
+pedida y cuenta las pilas en formato "folded" (`hilo;f1;f2;f3 N`), el que leen
+flamegraph.pl, speedscope o inferno. Mientras no se perfila no hay coste.
+"""
+import asyncio
+import os
+import sys
+import threading
+import time
+from collections import Counter
+
+
+def _frame_label(frame) -> str:
+    code = frame.f_code
+    return f"{code.co_name} ({os.path.basename(code.co_filename)}:{frame.f_lineno})".replace(";", ":")
+
+
+def sample_stacks(seconds: float, interval: float = 0.005) -> Counter:
+    """Bloqueante: muestrea todos los hilos salvo el propio."""
+    me = threading.get_ident()
+    names = {}
+    stacks = Counter()
+    deadline = time.perf_counter() + seconds
+    while time.perf_counter() < deadline:
+        if len(names) != threading.active_count():
+            names = {t.ident: t.name for t in threading.enumerate()}
+        for ident, frame in sys._current_frames().items():
+            if ident == me:
+                continue
+            labels = []
+            while frame is not None:
+                labels.append(_frame_label(frame))
+                frame = frame.f_back
+            labels.append(names.get(ident, str(ident)).replace(";", ":"))
+            stacks[";".join(reversed(labels))] += 1
+        time.sleep(interval)
+    return stacks
+
+
+def write_folded(stacks: Counter, path: str) -> str:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    with open(path, "w", encoding="utf-8") as f:
+        for stack, count in stacks.most_common():
+            f.write(f"{stack} {count}\n")
+    return path
+
+
+async def profile_to_file(seconds: float, directory: str, interval: float = 0.005) -> str:
+    """Perfila `seconds` en un hilo propio (el loop sigue libre) y devuelve la ruta del fichero."""
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+    path = os.path.join(directory, time.strftime("profile-%Y%m%d-%H%M%S.folded"))
+
+    def _run():
+        try:
+            result = write_folded(sample_stacks(seconds, interval), path)
+        except Exception as e:
+            loop.call_soon_threadsafe(done.set_exception, e)
+        else:
+            loop.call_soon_threadsafe(done.set_result, result)
+
+    threading.Thread(target=_run, name="kaivoxx-profiler", daemon=True).start()
+    return await done
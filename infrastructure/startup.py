@@ -0,0 +1,66 @@
+"""
+Tiempos de arranque del proceso, por fase, hasta que el gateway está listo.
+
+`main.py` importa este módulo lo primero, así que el origen es (casi) el
+arranque del intérprete. Las fases se marcan una sola vez: on_ready se repite
+en cada reconexión y solo interesa la primera. El desglose de imports (qué
+módulo cuesta cuánto) lo da `tests/bench/startup_report.py`.
+"""
+import json
+import logging
+import sys
+import time
+from typing import Dict, List, Tuple
+
+log = logging.getLogger('kaivoxx.startup')
+
+# Dependencias pesadas que deberían cargarse después de conectar, no antes
+DEFERRED_MODULES = ('yt_dlp', 'gtts', 'numpy')
+
+
+class StartupTimer:
+    def __init__(self, clock=time.perf_counter):
+        self._clock = clock
+        self.origin = clock()
+        self.marks: List[Tuple[str, float]] = []
+        self.loaded_at_ready: Dict[str, bool] = {}
+
+    def mark(self, phase: str) -> bool:
+        if any(name == phase for name, _ in self.marks):
+            return False
+        self.marks.append((phase, self._clock() - self.origin))
+        if phase == "ready":
+            self.loaded_at_ready = {m: m in sys.modules for m in DEFERRED_MODULES}
+        return True
+
+    def phases(self) -> Dict[str, float]:
+        """Segundos que duró cada fase (desde la marca anterior)."""
+        out, previous = {}, 0.0
+        for name, at in self.marks:
+            out[name] = at - previous
+            previous = at
+        return out
+
+    def report(self) -> dict:
+        return {
+            "total": self.marks[-1][1] if self.marks else 0.0,
+            "phases": {k: round(v, 4) for k, v in self.phases().items()},
+            "loaded_at_ready": dict(self.loaded_at_ready),
+        }
+
+    def log_report(self, path: str = ""):
+        report = self.report()
+        phases = ", ".join(f"{k}={v * 1000:.0f}ms" for k, v in report["phases"].items())
+        early = [m for m, loaded in report["loaded_at_ready"].items() if loaded]
+        log.info(f"Arranque en {report['total']:.2f}s ({phases})"
+                 + (f"; ya cargados al conectar: {', '.join(early)}" if early else ""))
+        if path:
+            try:
+                with open(path, "w", encoding="utf-8") as f:
+                    json.dump(report, f, indent=2)
+            except OSError as e:
+                log.warning(f"No se pudo escribir el informe de arranque en {path}: {e}")
+        return report
+
+
+startup_timer = StartupTimer()
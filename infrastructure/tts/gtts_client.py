@@ -1,13 +1,43 @@
 import io
-import os
 import asyncio
 import logging
-import uuid
-from gtts import gTTS
 import discord
-from config.settings import MAX_TTS_CHARS, TTS_LANGUAGE
+from config.settings import MAX_TTS_CHARS, TTS_LANGUAGE, TTS_CACHE_BYTES
+from infrastructure.executors import tts_executor
+from infrastructure.metrics import tts_seconds
+from infrastructure.tts.tts_cache import TTSCache, tts_cache_key
+from infrastructure.audio.mixer import MixerSource, ensure_mixer
+from integration import recovery
 
 log = logging.getLogger('kaivoxx.tts')
+tts_cache = TTSCache(TTS_CACHE_BYTES)
+
+
+def _synthesize(text: str) -> bytes:
+    # gtts (y con él requests) se carga con la primera síntesis, no al arrancar
+    from gtts import gTTS
+    buf = io.BytesIO()
+    gTTS(text=text, lang=TTS_LANGUAGE, slow=False).write_to_fp(buf)
+    return buf.getvalue()
+
+
+async def _speak_over_music(mixer: MixerSource, audio: bytes) -> bool:
+    """Habla encima de la canción (con ducking) sin pararla ni relanzar su FFmpeg."""
+    loop = asyncio.get_running_loop()
+    done = loop.create_future()
+
+    def _after(err):
+        if err:
+            log.error(f"TTS playback error: {err}")
+        loop.call_soon_threadsafe(lambda: done.done() or done.set_result(err is None))
+
+    try:
+        voice = discord.FFmpegPCMAudio(io.BytesIO(audio), pipe=True)
+    except Exception:
+        log.exception("Error preparando el TTS para mezclar")
+        return False
+    mixer.play_overlay(voice, after=_after)
+    return await done
 
 
 async def speak_text_in_voice(vc: discord.VoiceClient, text: str):
@@ -21,30 +51,35 @@ async def speak_text_in_voice(vc: discord.VoiceClient, text: str):
 
     clean_text = text.replace("*", "").replace("_", "").replace("`", "")
 
+    key = tts_cache_key(clean_text, TTS_LANGUAGE)
+
     def _generate_audio():
-        buf = io.BytesIO()
         try:
-            gTTS(text=clean_text, lang=TTS_LANGUAGE, slow=False).write_to_fp(buf)
-            buf.seek(0)
-            return buf
+            with tts_seconds.time():
+                return _synthesize(clean_text)
         except Exception:
             log.exception('Error generando TTS')
             raise
 
-    try:
-        audio_buf = await asyncio.to_thread(_generate_audio)
-    except Exception:
-        return False
+    audio = tts_cache.get(key)
+    if audio is None:
+        try:
+            audio = await tts_executor.run(_generate_audio)
+        except Exception:
+            return False
+        tts_cache.put(key, audio)
 
-    # nombre temporal único para evitar colisiones si hay TTS concurrentes
-    temp_path = f"tts_{vc.guild.id}_{uuid.uuid4().hex}.mp3"
+    mixer = await ensure_mixer(vc.source) if vc.is_playing() else None
+    if mixer is not None:
+        return await _speak_over_music(mixer, audio)
 
+    held = False
     try:
-        with open(temp_path, 'wb') as f:
-            f.write(audio_buf.read())
-
         # Si hay reproducción activa, detenemos la fuente actual y aguardamos que termine.
         if vc.is_playing():
+            # la canción se retoma desde donde iba cuando acabe la voz
+            recovery.hold(vc.guild.id)
+            held = True
             try:
                 vc.stop()
             except Exception:
@@ -57,28 +92,19 @@ async def speak_text_in_voice(vc: discord.VoiceClient, text: str):
             else:
                 log.warning("La reproducción previa no terminó tras stop(); procedo de todos modos")
 
-        # función clara para el callback after
         def _after_play(err):
             if err:
-                log.exception(f"TTS playback error: {err}")
-            try:
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
-            except Exception:
-                log.exception("No se pudo borrar el archivo TTS tras reproducción")
+                log.error(f"TTS playback error: {err}")
 
-        source = discord.FFmpegOpusAudio(temp_path)
+        # el MP3 se le pasa a ffmpeg por stdin desde memoria, sin archivos temporales
+        source = discord.FFmpegOpusAudio(io.BytesIO(audio), pipe=True)
 
         try:
             vc.play(source, after=_after_play)
         except Exception:
             # puede ocurrir Already playing audio si la voz no terminó de limpiarse
             log.exception("Error al iniciar la reproducción del TTS (vc.play)")
-            try:
-                if os.path.exists(temp_path):
-                    os.remove(temp_path)
-            except Exception:
-                pass
+            source.cleanup()
             return False
 
         while vc.is_playing() or vc.is_paused():
@@ -88,9 +114,10 @@ async def speak_text_in_voice(vc: discord.VoiceClient, text: str):
 
     except Exception:
         log.exception('Error reproduciendo TTS')
-        try:
-            if os.path.exists(temp_path):
-                os.remove(temp_path)
-        except Exception:
-            pass
         return False
+
+    finally:
+        if held:
+            recovery.release(vc.guild.id)
+            from infrastructure.discord.commands.music_commands import start_playback_if_needed
+            asyncio.create_task(start_playback_if_needed(vc.guild))
@@ -0,0 +1,48 @@
+import hashlib
+from collections import OrderedDict
+from typing import Optional
+
+
+def tts_cache_key(text: str, lang: str) -> str:
+    """Clave por contenido: mismo texto (ignorando mayúsculas y espacios) e idioma."""
+    normalized = " ".join(text.split()).casefold()
+    return hashlib.sha1(f"{lang}\x00{normalized}".encode("utf-8")).hexdigest()
+
+
+class TTSCache:
+    """
+    Cache LRU de audio MP3 ya sintetizado, acotada por bytes en vez de por entradas.
+    Solo se usa desde el event loop, así que no necesita lock.
+    """
+
+    def __init__(self, max_bytes: int = 8 * 1024 * 1024):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._data: "OrderedDict[str, bytes]" = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[bytes]:
+        data = self._data.get(key)
+        if data is None:
+            self.misses += 1
+            return None
+        self._data.move_to_end(key)
+        self.hits += 1
+        return data
+
+    def put(self, key: str, data: bytes) -> bool:
+        if len(data) > self.max_bytes:
+            return False
+        old = self._data.pop(key, None)
+        if old is not None:
+            self.size -= len(old)
+        self._data[key] = data
+        self.size += len(data)
+        while self.size > self.max_bytes:
+            _, evicted = self._data.popitem(last=False)
+            self.size -= len(evicted)
+        return True
+
+    def __len__(self):
+        return len(self._data)
@@ -0,0 +1,135 @@
+"""
+Extracción con yt-dlp sin asyncio ni estado compartido.
+
+Lo usan tanto los hilos de `ytdl_executor` como los procesos de
+`ytdl_process_executor` (YTDL_PROCESSES > 0). Este módulo es lo único que
+importa un proceso worker: ni discord ni la configuración, para que arrancar un
+worker solo cueste cargar yt-dlp y las cookies una vez.
+
+Desde un worker no se devuelve el info completo de yt-dlp (formatos,
+subtítulos, miniaturas… decenas de KB que habría que serializar), sino la
+forma compacta que usa el bot.
+"""
+import os
+from itertools import islice
+from typing import Callable, Optional
+from infrastructure.ytdlp.stream_cache import extract_video_id, compact_info, audio_formats, select_audio_format
+
+# bitrate por defecto de un canal de voz de Discord
+DEFAULT_VOICE_KBPS = 64
+
+_ENTRY_FIELDS = ('_type', 'ie_key', 'id', 'title', 'url', 'webpage_url', 'duration', 'thumbnail', 'extractor')
+
+
+def ytdl_options(cookie_file: Optional[str] = None) -> dict:
+    opts = {
+        'format': 'bestaudio/best',
+        'noplaylist': False,
+        'quiet': True,
+        'no_warnings': True,
+        'default_search': 'auto',
+        'extract_flat': 'in_playlist',
+        'ignoreerrors': True,
+        'skip_download': True,
+        'nocheckcertificate': True,
+    }
+    if cookie_file:
+        opts['cookiefile'] = cookie_file
+    return opts
+
+
+def resolve_with(extract: Callable[[str], dict], video_url: str,
+                 cached: Callable[[Optional[str]], Optional[dict]] = lambda video_id: None) -> dict:
+    """
+    Resuelve (bloqueante) la URL de stream de un vídeo. Devuelve un info compacto
+    con `url` (stream), `acodec`, los formatos de audio alternativos y `http_headers`.
+    """
+    info = extract(video_url)
+    if not info:
+        raise RuntimeError("No se pudo extraer info con yt-dlp")
+
+    # Si viene como playlist/radio, intenta tomar el primer entry válido
+    if isinstance(info, dict) and info.get('entries'):
+        resolved_url = None
+        for entry in info['entries'] or []:
+            if isinstance(entry, dict):
+                resolved_url = entry.get('url') or entry.get('webpage_url')
+                if resolved_url:
+                    break
+        if not resolved_url:
+            raise RuntimeError("No se pudo resolver un entry válido (playlist/radio)")
+        hit = cached(extract_video_id(resolved_url))
+        if hit:
+            return hit
+        info = extract(resolved_url)
+        if not info:
+            raise RuntimeError("No se pudo extraer info (tras resolver playlist/radio)")
+
+    stream_url, acodec = info.get('url'), info.get('acodec')
+    if not isinstance(stream_url, str):
+        # sin formato elegido por yt-dlp: Opus a bitrate por defecto, o lo mejor que haya
+        chosen = select_audio_format(audio_formats(info), DEFAULT_VOICE_KBPS)
+        stream_url, acodec = (chosen['url'], chosen['acodec']) if chosen else (None, None)
+    if not stream_url:
+        raise RuntimeError('No se obtuvo URL de stream válida')
+    return compact_info(info, stream_url, acodec)
+
+
+def compact_entry(entry: dict) -> dict:
+    return {k: entry[k] for k in _ENTRY_FIELDS if entry.get(k) is not None}
+
+
+def compact_result(info: Optional[dict]) -> Optional[dict]:
+    """Lo que devuelve `extract` desde un worker: playlist con entradas planas o vídeo compacto."""
+    if not info:
+        return info
+    if info.get('entries') is not None:
+        return {'_type': 'playlist', 'title': info.get('title'),
+                'entries': [compact_entry(e) for e in info['entries'] if e]}
+    if isinstance(info.get('url'), str):
+        out = compact_info(info, info['url'])
+        out['extractor'] = info.get('extractor')
+        return out
+    return compact_entry(info)
+
+
+# ---------------------------------------------------------------- proceso worker
+
+_ytdl = None
+
+
+def init_worker(cookie_file: Optional[str]):
+    """Inicializador del pool: un YoutubeDL por proceso, con las cookies ya cargadas."""
+    global _ytdl
+    import yt_dlp
+    _ytdl = yt_dlp.YoutubeDL(ytdl_options(cookie_file))
+
+
+def _extract(url: str, **kwargs) -> dict:
+    return _ytdl.extract_info(url, download=False, **kwargs)
+
+
+def warm() -> int:
+    return os.getpid()
+
+
+def extract(search_or_url: str) -> Optional[dict]:
+    return compact_result(_extract(search_or_url))
+
+
+def resolve(video_url: str) -> dict:
+    return resolve_with(_extract, video_url)
+
+
+def playlist_entries(url: str, limit: int) -> list:
+    """Entradas planas de una playlist (hasta `limit`), o el propio vídeo si no es una."""
+    info = _extract(url, process=False)
+    for _ in range(3):
+        if not info or info.get('_type') not in ('url', 'url_transparent'):
+            break
+        info = _extract(info['url'], process=False, ie_key=info.get('ie_key'))
+    if not info:
+        raise RuntimeError("No se pudo extraer info con yt-dlp")
+    if info.get('_type') != 'playlist':
+        return [compact_entry(info)]
+    return [compact_entry(e) for e in islice(info.get('entries') or (), limit) if e]
@@ -0,0 +1,98 @@
+"""
+Cache de búsquedas: texto normalizado -> vídeo de YouTube.
+
+Los usuarios piden las mismas canciones una y otra vez; con un acierto nos
+saltamos el `ytsearch:` entero y la canción se encola con el id, el título y la
+duración guardados (la URL de stream se resuelve luego, como siempre).
+Vive en memoria con LRU acotado; si hay SQLite (SNAPSHOT_DB) los fallos en
+memoria se consultan en disco y lo nuevo se vuelca con el bucle de snapshots.
+Solo se usa desde el event loop, así que no necesita lock.
+"""
+import re
+import unicodedata
+from collections import OrderedDict
+from typing import Optional
+from infrastructure.persistence.snapshot_store import SnapshotStore
+
+_NON_WORD = re.compile(r'[\W_]+')
+# "(Official Video)", "official music video", "video oficial"… al final de la búsqueda
+_TRAILING_NOISE = re.compile(
+    r'\s+(?:official(?:\s+music)?(?:\s+(?:video|audio|lyric\s+video|videoclip))?'
+    r'|(?:video|videoclip|audio)\s+oficial)$'
+)
+_ENTRY_FIELDS = ('id', 'title', 'duration')
+
+
+def normalize_search(text: str) -> str:
+    text = unicodedata.normalize('NFKD', text)
+    text = ''.join(c for c in text if not unicodedata.combining(c)).casefold()
+    text = _NON_WORD.sub(' ', text).strip()
+    return _TRAILING_NOISE.sub('', text) or text
+
+
+def search_entry(video: dict) -> dict:
+    """Entrada plana (como las de extract_flat) lista para `Song.from_info`."""
+    return {
+        '_type': 'url',
+        'ie_key': 'Youtube',
+        'url': f"https://www.youtube.com/watch?v={video['id']}",
+        **{k: video.get(k) for k in _ENTRY_FIELDS},
+    }
+
+
+class SearchCache:
+    def __init__(self, maxsize: int = 2048, store: Optional[SnapshotStore] = None, disk_size: int = 20000):
+        self.maxsize = maxsize
+        self.store = store
+        self.disk_size = disk_size
+        self._data: "OrderedDict[str, dict]" = OrderedDict()
+        self._dirty = {}
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def _remember(self, key: str, video: dict):
+        self._data[key] = video
+        self._data.move_to_end(key)
+        while len(self._data) > self.maxsize:
+            self._data.popitem(last=False)
+
+    async def get(self, query: str) -> Optional[dict]:
+        key = normalize_search(query)
+        video = self._data.get(key)
+        if video is None and self.store is not None and self.store.enabled:
+            video = await self.store.load_search(key)
+            if video is not None:
+                self.disk_hits += 1
+                self._dirty[key] = video  # refresca su antigüedad en disco
+        if video is None:
+            self.misses += 1
+            return None
+        self.hits += 1
+        self._remember(key, video)
+        return video
+
+    def put(self, query: str, info: dict):
+        if not info or not info.get('id'):
+            return
+        key = normalize_search(query)
+        video = {k: info.get(k) for k in _ENTRY_FIELDS}
+        self._remember(key, video)
+        self._dirty[key] = video
+
+    async def flush(self):
+        if not self._dirty or self.store is None or not self.store.enabled:
+            self._dirty.clear()
+            return
+        dirty, self._dirty = self._dirty, {}
+        await self.store.write_searches(dirty, self.disk_size)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
@@ -0,0 +1,53 @@
+"""
+Single-flight: peticiones idénticas y simultáneas comparten una sola extracción.
+
+Si un enlace viral se pega en varios servidores a la vez, solo el primero lanza
+yt-dlp; el resto espera el mismo futuro. El resultado (o el error) se entrega a
+todos y la entrada desaparece al terminar: aquí no se cachea nada, de eso se
+encarga `StreamCache`.
+"""
+import asyncio
+from typing import Optional
+from infrastructure.ytdlp.stream_cache import extract_video_id
+
+
+def flight_key(search_or_url: str) -> str:
+    """Id de vídeo si lo hay; si no, la consulta normalizada (búsquedas sin mayúsculas)."""
+    video_id = extract_video_id(search_or_url) if 'list=' not in search_or_url else None
+    if video_id:
+        return f"v:{video_id}"
+    normalized = " ".join(search_or_url.split())
+    if normalized.startswith('ytsearch:'):
+        normalized = normalized.casefold()
+    return f"q:{normalized}"
+
+
+def _consume(fut: asyncio.Future):
+    # si todos los que esperaban se cancelaron, que el error no quede "sin recoger"
+    if not fut.cancelled():
+        fut.exception()
+
+
+class SingleFlight:
+    def __init__(self):
+        self._inflight = {}
+        self.calls = 0
+        self.shared = 0
+
+    async def do(self, key: Optional[str], fn):
+        """Ejecuta `fn()` (corrutina) o se une a la que ya está en curso con la misma clave."""
+        self.calls += 1
+        if key is None:
+            return await fn()
+        fut = self._inflight.get(key)
+        if fut is None:
+            fut = self._inflight[key] = asyncio.ensure_future(fn())
+            fut.add_done_callback(_consume)
+            fut.add_done_callback(lambda f: self._inflight.pop(key, None) if self._inflight.get(key) is f else None)
+        else:
+            self.shared += 1
+        # shield: que un llamante cancelado (p. ej. un prefetch) no corte a los demás
+        return await asyncio.shield(fut)
+
+    def __len__(self):
+        return len(self._inflight)
@@ -0,0 +1,146 @@
+import re
+import time
+import threading
+from collections import OrderedDict
+from typing import Optional
+from urllib.parse import urlparse, parse_qs
+
+_VIDEO_ID_RE = re.compile(r'(?:[?&]v=|youtu\.be/|/shorts/|/embed/|/live/)([A-Za-z0-9_-]{11})')
+_PATH_EXPIRE_RE = re.compile(r'/expire/(\d+)')
+
+# Campos que realmente usamos de un info de yt-dlp; el resto (formats, thumbnails,
+# subtítulos…) pesa decenas de KB por vídeo y no vale la pena guardarlo.
+_INFO_FIELDS = ('id', 'title', 'webpage_url', 'url', 'http_headers', 'duration', 'thumbnail')
+
+
+def extract_video_id(url: str) -> Optional[str]:
+    """Devuelve el id de YouTube de una URL de vídeo, o None si no parece una."""
+    if not url:
+        return None
+    m = _VIDEO_ID_RE.search(url)
+    return m.group(1) if m else None
+
+
+def stream_expiry(stream_url: str) -> Optional[float]:
+    """
+    Lee el `expire=` (epoch en segundos) que googlevideo incluye en la URL firmada.
+    Los manifiestos lo llevan en el path (`/expire/<ts>/`). None si no hay.
+    """
+    if not stream_url:
+        return None
+    try:
+        values = parse_qs(urlparse(stream_url).query).get('expire')
+        if values:
+            return float(values[0])
+    except ValueError:
+        return None
+    m = _PATH_EXPIRE_RE.search(stream_url)
+    return float(m.group(1)) if m else None
+
+
+def audio_formats(info: dict) -> list:
+    """
+    Formatos solo-audio descargables por HTTP, compactos (url, códec, kbps).
+    Se guardan todos los Opus y el mejor de los demás como alternativa.
+    """
+    opus, best_other = [], None
+    for f in info.get('formats') or ():
+        if not f.get('url') or f.get('acodec') in (None, 'none') or f.get('vcodec') not in (None, 'none'):
+            continue
+        if f.get('protocol') not in (None, 'http', 'https'):
+            continue
+        item = {'url': f['url'], 'acodec': f['acodec'], 'abr': f.get('abr') or 0}
+        if item['acodec'] == 'opus':
+            opus.append(item)
+        elif best_other is None or item['abr'] > best_other['abr']:
+            best_other = item
+    return opus + ([best_other] if best_other else [])
+
+
+def select_audio_format(formats: list, kbps: int) -> Optional[dict]:
+    """Opus con el bitrate más cercano al del canal de voz (a igualdad, el mayor); si no hay Opus, el mejor."""
+    opus = [f for f in formats if f['acodec'] == 'opus']
+    if opus:
+        return min(opus, key=lambda f: (abs(f['abr'] - kbps), -f['abr']))
+    return max(formats, key=lambda f: f['abr'], default=None)
+
+
+def pick_stream(resolved: dict, kbps: int) -> dict:
+    """`resolved` con `url`/`acodec` cambiados al formato que mejor encaja con `kbps`."""
+    chosen = select_audio_format(resolved.get('audio_formats') or [], kbps)
+    if chosen is None or chosen['url'] == resolved['url']:
+        return resolved
+    if resolved.get('acodec') == 'opus' and chosen['acodec'] != 'opus':
+        return resolved  # nunca cambiar un Opus por algo que haya que transcodificar
+    return {**resolved, 'url': chosen['url'], 'acodec': chosen['acodec']}
+
+
+def compact_info(info: dict, stream_url: str, acodec: Optional[str] = None) -> dict:
+    out = {k: info.get(k) for k in _INFO_FIELDS}
+    out['url'] = stream_url
+    out['acodec'] = acodec or info.get('acodec')
+    out['audio_formats'] = audio_formats(info)
+    out['http_headers'] = dict(info.get('http_headers') or {})
+    return out
+
+
+class StreamCache:
+    """
+    Cache LRU de resoluciones de yt-dlp por id de vídeo.
+
+    Cada entrada caduca según el `expire=` de su URL de stream (menos un margen),
+    no con un TTL fijo. Las entradas sin expiración conocida no se guardan.
+    Se usa desde hilos del executor, por eso va protegida con un lock.
+    """
+
+    def __init__(self, maxsize: int = 256, margin: float = 120.0):
+        self.maxsize = maxsize
+        self.margin = margin
+        self._data: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, video_id: Optional[str]) -> Optional[dict]:
+        if not video_id:
+            return None
+        now = time.time()
+        with self._lock:
+            item = self._data.get(video_id)
+            if item is None:
+                self.misses += 1
+                return None
+            expires_at, info = item
+            if expires_at - self.margin <= now:
+                del self._data[video_id]
+                self.misses += 1
+                return None
+            self._data.move_to_end(video_id)
+            self.hits += 1
+            return info
+
+    def put(self, info: dict, *aliases: Optional[str]) -> bool:
+        expires_at = stream_expiry(info.get('url'))
+        if expires_at is None or expires_at - self.margin <= time.time():
+            return False
+        keys = {k for k in (info.get('id'), *aliases) if k}
+        if not keys:
+            return False
+        with self._lock:
+            for key in keys:
+                self._data[key] = (expires_at, info)
+                self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+        return True
+
+    def invalidate(self, video_id: str):
+        with self._lock:
+            self._data.pop(video_id, None)
+
+    def clear(self):
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
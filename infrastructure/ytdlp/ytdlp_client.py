@@ -1,121 +1,224 @@
 import asyncio
-import yt_dlp
+import threading
+from itertools import islice
 import discord
-from config.settings import COOKIE_FILE
-
-YTDL_OPTS = {
-    'format': 'bestaudio/best',
-    'noplaylist': False,
-    'quiet': True,
-    'no_warnings': True,
-    'default_search': 'auto',
-    'extract_flat': 'in_playlist',
-    'ignoreerrors': True,
-    'skip_download': True,
-    'nocheckcertificate': True,
-}
-if COOKIE_FILE:
-    YTDL_OPTS['cookiefile'] = COOKIE_FILE
+from config.settings import (
+    cookie_file, STREAM_CACHE_SIZE, STREAM_CACHE_MARGIN, SEARCH_CACHE_SIZE, SEARCH_CACHE_DISK_SIZE,
+    YTDL_PROCESSES, YTDL_WORKER_MAX_JOBS,
+)
+from infrastructure.ytdlp.stream_cache import StreamCache, extract_video_id, compact_info
+from infrastructure.ytdlp.single_flight import SingleFlight, flight_key
+from infrastructure.ytdlp.search_cache import SearchCache, normalize_search, search_entry
+from infrastructure.ytdlp import extraction
+from infrastructure.ytdlp.extraction import DEFAULT_VOICE_KBPS, ytdl_options, resolve_with
+from infrastructure.persistence.snapshot_store import snapshot_store
+from infrastructure.executors import ytdl_executor, ProcessExecutor, register_executor
+from infrastructure.metrics import ytdl_seconds, ffmpeg_seconds
+
+# Con YTDL_PROCESSES la extracción sale del proceso del bot: el parseo de yt-dlp
+# no compite por el GIL con el hilo que envía el audio
+ytdl_process_executor = None
+if YTDL_PROCESSES > 0:
+    ytdl_process_executor = ProcessExecutor(
+        "ytdl_proc", YTDL_PROCESSES, max_tasks_per_child=YTDL_WORKER_MAX_JOBS,
+        initializer=extraction.init_worker, initargs=lambda: (cookie_file(),),
+    )
+    register_executor(ytdl_process_executor)
+
+stream_cache = StreamCache(STREAM_CACHE_SIZE, margin=STREAM_CACHE_MARGIN)
+# extract_info y resolve_stream devuelven cosas distintas: cada uno su propio single-flight
+extract_flight = SingleFlight()
+resolve_flight = SingleFlight()
+search_cache = SearchCache(SEARCH_CACHE_SIZE, store=snapshot_store, disk_size=SEARCH_CACHE_DISK_SIZE)
+
+_local = threading.local()
 
 def get_ytdl():
-    return yt_dlp.YoutubeDL(YTDL_OPTS)
+    # Una instancia por hilo del pool: crearla carga extractores y cookies en cada llamada.
+    # yt-dlp se importa aquí y no arriba: son ~200 ms que el arranque no necesita
+    ytdl = getattr(_local, 'ytdl', None)
+    if ytdl is None:
+        import yt_dlp
+        ytdl = _local.ytdl = yt_dlp.YoutubeDL(ytdl_options(cookie_file()))
+    return ytdl
+
+def _ytdl_extract(ytdl, url: str, **kwargs):
+    with ytdl_seconds.time():
+        return ytdl.extract_info(url, download=False, **kwargs)
+
+def _cache_key(search_or_url: str):
+    # Las URLs con list= se piden como playlist: no se pueden servir desde la cache de vídeos
+    if 'list=' in search_or_url:
+        return None
+    return extract_video_id(search_or_url)
+
+async def _in_process(fn, *args):
+    with ytdl_seconds.time():
+        return await ytdl_process_executor.run(fn, *args)
+
+async def warm_ytdl():
+    """
+    Carga yt-dlp (import, extractores y cookies) antes de la primera petición:
+    en los procesos worker si los hay, si no en un hilo del executor. Se lanza
+    tras on_ready para que nada de esto retrase la conexión con Discord.
+    """
+    if ytdl_process_executor:
+        await ytdl_process_executor.warm(extraction.warm)
+    else:
+        await ytdl_executor.run(get_ytdl)
+
+async def _extract_info(search_or_url: str):
+    if ytdl_process_executor:
+        # del worker ya llega compacto (con sus formatos de audio)
+        info = await _in_process(extraction.extract, search_or_url)
+        if isinstance(info, dict) and 'audio_formats' in info:
+            stream_cache.put(info, _cache_key(search_or_url))
+        return info
+    info = await ytdl_executor.run(lambda: _ytdl_extract(get_ytdl(), search_or_url))
+    if isinstance(info, dict) and not info.get('entries') and isinstance(info.get('url'), str):
+        stream_cache.put(compact_info(info, info['url']), _cache_key(search_or_url))
+    return info
+
+async def search_video(query: str):
+    """
+    Primer resultado de `ytsearch:query`. Con acierto en la cache de búsquedas
+    devuelve una entrada plana sin tocar YouTube; la URL de stream se resuelve
+    después, al reproducir o en el prefetch.
+    """
+    video = await search_cache.get(query)
+    if video:
+        return search_entry(video)
+    search = f"ytsearch:{query}"
+    info = await extract_flight.do(f"s:{normalize_search(query)}", lambda: _extract_info(search))
+    entry = next((e for e in (info or {}).get('entries') or () if e), None)
+    if entry is None:
+        return info
+    search_cache.put(query, entry)
+    return entry
 
 async def extract_info(search_or_url: str):
+    if search_or_url.startswith('ytsearch:'):
+        return await search_video(search_or_url[len('ytsearch:'):])
+    cached = stream_cache.get(_cache_key(search_or_url))
+    if cached:
+        return cached
+    return await extract_flight.do(flight_key(search_or_url), lambda: _extract_info(search_or_url))
+
+def _playlist_batches(url: str, limit: int, first_batch: int, batch_size: int, stop: threading.Event):
+    """
+    Recorre (bloqueante) una playlist sin procesarla entera: con process=False
+    yt-dlp entrega las entradas según pagina, y aquí se agrupan en lotes.
+    El primer lote es pequeño para poder empezar a sonar cuanto antes.
+    """
     ytdl = get_ytdl()
-    return await asyncio.to_thread(lambda: ytdl.extract_info(search_or_url, download=False))
-
-async def build_ffmpeg_source(video_url: str):
+    info = _ytdl_extract(ytdl, url, process=False)
+    # watch?v=..&list=.. llega como redirección al extractor de la playlist
+    for _ in range(3):
+        if not info or info.get('_type') not in ('url', 'url_transparent'):
+            break
+        info = _ytdl_extract(ytdl, info['url'], process=False, ie_key=info.get('ie_key'))
+    if not info:
+        raise RuntimeError("No se pudo extraer info con yt-dlp")
+    if info.get('_type') != 'playlist':
+        yield [info]
+        return
+    batch, size = [], first_batch
+    for entry in islice(info.get('entries') or (), limit):
+        if stop.is_set():
+            return
+        if not entry:
+            continue
+        batch.append(entry)
+        if len(batch) >= size:
+            yield batch
+            batch, size = [], batch_size
+    if batch:
+        yield batch
+
+async def _stream_playlist_in_process(url: str, limit: int, first_batch: int, batch_size: int):
+    # un generador no cruza procesos: el worker devuelve la lista plana y aquí se
+    # reparte en lotes (la primera página de YouTube ya trae 100 entradas)
+    entries = await _in_process(extraction.playlist_entries, url, limit)
+    start, size = 0, first_batch
+    while start < len(entries):
+        yield entries[start:start + size]
+        start, size = start + size, batch_size
+
+async def stream_playlist(url: str, limit: int = 200, first_batch: int = 1, batch_size: int = 50):
+    """Versión async de `_playlist_batches`: va entregando lotes mientras el hilo sigue leyendo."""
+    if ytdl_process_executor:
+        async for batch in _stream_playlist_in_process(url, limit, first_batch, batch_size):
+            yield batch
+        return
+    loop = asyncio.get_running_loop()
+    batches = asyncio.Queue()
+    stop = threading.Event()
+
+    def produce():
+        try:
+            for batch in _playlist_batches(url, limit, first_batch, batch_size, stop):
+                loop.call_soon_threadsafe(batches.put_nowait, batch)
+        finally:
+            loop.call_soon_threadsafe(batches.put_nowait, None)
+
+    job = asyncio.ensure_future(ytdl_executor.run(produce))
+    try:
+        while (batch := await batches.get()) is not None:
+            yield batch
+        await job  # propaga el error de yt-dlp, si lo hubo
+    finally:
+        stop.set()
+        # si se corta antes de tiempo, el error del hilo ya no le importa a nadie
+        job.add_done_callback(lambda f: f.cancelled() or f.exception())
+
+def _resolve_stream(video_url: str) -> dict:
+    """
+    Resuelve (bloqueante) la URL de stream de un vídeo. Devuelve un info compacto
+    con `url` (stream) y `http_headers`. Reutiliza la cache mientras la URL no caduque.
+    """
+    video_id = extract_video_id(video_url)
+    cached = stream_cache.get(video_id)
+    if cached:
+        return cached
+    ytdl = get_ytdl()
+    resolved = resolve_with(lambda url: _ytdl_extract(ytdl, url), video_url, stream_cache.get)
+    stream_cache.put(resolved, video_id)
+    return resolved
+
+async def _resolve_in_process(video_url: str) -> dict:
+    resolved = await _in_process(extraction.resolve, video_url)
+    stream_cache.put(resolved, extract_video_id(video_url))
+    return resolved
+
+async def resolve_stream(video_url: str) -> dict:
+    cached = stream_cache.get(extract_video_id(video_url))
+    if cached:
+        return cached
+    if ytdl_process_executor:
+        return await resolve_flight.do(flight_key(video_url), lambda: _resolve_in_process(video_url))
+    return await resolve_flight.do(flight_key(video_url), lambda: ytdl_executor.run(_resolve_stream, video_url))
+
+def make_ffmpeg_source(resolved: dict, start: float = 0.0, pcm: bool = False, bitrate: int = DEFAULT_VOICE_KBPS):
+    """
+    FFmpeg para un stream resuelto. Si el stream ya es Opus se copia tal cual
+    (sin recodificar); si no, se transcodifica a `bitrate` kbps. Con `pcm`
+    entrega PCM crudo (lo que necesita el mezclador de voz).
+    """
     before_options = "-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5"
-
-    def _get_stream():
-        ytdl = get_ytdl()
-        info = ytdl.extract_info(video_url, download=False)
-        if not info:
-            raise RuntimeError("No se pudo extraer info con yt-dlp")
-
-        # Si viene como playlist/radio, intenta tomar el primer entry válido
-        if isinstance(info, dict) and info.get('entries'):
-            resolved_url = None
-            for entry in info['entries'] or []:
-                if isinstance(entry, dict):
-                    resolved_url = entry.get('url') or entry.get('webpage_url')
-                    if resolved_url:
-                        break
-            if not resolved_url:
-                raise RuntimeError("No se pudo resolver un entry válido (playlist/radio)")
-            info = ytdl.extract_info(resolved_url, download=False)
-            if not info:
-                raise RuntimeError("No se pudo extraer info (tras resolver playlist/radio)")
-
-        # (Resolver playlist/radio se hace arriba con resolved_url; este bloque duplicado
-        # provoca errores si no se encuentra un entry válido.)
-
-
-        stream_url = None
-        if isinstance(info.get('url'), str):
-            stream_url = info['url']
-        else:
-            formats = info.get('formats') or []
-            for f in reversed(formats):
-                if (
-                    f.get('acodec') != 'none'
-                    and f.get('url')
-                    and f.get('ext') in ('m4a','webm','opus','ogg','mp3')
-                ):
-                    stream_url = f['url']
-                    break
-        if not stream_url:
-            raise RuntimeError('No se obtuvo URL de stream válida')
-        headers = info.get('http_headers', {})
-        return stream_url, headers
-
-
-    stream_url, headers = await asyncio.to_thread(_get_stream)
+    if start > 0:
+        before_options += f" -ss {start:.2f}"
+    stream_url, headers = resolved['url'], resolved['http_headers']
     headers_str = ''
     for k,v in headers.items():
         headers_str += f"{k}: {v}\r\n"
-    return discord.FFmpegOpusAudio(stream_url, before_options=before_options, options=f'-headers "{headers_str}"')
-
-
-async def build_mixed_ffmpeg_source(video_url: str, tts_path: str):
-    """
-    Mezcla música actual + voz IA sin cortar la canción
-    """
-    before_options = "-reconnect 1 -reconnect_streamed 1 -reconnect_delay_max 5"
+    options = f'-headers "{headers_str}"'
+    with ffmpeg_seconds.time():
+        if pcm:
+            return discord.FFmpegPCMAudio(stream_url, before_options=before_options, options=options)
+        codec = 'copy' if resolved.get('acodec') == 'opus' else None
+        return discord.FFmpegOpusAudio(stream_url, codec=codec, bitrate=bitrate,
+                                       before_options=before_options, options=options)
 
-    def _get_stream():
-        ytdl = get_ytdl()
-        info = ytdl.extract_info(video_url, download=False)
-        if not info:
-            raise RuntimeError("No se pudo extraer info")
-        stream_url = info.get("url")
-        if not stream_url:
-            for f in reversed(info.get("formats", [])):
-                if f.get("acodec") != "none" and f.get("url"):
-                    stream_url = f["url"]
-                    break
-
-        if not stream_url:
-            raise RuntimeError("No se obtuvo stream válido")
-
-        headers = info.get("http_headers", {})
-        return stream_url, headers
-
-    stream_url, headers = await asyncio.to_thread(_get_stream)
-
-    headers_str = "".join(f"{k}: {v}\r\n" for k, v in headers.items())
-
-    options = (
-        f'-headers "{headers_str}" '
-        f'-filter_complex '
-        f'"[0:a]volume=1.0[a0];'
-        f'[1:a]volume=1.4[a1];'
-        f'[a0][a1]amix=inputs=2:duration=first:dropout_transition=2"'
-        f' -i "{tts_path}"'
-    )
+async def build_ffmpeg_source(video_url: str):
+    return make_ffmpeg_source(await resolve_stream(video_url))
 
-    return discord.FFmpegOpusAudio(
-        stream_url,
-        before_options=before_options,
-        options=options
-    )
@@ -0,0 +1,107 @@
+"""
+Servidor HTTP embebido: /metrics (Prometheus), /healthz y /readyz.
+
+Va con aiohttp sobre el mismo event loop del bot (aiohttp ya es dependencia por
+Groq), sin hilos aparte. /healthz responde mientras el proceso y su loop estén
+vivos; /readyz solo cuando el bot está conectado a Discord, que es lo que debe
+mirar el health check de Railway.
+"""
+import logging
+from aiohttp import web
+from config.settings import METRICS_PORT
+from infrastructure.executors import executor_stats
+from infrastructure.metrics import registry, discord_rest_seconds
+
+log = logging.getLogger('kaivoxx.health')
+
+_runner = None
+
+
+def _queued_songs() -> int:
+    from integration.queue_shim import music_queues
+    return sum(len(q) for q in music_queues.values())
+
+
+def _history_tokens() -> int:
+    from infrastructure.ia.groq_client import conversation_history
+    return sum(h.tokens + h.summary_tokens for h in list(conversation_history.values()))
+
+
+def register_gauges(bot):
+    from infrastructure.ia.groq_client import conversation_history
+    registry.gauge("kaivoxx_voice_clients", "Conexiones de voz activas", lambda: len(bot.voice_clients))
+    registry.gauge("kaivoxx_queued_songs", "Canciones en cola sumando todas las guilds", _queued_songs)
+    registry.gauge("kaivoxx_history_channels", "Canales con historial de IA en memoria", lambda: len(conversation_history))
+    registry.gauge("kaivoxx_history_tokens", "Tokens estimados guardados en historiales de IA", _history_tokens)
+    if bot.shard_count:
+        registry.gauge(
+            "kaivoxx_shard_latency_seconds", "Latencia del heartbeat de cada shard de este proceso",
+            lambda: {sid: shard.latency for sid, shard in bot.shards.items()}, label="shard",
+        )
+    from infrastructure.audio.disk_cache import audio_cache
+    registry.gauge("kaivoxx_audio_cache_bytes", "Bytes ocupados por la cache de audio en disco", lambda: audio_cache.size)
+    registry.gauge(
+        "kaivoxx_audio_cache_events", "Aciertos, fallos y llenados de la cache de audio en disco",
+        lambda: {k: v for k, v in audio_cache.stats().items() if k in ("hits", "misses", "fills")}, label="event",
+    )
+    from infrastructure.startup import startup_timer
+    registry.gauge("kaivoxx_startup_seconds", "Duración de cada fase del arranque hasta el primer on_ready",
+                   startup_timer.phases, label="phase")
+    from infrastructure.discord.bot_client import loop_monitor
+    registry.gauge("kaivoxx_event_loop_stalls", "Bloqueos del event loop registrados con su pila", lambda: loop_monitor.stalls)
+    registry.gauge(
+        "kaivoxx_executor_queued", "Tareas esperando hilo en cada executor",
+        lambda: {name: s["queued"] for name, s in executor_stats().items()}, label="executor",
+    )
+    registry.gauge(
+        "kaivoxx_executor_running", "Tareas ejecutándose en cada executor",
+        lambda: {name: s["running"] for name, s in executor_stats().items()}, label="executor",
+    )
+
+
+def instrument_discord_http(bot):
+    """Cronometra cada petición REST de discord.py envolviendo `HTTPClient.request`."""
+    http = bot.http
+    if getattr(http, '_kaivoxx_timed', False):
+        return
+    original = http.request
+
+    async def request(route, **kwargs):
+        with discord_rest_seconds.time():
+            return await original(route, **kwargs)
+
+    http.request = request
+    http._kaivoxx_timed = True
+
+
+def build_app(bot) -> web.Application:
+    async def metrics(request):
+        return web.Response(text=registry.render(), content_type="text/plain", charset="utf-8",
+                            headers={"X-Content-Type-Options": "nosniff"})
+
+    async def healthz(request):
+        return web.json_response({"status": "ok"})
+
+    async def readyz(request):
+        ready = bot.is_ready() and not bot.is_closed()
+        return web.json_response({"ready": ready, "latency": bot.latency if ready else None},
+                                 status=200 if ready else 503)
+
+    app = web.Application()
+    app.router.add_get("/metrics", metrics)
+    app.router.add_get("/healthz", healthz)
+    app.router.add_get("/readyz", readyz)
+    return app
+
+
+async def start_health_server(bot, port: int = METRICS_PORT):
+    """Arranca el servidor una sola vez (on_ready puede dispararse varias veces)."""
+    global _runner
+    if not port or _runner is not None:
+        return
+    register_gauges(bot)
+    instrument_discord_http(bot)
+    _runner = web.AppRunner(build_app(bot), access_log=None)
+    await _runner.setup()
+    await web.TCPSite(_runner, "0.0.0.0", port).start()
+    log.info(f"Métricas y health checks en el puerto {port}")
@@ -0,0 +1,74 @@
+"""
+Carga incremental de playlists y mixes.
+
+En vez de esperar a que yt-dlp devuelva la playlist completa, la primera entrada
+se encola y empieza a sonar en cuanto llega; el resto se va añadiendo por lotes
+en segundo plano y un único embed muestra el progreso. `#stop` y `#leave`
+cancelan la carga en curso de la guild.
+"""
+import asyncio
+import logging
+from domain.entities.song import Song
+from domain.repositories.queue_repository import MusicQueue
+from infrastructure.ytdlp.ytdlp_client import stream_playlist
+from infrastructure.discord.views.embeds import embed_info, embed_music, embed_error
+
+log = logging.getLogger('kaivoxx.playlist')
+
+MAX_PLAYLIST_ENTRIES = 200
+
+# guild_id -> tareas de carga en curso
+_ingestions = {}
+
+
+def is_playlist_url(search: str) -> bool:
+    return search.startswith(('http://', 'https://')) and 'list=' in search
+
+
+async def _ingest(ctx, url: str, queue: MusicQueue, start_playback):
+    requester, channel_id = str(ctx.author), ctx.channel.id
+    message = await ctx.send(embed=embed_info("Cargando playlist…", f"🔍 **{url}**"))
+    added = 0
+    try:
+        async for batch in stream_playlist(url, limit=MAX_PLAYLIST_ENTRIES):
+            count = queue.enqueue_many(Song.from_info(entry, requester, channel_id) for entry in batch)
+            added += count
+            await start_playback()
+            if count < len(batch):
+                break  # cola llena
+            await message.edit(embed=embed_info(
+                "Cargando playlist…",
+                f"🎶 **{added}** canciones añadidas hasta ahora.\n📂 Cola actual: **{len(queue)}** / {queue.limit}"
+            ))
+    except asyncio.CancelledError:
+        await message.edit(embed=embed_info("Carga cancelada", f"⏹ Se añadieron **{added}** canciones antes de parar."))
+        raise
+    except Exception:
+        log.exception("Error cargando playlist")
+        if not added:
+            await message.edit(embed=embed_error("No pude cargar la playlist", "yt-dlp no devolvió ninguna canción válida."))
+            return
+    await message.edit(embed=embed_music(
+        "Playlist / Mix añadido",
+        f"🎶 Se añadieron **{added} canciones** (máximo {MAX_PLAYLIST_ENTRIES}).\n📂 Cola actual: **{len(queue)}** / {queue.limit}"
+    ))
+
+
+def start_ingestion(ctx, url: str, queue: MusicQueue, start_playback) -> asyncio.Task:
+    """Lanza la carga en segundo plano; `start_playback` es una corrutina sin argumentos."""
+    guild_id = ctx.guild.id
+    task = asyncio.create_task(_ingest(ctx, url, queue, start_playback))
+    tasks = _ingestions.setdefault(guild_id, set())
+    tasks.add(task)
+
+    def _done(t: asyncio.Task):
+        tasks.discard(t)
+        if not tasks:
+            _ingestions.pop(guild_id, None)
+    task.add_done_callback(_done)
+    return task
+
+
+def cancel_ingestion(guild_id: int):
+    for task in list(_ingestions.get(guild_id, ())):
+        task.cancel()
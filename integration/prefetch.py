@@ -0,0 +1,73 @@
+"""
+Pre-resolución de la siguiente canción de cada guild.
+
+Mientras suena una canción resolvemos en segundo plano la cabeza de la cola,
+así el cambio de pista no espera a yt-dlp. El resultado solo se entrega si la
+cabeza sigue siendo la misma canción (mismo objeto) y su URL no ha caducado.
+"""
+import asyncio
+import logging
+import time
+from typing import Optional
+from domain.repositories.queue_repository import MusicQueue
+from infrastructure.ytdlp.ytdlp_client import resolve_stream, stream_cache
+from infrastructure.ytdlp.stream_cache import stream_expiry, extract_video_id
+from infrastructure.audio.disk_cache import audio_cache
+
+log = logging.getLogger('kaivoxx.prefetch')
+
+# guild_id -> (song, task)
+_prefetched = {}
+
+
+def _log_failure(task: asyncio.Task):
+    if task.cancelled():
+        return
+    err = task.exception()
+    if err:
+        log.info(f"Prefetch falló, se resolverá al reproducir: {err}")
+
+
+def schedule_prefetch(guild_id: int, queue: Optional[MusicQueue]):
+    """Lanza (o mantiene) la resolución de la cabeza actual de la cola."""
+    song = queue.peek() if queue else None
+    if song is None or audio_cache.contains(song.video_id or extract_video_id(song.url)):
+        # sin cola, o la siguiente ya está en disco y no necesita yt-dlp
+        invalidate(guild_id)
+        return
+    current = _prefetched.get(guild_id)
+    if current and current[0] is song:
+        return
+    invalidate(guild_id)
+    task = asyncio.create_task(resolve_stream(song.url))
+    task.add_done_callback(_log_failure)
+    _prefetched[guild_id] = (song, task)
+
+
+async def take_prefetched(guild_id: int, song) -> Optional[dict]:
+    """
+    Devuelve la resolución preparada para `song`, esperando si aún está en curso.
+    None si no había prefetch válido para esa canción.
+    """
+    item = _prefetched.pop(guild_id, None)
+    if not item:
+        return None
+    prefetched_song, task = item
+    if prefetched_song is not song:
+        task.cancel()
+        return None
+    try:
+        resolved = await task
+    except Exception:
+        return None
+    expires_at = stream_expiry(resolved.get('url'))
+    if expires_at is not None and expires_at - stream_cache.margin <= time.time():
+        return None
+    return resolved
+
+
+def invalidate(guild_id: int):
+    """Descarta el prefetch de la guild (cola vaciada, reordenada, etc.)."""
+    item = _prefetched.pop(guild_id, None)
+    if item:
+        item[1].cancel()
@@ -1,8 +1,12 @@
 from domain.repositories.queue_repository import MusicQueue
+from integration.snapshots import restore_queue
 
 music_queues = {}
 
 async def ensure_queue_for_guild(guild_id: int) -> MusicQueue:
     if guild_id not in music_queues:
-        music_queues[guild_id] = MusicQueue(limit=MusicQueue().limit)
+        limit = MusicQueue().limit
+        queue = await restore_queue(guild_id, limit)
+        # mientras se leía el snapshot otra tarea pudo crear la cola
+        music_queues.setdefault(guild_id, queue or MusicQueue(limit=limit))
     return music_queues[guild_id]
@@ -0,0 +1,87 @@
+"""
+Recuperación de la canción en curso cuando la reproducción se corta.
+
+Si FFmpeg agota sus reconexiones (lo típico: la URL firmada de googlevideo
+caduca a mitad de una pista larga) la fuente se acaba antes de tiempo y el
+`after` del reproductor pasaría a la siguiente canción. Aquí se distingue ese
+final prematuro de un final normal o de un skip, y la canción queda pendiente
+de retomarse desde la posición decodificada: `start_playback_if_needed` la
+reconstruye con `-ss`, reutilizando la URL cacheada mientras no haya caducado.
+
+Lo mismo cuando el TTS sin mezclador tiene que parar la música para hablar:
+`hold` marca la guild y, al terminar la voz, `release` deja que se retome.
+"""
+import logging
+from typing import Optional, Tuple
+from domain.entities.song import Song
+from infrastructure.ytdlp.ytdlp_client import stream_cache
+from infrastructure.ytdlp.stream_cache import extract_video_id
+
+log = logging.getLogger('kaivoxx.recovery')
+
+MAX_RECOVERIES = 3      # por canción: un vídeo roto no puede quedarse en bucle
+END_TOLERANCE = 5.0     # acabar a menos de esto del final cuenta como final normal
+RESOLVE_TIMEOUT = 15.0  # cota para volver a sonar si hay que re-resolver la URL
+
+# guild_id -> (song, posición) pendiente de retomar
+_pending = {}
+# guild_id -> (song, recuperaciones seguidas de esa canción)
+_attempts = {}
+# guilds con la música parada a propósito para hablar
+_held = set()
+
+
+def is_premature_end(song: Song, source, error: Optional[Exception]) -> bool:
+    if error is not None:
+        return True
+    if not getattr(source, 'ended', False):
+        return False  # parada desde fuera: skip, stop, leave
+    return bool(song.duration) and source.position < song.duration - END_TOLERANCE
+
+
+def note_end(guild_id: int, song: Song, source, error: Optional[Exception] = None) -> bool:
+    """Se llama al terminar cada pista. True si la canción queda pendiente de retomarse."""
+    if guild_id not in _held:
+        if not is_premature_end(song, source, error):
+            _attempts.pop(guild_id, None)
+            return False
+        previous, count = _attempts.get(guild_id, (None, 0))
+        count = count + 1 if previous is song else 1
+        if count > MAX_RECOVERIES:
+            log.warning(f"'{song.title}' se cortó {MAX_RECOVERIES} veces, se salta")
+            _attempts.pop(guild_id, None)
+            return False
+        _attempts[guild_id] = (song, count)
+        if count > 1:
+            # la URL cacheada ya falló antes de caducar: esta vez se re-resuelve
+            stream_cache.invalidate(song.video_id or extract_video_id(song.url))
+        log.info(f"'{song.title}' se cortó en {source.position:.1f}s ({error or 'fin prematuro'}), se retoma")
+    _pending[guild_id] = (song, source.position)
+    return True
+
+
+def take(guild_id: int) -> Optional[Tuple[Song, float]]:
+    """(song, posición) a retomar en lugar de sacar la siguiente de la cola."""
+    return _pending.pop(guild_id, None)
+
+
+def has_pending(guild_id: int) -> bool:
+    return guild_id in _pending
+
+
+def hold(guild_id: int):
+    _held.add(guild_id)
+
+
+def release(guild_id: int):
+    _held.discard(guild_id)
+
+
+def is_held(guild_id: int) -> bool:
+    return guild_id in _held
+
+
+def forget(guild_id: int):
+    """Stop/leave: la canción cortada ya no debe volver."""
+    _pending.pop(guild_id, None)
+    _attempts.pop(guild_id, None)
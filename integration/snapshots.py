@@ -0,0 +1,146 @@
+"""
+Snapshots write-behind del estado de reproducción por guild.
+
+Un bucle cada SNAPSHOT_INTERVAL segundos compara la `version` de cada cola (y la
+canción actual/posición) con lo último que se guardó y vuelca solo lo que cambió,
+todo en un lote: una cola muy movida escribe una vez por intervalo, no una vez
+por canción. La restauración es perezosa: cada guild se lee de disco la primera
+vez que se usa su cola, no todas al arrancar.
+
+La canción que sonaba vuelve a la cabeza de la cola y, al reproducirla, se
+retoma desde la posición guardada (`take_resume_offset`). El mismo bucle vuelca
+las búsquedas nuevas de la cache de `ytsearch:`.
+"""
+import asyncio
+import dataclasses
+import logging
+from typing import Optional
+from config.settings import SNAPSHOT_INTERVAL
+from domain.entities.song import Song
+from domain.repositories.queue_repository import MusicQueue
+from infrastructure.persistence.snapshot_store import snapshot_store
+
+log = logging.getLogger('kaivoxx.snapshots')
+
+_SONG_FIELDS = tuple(f.name for f in dataclasses.fields(Song))
+
+# guild_id -> firma de lo último volcado
+_written = {}
+# guild_id -> (song, posición) pendiente de retomar
+_resume = {}
+# claves de historial que existen en disco (para borrar las que se limpian)
+_persisted_histories = set()
+_task: Optional[asyncio.Task] = None
+
+
+def song_to_dict(song: Song) -> dict:
+    return {f: getattr(song, f) for f in _SONG_FIELDS}
+
+
+def song_from_dict(data: dict) -> Song:
+    return Song(**{k: v for k, v in data.items() if k in _SONG_FIELDS})
+
+
+def _guild_snapshot(guild_id: int, queue: Optional[MusicQueue], current: Optional[Song], position: float):
+    """Devuelve (firma, datos); datos es None si no queda nada que guardar."""
+    songs = iter(queue) if queue else iter(())
+    pending = _resume.get(guild_id)
+    if current is None and pending and queue and queue.peek() is pending[0]:
+        # restaurada pero aún sin sonar: se guarda igual que se leyó
+        current, position = pending
+        next(songs)
+    signature = (queue.version if queue else None, id(current), int(position))
+    if current is None and not (queue and len(queue)):
+        return signature, None
+    return signature, {
+        "current": song_to_dict(current) if current else None,
+        "position": round(position, 2),
+        "queue": [song_to_dict(s) for s in songs],
+    }
+
+
+async def restore_queue(guild_id: int, limit: int) -> Optional[MusicQueue]:
+    data = await snapshot_store.load_guild(guild_id)
+    if not data:
+        return None
+    queue = MusicQueue(limit=limit)
+    songs = [song_from_dict(d) for d in data.get("queue", [])]
+    if data.get("current"):
+        current = song_from_dict(data["current"])
+        songs.insert(0, current)
+        if data.get("position"):
+            _resume[guild_id] = (current, float(data["position"]))
+    queue.enqueue_many(songs)
+    _written[guild_id] = _guild_snapshot(guild_id, queue, None, 0.0)[0]
+    log.info(f"Cola restaurada para guild {guild_id}: {len(queue)} canciones")
+    return queue
+
+
+def take_resume_offset(guild_id: int, song: Song) -> float:
+    """Segundos desde los que retomar `song`, si es la que sonaba antes de reiniciar."""
+    pending = _resume.pop(guild_id, None)
+    return pending[1] if pending and pending[0] is song else 0.0
+
+
+def _playback_state(bot, guild_id: int):
+    current = getattr(bot, '_current_song', {}).get(guild_id)
+    guild = bot.get_guild(guild_id)
+    vc = guild.voice_client if guild else None
+    if not current or not vc or not (vc.is_playing() or vc.is_paused()):
+        return None, 0.0
+    return current, getattr(vc.source, 'position', 0.0)
+
+
+async def flush(bot):
+    from integration.queue_shim import music_queues
+    from infrastructure.ia.groq_client import conversation_history, restored_histories
+
+    guilds, signatures = {}, {}
+    for guild_id in set(music_queues) | set(getattr(bot, '_current_song', {})):
+        current, position = _playback_state(bot, guild_id)
+        signature, data = _guild_snapshot(guild_id, music_queues.get(guild_id), current, position)
+        if _written.get(guild_id) != signature:
+            guilds[guild_id] = data
+            signatures[guild_id] = signature
+
+    histories, pending = {}, {}
+    for key, history in list(conversation_history.items()):
+        if key.startswith("temp_") or history.saved_version == history.version:
+            continue
+        histories[key] = history.to_snapshot()
+        pending[key] = (history, history.version)
+    for key in (_persisted_histories | restored_histories) - conversation_history.keys():
+        histories[key] = None
+
+    from infrastructure.ytdlp.ytdlp_client import search_cache
+    await search_cache.flush()
+
+    if not (guilds or histories):
+        return
+    await snapshot_store.write(guilds, histories)
+    _written.update(signatures)
+    for history, version in pending.values():
+        history.saved_version = version
+    for key, data in histories.items():
+        if data is None:
+            _persisted_histories.discard(key)
+            restored_histories.discard(key)
+        else:
+            _persisted_histories.add(key)
+
+
+async def _flush_loop(bot):
+    while True:
+        await asyncio.sleep(SNAPSHOT_INTERVAL)
+        try:
+            await flush(bot)
+        except Exception:
+            log.exception("Error guardando snapshots")
+
+
+def start_snapshots(bot):
+    """Arranca el volcado periódico (idempotente: on_ready puede dispararse varias veces)."""
+    global _task
+    if not snapshot_store.enabled or (_task and not _task.done()):
+        return
+    _task = asyncio.create_task(_flush_loop(bot))
@@ -1,11 +1,25 @@
-"""Entrypoint: crea el bot y lo ejecuta"""
+"""Entrypoint: crea el bot y lo ejecuta (o, con CLUSTERS > 1, lanza un proceso por cluster)"""
+from infrastructure.startup import startup_timer  # lo primero: marca el origen de los tiempos de arranque
+import asyncio
 import logging
-from infrastructure.discord import bot_client
-from config.settings import DISCORD_TOKEN
+import sys
+from config.settings import (
+    DISCORD_TOKEN, SHARD_COUNT, CLUSTERS, CLUSTER_ID, METRICS_PORT, CLUSTER_READY_TIMEOUT,
+)
 logging.basicConfig(level=logging.INFO)
 log = logging.getLogger("kaivoxx")
 
-bot = bot_client.create_bot()  # crea e inicializa comandos/events
+# Todo bajo __main__: los workers de yt-dlp (spawn) vuelven a importar este
+# fichero y no deben crear otro bot
 if __name__ == "__main__":
-    log.info("Iniciando Kaivoxx...")
+    if CLUSTERS > 1 and CLUSTER_ID is None:
+        from infrastructure.discord.cluster_launcher import launch
+        log.info("Iniciando Kaivoxx en modo multiproceso...")
+        asyncio.run(launch(DISCORD_TOKEN, SHARD_COUNT, CLUSTERS, METRICS_PORT, CLUSTER_READY_TIMEOUT, sys.argv))
+        sys.exit(0)
+
+    from infrastructure.discord import bot_client
+    startup_timer.mark("imports")
+    bot = bot_client.create_bot()  # crea e inicializa comandos/events
+    log.info("Iniciando Kaivoxx..." if CLUSTER_ID is None else f"Iniciando Kaivoxx (cluster {CLUSTER_ID})...")
     bot.run(DISCORD_TOKEN)
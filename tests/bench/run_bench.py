@@ -0,0 +1,447 @@
+"""
+Benchmarks offline de Kaivoxx: sin red y sin Discord.
+
+Ejecuta los caminos reales (`play_music`, `start_playback_if_needed`,
+`groq_chat_response`, `speak_text_in_voice`) contra dobles:
+
+- un yt-dlp falso con latencia configurable (búsqueda y resolución de stream),
+- un VoiceClient falso que consume la AudioSource en su propio hilo, como el
+  AudioPlayer de discord.py, y anota cuándo sale el primer frame de cada pista,
+- un endpoint de Groq local (aiohttp) con latencia configurable,
+- gTTS y FFmpeg sustituidos por fuentes en memoria.
+
+Mide p50/p95/p99 de: comando -> primer audio, hueco entre pistas, respuesta de
+IA, TTS -> primer audio, coste por frame del mezclador de voz y coste de
+on_message por mensaje de charla (mensajes/s que aguanta el handler) y de un
+ciclo de operaciones sobre una cola de 500 canciones, y escribe
+un JSON para comparar entre commits:
+
+    python tests/bench/run_bench.py --out bench.json
+    python tests/bench/run_bench.py --compare bench.json
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import threading
+import time
+from types import SimpleNamespace
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+import discord
+from aiohttp import web
+import infrastructure.ytdlp.ytdlp_client as ytdlp_client
+import infrastructure.discord.commands.music_commands as music_commands
+import infrastructure.tts.gtts_client as gtts_client
+import infrastructure.ia.groq_client as groq
+from infrastructure.discord.bot_client import bot, on_message, message_router
+from infrastructure.ytdlp.stream_cache import extract_video_id
+from domain.entities.song import Song
+from domain.repositories.queue_repository import MusicQueue, PAGE_SIZE
+from infrastructure.audio.mixer import MixerSource, FRAME_SIZE
+from infrastructure.audio.tracked_source import FRAME_SECONDS
+
+
+# ---------------------------------------------------------------- dobles
+
+class FakeYDL:
+    """yt-dlp falso: responde búsquedas y vídeos tras `latency` segundos (±20 %)."""
+
+    def __init__(self, latency: float, rng: random.Random, duration: float = 180):
+        self.latency = latency
+        self.rng = rng
+        self.duration = duration  # debe cuadrar con los frames de FakeSource o la pista parecería cortada
+
+    def _sleep(self):
+        if self.latency:
+            time.sleep(self.latency * self.rng.uniform(0.8, 1.2))
+
+    def extract_info(self, url, download=False, process=True, ie_key=None):
+        self._sleep()
+        if url.startswith('ytsearch:'):
+            query = url[len('ytsearch:'):]
+            vid = hashlib.sha1(query.encode()).hexdigest()[:11]
+            return {'_type': 'playlist', 'entries': [{
+                '_type': 'url', 'ie_key': 'Youtube', 'id': vid, 'title': query, 'duration': self.duration,
+                'url': f"https://www.youtube.com/watch?v={vid}",
+            }]}
+        vid = extract_video_id(url)
+        return {
+            'id': vid, 'title': vid, 'webpage_url': url, 'duration': self.duration, 'extractor': 'youtube',
+            'url': f"https://rr1.googlevideo.com/videoplayback?expire={int(time.time()) + 3600}&id={vid}",
+            'http_headers': {},
+        }
+
+
+class FakeSource(discord.AudioSource):
+    """Opus de silencio o, con `pcm`, frames PCM de 20 ms (lo que lee el mezclador)."""
+
+    def __init__(self, frames: int, pcm: bool = False):
+        self.frames = frames
+        self.pcm = pcm
+        self._frame = bytes(range(256)) * (FRAME_SIZE // 256) if pcm else b'\xf8\xff\xfe'
+
+    def read(self) -> bytes:
+        if self.frames <= 0:
+            return b''
+        self.frames -= 1
+        return self._frame
+
+    def is_opus(self) -> bool:
+        return not self.pcm
+
+
+class FakeVoiceClient:
+    """Consume la fuente en un hilo a `frame_seconds` por frame y llama a `after` al acabar."""
+
+    def __init__(self, channel_id: int, frame_seconds: float):
+        self.channel = type("Channel", (), {"id": channel_id})()
+        self.frame_seconds = frame_seconds
+        self.source = None
+        self.starts = []   # perf_counter del primer frame de cada play()
+        self.ends = []     # perf_counter del último frame de cada play()
+        self._stop = threading.Event()
+        self._thread = None
+        self.first_audio = threading.Event()
+
+    def is_connected(self):
+        return True
+
+    def is_playing(self):
+        # como el AudioPlayer real: deja de "sonar" antes de llamar a `after`
+        return self._thread is not None and self._thread.is_alive() and not self._stop.is_set()
+
+    def is_paused(self):
+        return False
+
+    def stop(self):
+        self._stop.set()
+
+    def play(self, source, after=None):
+        if self.is_playing():
+            raise discord.ClientException('Already playing audio.')
+        self.source = source
+        self._stop = threading.Event()
+        stop = self._stop
+
+        def _run():
+            first = True
+            while not stop.is_set():
+                if not source.read():
+                    break
+                if first:
+                    self.starts.append(time.perf_counter())
+                    self.first_audio.set()
+                    first = False
+                time.sleep(self.frame_seconds)
+            self.ends.append(time.perf_counter())
+            stop.set()
+            if after:
+                after(None)
+
+        self._thread = threading.Thread(target=_run, daemon=True)
+        self._thread.start()
+
+
+class FakeMessage:
+    async def edit(self, **kwargs):
+        pass
+
+
+class FakeCtx:
+    def __init__(self, guild_id: int, vc: FakeVoiceClient):
+        voice = type("Voice", (), {"channel": vc.channel})()
+        self.author = type("Author", (), {"voice": voice, "__str__": lambda s: "bench"})()
+        self.channel = type("TextChannel", (), {"id": guild_id * 10})()
+        self.guild = type("Guild", (), {"id": guild_id, "voice_client": vc})()
+        self.voice_client = vc
+
+    async def send(self, *args, **kwargs):
+        return FakeMessage()
+
+
+class FakeGTTS:
+    latency = 0.0
+
+    @classmethod
+    def synthesize(cls, text: str) -> bytes:
+        time.sleep(cls.latency)
+        return text.encode()
+
+
+async def _start_groq_stub(latency: float):
+    async def completions(request):
+        await request.json()
+        await asyncio.sleep(latency)
+        return web.json_response({"choices": [{"message": {"content": "Claro 💜"}}]})
+
+    app = web.Application()
+    app.router.add_post("/openai/v1/chat/completions", completions)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = site._server.sockets[0].getsockname()[1]
+    return runner, f"http://127.0.0.1:{port}/openai/v1/chat/completions"
+
+
+# ---------------------------------------------------------------- escenarios
+
+async def _wait_event(event: threading.Event, timeout: float = 30.0):
+    deadline = time.perf_counter() + timeout
+    while not event.is_set():
+        if time.perf_counter() > deadline:
+            raise TimeoutError("no llegó audio")
+        await asyncio.sleep(0.001)
+
+
+async def bench_first_audio(cfg, guild_base: int = 1000) -> list:
+    """#play de una búsqueda nueva -> primer frame servido al VoiceClient."""
+    samples = []
+    for i in range(cfg.runs):
+        vc = FakeVoiceClient(guild_base + i, cfg.frame_seconds)
+        ctx = FakeCtx(guild_base + i, vc)
+        start = time.perf_counter()
+        await music_commands.play_music(ctx, f"bench cancion {cfg.seed} {i}")
+        await _wait_event(vc.first_audio)
+        samples.append(vc.starts[0] - start)
+        vc.stop()
+    return samples
+
+
+async def bench_track_gap(cfg, guild_id: int = 5000) -> list:
+    """Una cola de `runs + 1` pistas: tiempo entre el fin de una y el primer frame de la siguiente."""
+    vc = FakeVoiceClient(guild_id, cfg.frame_seconds)
+    ctx = FakeCtx(guild_id, vc)
+    queue = await music_commands.ensure_queue_for_guild(guild_id)
+    for i in range(cfg.runs + 1):
+        vid = hashlib.sha1(f"gap {cfg.seed} {i}".encode()).hexdigest()[:11]
+        queue.enqueue(Song(f"https://www.youtube.com/watch?v={vid}", vid, "bench", ctx.channel.id))
+    await music_commands.start_playback_if_needed(ctx.guild)
+    deadline = time.perf_counter() + 60
+    while len(vc.ends) < cfg.runs + 1 and time.perf_counter() < deadline:
+        await asyncio.sleep(0.005)
+    return [start - end for end, start in zip(vc.ends, vc.starts[1:])]
+
+
+async def bench_ia(cfg) -> list:
+    runner, url = await _start_groq_stub(cfg.groq_latency)
+    previous = groq.groq_client.api_url
+    groq.groq_client.api_url = url
+    samples = []
+    try:
+        for i in range(cfg.runs):
+            start = time.perf_counter()
+            await groq.groq_chat_response(f"bench_{cfg.seed}", f"pregunta {i}", guild_id=1)
+            samples.append(time.perf_counter() - start)
+    finally:
+        groq.groq_client.api_url = previous
+        groq.conversation_history.pop(f"bench_{cfg.seed}", None)
+        await groq.groq_client.close()
+        await runner.cleanup()
+    return samples
+
+
+async def bench_tts(cfg) -> list:
+    samples = []
+    for i in range(cfg.runs):
+        vc = FakeVoiceClient(9000 + i, cfg.frame_seconds)
+        start = time.perf_counter()
+        ok = await gtts_client.speak_text_in_voice(vc, f"hola número {cfg.seed} {i}")
+        if not ok:
+            raise RuntimeError("speak_text_in_voice falló")
+        samples.append(vc.starts[0] - start)
+    return samples
+
+
+async def bench_mixer_frame(cfg, frames: int = 500) -> list:
+    """CPU de MixerSource.read() por frame de 20 ms con voz encima (ducking incluido)."""
+    samples = []
+    mixer = MixerSource(FakeSource(frames * cfg.runs, pcm=True))
+    for _ in range(cfg.runs):
+        mixer.play_overlay(FakeSource(frames, pcm=True))
+        start = time.perf_counter()
+        for _ in range(frames):
+            mixer.read()
+        samples.append((time.perf_counter() - start) / frames)
+    mixer.cleanup()
+    return samples
+
+
+async def bench_on_message(cfg, batch: int = 2000) -> list:
+    """on_message con tráfico de charla (lo que no es para el bot), por cada 1000 mensajes."""
+    if message_router.user_id is None:
+        message_router.bind(4242)
+    channel = SimpleNamespace(id=1)
+    someone = SimpleNamespace(id=7, bot=False)
+    texts = ["jajaja", "alguien para jugar esta noche?", "<@7> mira esto", "https://example.com/meme.png",
+             "no sé, ya veremos " * 5]
+    messages = [
+        SimpleNamespace(id=i, content=texts[i % len(texts)], author=someone, channel=channel, guild=None,
+                        mentions=[someone] if texts[i % len(texts)].startswith("<@7>") else [])
+        for i in range(batch)
+    ]
+    samples = []
+    for _ in range(cfg.runs):
+        start = time.perf_counter()
+        for message in messages:
+            await on_message(message)
+        samples.append((time.perf_counter() - start) / batch * 1000)
+    return samples
+
+
+async def bench_queue_ops(cfg, size: int = 500) -> list:
+    """Llenar una cola, paginar, buscar URL, borrar y mover por posición y vaciarla."""
+    songs = [Song(f"u{i}", f"t{i}", f"r{i}", None) for i in range(size)]
+    samples = []
+    for _ in range(cfg.runs):
+        start = time.perf_counter()
+        q = MusicQueue(limit=size)
+        q.enqueue_many(songs)
+        list(q.page(size // PAGE_SIZE - 1))
+        q.contains_url(f"u{size - 1}")
+        q.remove_at(size // 2)
+        q.move(size - 100, 0)
+        while q.dequeue():
+            pass
+        samples.append(time.perf_counter() - start)
+    return samples
+
+
+# ---------------------------------------------------------------- informe
+
+def percentile(samples: list, p: float) -> float:
+    """Percentil por rango más cercano."""
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(p / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def summarize(samples: list) -> dict:
+    if not samples:
+        return {"n": 0}
+    ms = [s * 1000 for s in samples]
+    return {
+        "n": len(ms),
+        "p50_ms": round(percentile(ms, 50), 3),
+        "p95_ms": round(percentile(ms, 95), 3),
+        "p99_ms": round(percentile(ms, 99), 3),
+        "mean_ms": round(sum(ms) / len(ms), 3),
+        "max_ms": round(max(ms), 3),
+    }
+
+
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except Exception:
+        return None
+
+
+class _patched:
+    """Sustituye yt-dlp, FFmpeg y gTTS mientras dura el benchmark."""
+
+    def __init__(self, cfg):
+        self.cfg = cfg
+        self._saved = []
+
+    def _set(self, obj, name, value):
+        self._saved.append((obj, name, getattr(obj, name)))
+        setattr(obj, name, value)
+
+    def __enter__(self):
+        rng = random.Random(self.cfg.seed)
+        ydl = FakeYDL(self.cfg.ytdl_latency, rng, duration=self.cfg.track_frames * FRAME_SECONDS)
+        FakeGTTS.latency = self.cfg.tts_latency
+        frames = self.cfg.track_frames
+        self._set(ytdlp_client, "get_ytdl", lambda: ydl)
+        self._set(music_commands, "make_ffmpeg_source",
+                  lambda resolved, start=0.0, pcm=False, bitrate=None: FakeSource(frames, pcm))
+        self._set(gtts_client, "_synthesize", FakeGTTS.synthesize)
+        self._set(discord, "FFmpegOpusAudio", lambda *a, **k: FakeSource(frames))
+        return self
+
+    def __exit__(self, *exc):
+        for obj, name, value in reversed(self._saved):
+            setattr(obj, name, value)
+
+
+async def run(cfg) -> dict:
+    bot.loop = asyncio.get_running_loop()
+    with _patched(cfg):
+        results = {
+            "command_to_first_audio": summarize(await bench_first_audio(cfg)),
+            "track_change_gap": summarize(await bench_track_gap(cfg)),
+            "ia_reply": summarize(await bench_ia(cfg)),
+            "tts_first_audio": summarize(await bench_tts(cfg)),
+            "mixer_frame": summarize(await bench_mixer_frame(cfg)),
+            "on_message_1k": summarize(await bench_on_message(cfg)),
+            "queue_ops": summarize(await bench_queue_ops(cfg)),
+        }
+    chatter = results["on_message_1k"]
+    if chatter.get("mean_ms"):
+        chatter["per_sec"] = round(1000 * 1000 / chatter["mean_ms"])
+    return {
+        "commit": _git_commit(),
+        "timestamp": time.time(),
+        "python": sys.version.split()[0],
+        "config": {k: v for k, v in vars(cfg).items() if k not in ("out", "compare")},
+        "results": results,
+    }
+
+
+def _print_report(report: dict, baseline: dict = None):
+    base = (baseline or {}).get("results", {})
+    print(f"commit {report['commit'] or '?'}")
+    for name, stats in report["results"].items():
+        line = f"{name:24} n={stats.get('n', 0):<4}"
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if key not in stats:
+                continue
+            line += f" {key[:-3]}={stats[key]:9.2f}ms"
+            old = base.get(name, {}).get(key)
+            if old:
+                line += f" ({(stats[key] - old) / old * 100:+.0f}%)"
+        if "per_sec" in stats:
+            line += f" {stats['per_sec']}/s"
+        print(line)
+
+
+def parse_args(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--runs", type=int, default=30)
+    parser.add_argument("--ytdl-latency", type=float, default=0.15, help="segundos por llamada a yt-dlp")
+    parser.add_argument("--groq-latency", type=float, default=0.25, help="segundos por respuesta de Groq")
+    parser.add_argument("--tts-latency", type=float, default=0.2, help="segundos por síntesis de gTTS")
+    parser.add_argument("--frame-seconds", type=float, default=0.002, help="ritmo del reproductor falso")
+    parser.add_argument("--track-frames", type=int, default=250, help="frames por pista")
+    parser.add_argument("--seed", type=int, default=int(time.time()))
+    parser.add_argument("--out", default=None, help="escribe los resultados en este JSON")
+    parser.add_argument("--compare", default=None, help="JSON de una ejecución anterior para comparar")
+    return parser.parse_args(argv)
+
+
+def main(argv=None):
+    cfg = parse_args(argv)
+    report = asyncio.run(run(cfg))
+    baseline = None
+    if cfg.compare:
+        with open(cfg.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+    _print_report(report, baseline)
+    if cfg.out:
+        with open(cfg.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    return report
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Desglose del coste de imports del arranque de Kaivoxx, sin conectar a Discord.
+
+Lanza un intérprete nuevo con `python -X importtime` que hace lo mismo que
+`main.py` antes de `bot.run` (importar el bot y registrar los comandos), y
+resume qué paquetes cuestan más. Falla (código 1) si se supera el presupuesto
+o si se cargó alguna de las dependencias que deben esperar a on_ready, para
+que CI lo pueda comprobar:
+
+    python tests/bench/startup_report.py
+    python tests/bench/startup_report.py --budget-ms 400 --out startup.json
+
+Las fases en tiempo de ejecución (login, gateway) las registra el propio bot
+con STARTUP_REPORT=<ruta.json>.
+"""
+import argparse
+import json
+import os
+import subprocess
+import sys
+
+ROOT = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+from infrastructure.startup import DEFERRED_MODULES
+
+STARTUP_CODE = "from infrastructure.discord import bot_client; bot_client.create_bot()"
+
+
+def parse_importtime(stderr: str) -> list:
+    """Líneas de `-X importtime` -> [(módulo, self_us, cumulative_us, profundidad)]."""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        try:
+            self_us, cumulative, name = line[len("import time:"):].split("|", 2)
+            depth = (len(name) - len(name.lstrip())) // 2
+            rows.append((name.strip(), int(self_us), int(cumulative), depth))
+        except ValueError:
+            continue
+    return rows
+
+
+def summarize(rows: list, top: int = 15) -> dict:
+    """Tiempo propio sumado por paquete de primer nivel (yt_dlp, discord, numpy…)."""
+    packages = {}
+    for name, self_us, _, _ in rows:
+        root = name.split(".")[0]
+        packages[root] = packages.get(root, 0) + self_us
+    heaviest = sorted(packages.items(), key=lambda kv: -kv[1])[:top]
+    loaded = {name for name, *_ in rows}
+    return {
+        "total_ms": round(sum(packages.values()) / 1000, 1),
+        "packages_ms": {k: round(us / 1000, 1) for k, us in heaviest},
+        "deferred_loaded": [m for m in DEFERRED_MODULES if m in loaded],
+    }
+
+
+def measure(code: str = STARTUP_CODE, top: int = 15) -> dict:
+    proc = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", code],
+        cwd=ROOT, capture_output=True, text=True,
+    )
+    if proc.returncode != 0:
+        raise RuntimeError(f"El arranque falló:\n{proc.stderr[-2000:]}")
+    return summarize(parse_importtime(proc.stderr), top)
+
+
+def check(report: dict, budget_ms: float) -> list:
+    problems = []
+    if report["deferred_loaded"]:
+        problems.append(f"se cargan antes de conectar: {', '.join(report['deferred_loaded'])}")
+    if budget_ms and report["total_ms"] > budget_ms:
+        problems.append(f"imports en {report['total_ms']}ms, presupuesto {budget_ms}ms")
+    return problems
+
+
+def main(argv=None) -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--budget-ms", type=float, default=0, help="falla si los imports tardan más (0 = sin límite)")
+    parser.add_argument("--top", type=int, default=15)
+    parser.add_argument("--out", default=None, help="escribe el informe en este JSON")
+    args = parser.parse_args(argv)
+
+    report = measure(top=args.top)
+    print(f"imports del arranque: {report['total_ms']:.1f}ms")
+    for name, ms in report["packages_ms"].items():
+        print(f"  {name:<28} {ms:8.1f}ms")
+    problems = check(report, args.budget_ms)
+    report["problems"] = problems
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+    for problem in problems:
+        print(f"FALLO: {problem}")
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,112 @@
+import asyncio
+import os
+import stat
+import sys
+from infrastructure.audio.disk_cache import AudioDiskCache
+from infrastructure.executors import audio_cache_executor
+
+
+def fake_ffmpeg(tmp_path, size: int, exit_code: int = 0):
+    """Un 'ffmpeg' que escribe `size` bytes en el último argumento (la salida)."""
+    script = tmp_path / "ffmpeg"
+    script.write_text(
+        f"#!{sys.executable}\n"
+        "import sys\n"
+        f"open(sys.argv[-1], 'wb').write(b'x' * {size})\n"
+        f"sys.exit({exit_code})\n"
+    )
+    script.chmod(script.stat().st_mode | stat.S_IEXEC)
+    return str(script)
+
+
+RESOLVED = {"url": "https://x.googlevideo.com/videoplayback", "http_headers": {"User-Agent": "ua"}}
+
+
+async def play(cache, video_id, times=1, duration=200):
+    for _ in range(times):
+        cache.record_play(video_id, RESOLVED, duration)
+    await asyncio.gather(*list(cache._filling.values()))
+
+
+def test_fills_after_threshold_and_serves_from_disk(tmp_path):
+    cache = AudioDiskCache(str(tmp_path / "audio"), 10_000, min_plays=2, executable=fake_ffmpeg(tmp_path, 100))
+
+    async def scenario():
+        await play(cache, "aaaaaaaaaaa")
+        assert cache.get("aaaaaaaaaaa") is None
+        await play(cache, "aaaaaaaaaaa")
+        return cache.get("aaaaaaaaaaa")
+
+    path = asyncio.run(scenario())
+    assert path and os.path.getsize(path) == 100
+    assert cache.stats() == {"files": 1, "bytes": 100, "hits": 1, "misses": 1, "fills": 1}
+
+def test_evicts_least_recently_used_over_budget(tmp_path):
+    cache = AudioDiskCache(str(tmp_path / "audio"), 250, min_plays=1, executable=fake_ffmpeg(tmp_path, 100))
+
+    async def scenario():
+        await play(cache, "aaaaaaaaaaa")
+        await play(cache, "bbbbbbbbbbb")
+        cache.get("aaaaaaaaaaa")
+        await play(cache, "ccccccccccc")
+
+    asyncio.run(scenario())
+    assert cache.contains("aaaaaaaaaaa") and cache.contains("ccccccccccc")
+    assert not cache.contains("bbbbbbbbbbb")
+    assert not os.path.exists(tmp_path / "audio" / "bbbbbbbbbbb.ogg")
+    assert cache.size == 200
+
+def test_skips_long_tracks_and_failed_fills(tmp_path):
+    ok = AudioDiskCache(str(tmp_path / "a"), 10_000, min_plays=1, executable=fake_ffmpeg(tmp_path, 10))
+    asyncio.run(play(ok, "aaaaaaaaaaa", duration=None))
+    asyncio.run(play(ok, "bbbbbbbbbbb", duration=3 * 3600))
+    assert ok.stats()["fills"] == 0
+
+    broken = AudioDiskCache(str(tmp_path / "b"), 10_000, min_plays=1, executable=fake_ffmpeg(tmp_path, 10, exit_code=1))
+    asyncio.run(play(broken, "ccccccccccc"))
+    assert not broken.contains("ccccccccccc")
+    assert os.listdir(tmp_path / "b") == []
+
+def test_index_survives_restart_and_drops_partial_files(tmp_path):
+    directory = tmp_path / "audio"
+    directory.mkdir()
+    (directory / "aaaaaaaaaaa.ogg").write_bytes(b"x" * 30)
+    (directory / "bbbbbbbbbbb.ogg.part").write_bytes(b"x" * 5)
+    cache = AudioDiskCache(str(directory), 10_000)
+
+    async def scenario():
+        await cache.load()
+        return cache.get("aaaaaaaaaaa")
+
+    assert asyncio.run(scenario()) == str(directory / "aaaaaaaaaaa.ogg")
+    assert cache.size == 30
+    assert not (directory / "bbbbbbbbbbb.ogg.part").exists()
+
+def test_index_is_read_off_the_loop_and_hits_touch_in_background(tmp_path):
+    directory = tmp_path / "audio"
+    directory.mkdir()
+    path = directory / "aaaaaaaaaaa.ogg"
+    path.write_bytes(b"x" * 30)
+    os.utime(path, (1, 1))
+    cache = AudioDiskCache(str(directory), 10_000)
+    done_before = audio_cache_executor.stats()["completed"]
+
+    async def scenario():
+        first = cache.get("aaaaaaaaaaa")  # índice aún sin leer: fallo, sin tocar disco aquí
+        await cache.load()
+        second = cache.get("aaaaaaaaaaa")
+        for _ in range(100):
+            if os.path.getmtime(path) > 1:
+                break
+            await asyncio.sleep(0.01)
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert first is None and second == str(path)
+    assert os.path.getmtime(path) > 1
+    assert audio_cache_executor.stats()["completed"] >= done_before + 2  # escaneo y mtime, en su hilo
+
+def test_disabled_without_directory():
+    cache = AudioDiskCache("", 10_000)
+    cache.record_play("aaaaaaaaaaa", RESOLVED, 200)
+    assert cache.get("aaaaaaaaaaa") is None and not cache.contains("aaaaaaaaaaa")
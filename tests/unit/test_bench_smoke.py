@@ -0,0 +1,17 @@
+import json
+from tests.bench import run_bench
+
+def test_percentile_nearest_rank():
+    samples = list(range(1, 101))
+    assert run_bench.percentile(samples, 50) == 50
+    assert run_bench.percentile(samples, 99) == 99
+    assert run_bench.percentile([7], 95) == 7
+
+def test_bench_runs_offline(tmp_path):
+    out = tmp_path / "bench.json"
+    run_bench.main(["--runs", "2", "--ytdl-latency", "0", "--groq-latency", "0", "--tts-latency", "0",
+                    "--track-frames", "5", "--seed", "1", "--out", str(out)])
+    report = json.loads(out.read_text())
+    assert set(report["results"]) == {"command_to_first_audio", "track_change_gap", "ia_reply", "tts_first_audio",
+                                      "mixer_frame", "on_message_1k", "queue_ops"}
+    assert all(stats["n"] == 2 for stats in report["results"].values())
@@ -0,0 +1,75 @@
+import asyncio
+import sys
+import discord
+import infrastructure.discord.cluster_launcher as launcher
+from infrastructure.discord.bot_client import make_bot
+
+
+def test_plan_clusters_splits_contiguous_and_even():
+    assert launcher.plan_clusters(10, 3) == [[0, 1, 2, 3], [4, 5, 6], [7, 8, 9]]
+    assert launcher.plan_clusters(2, 4) == [[0], [1]]
+    assert launcher.plan_clusters(1, 1) == [[0]]
+
+def test_cluster_env_gives_each_process_its_shards_and_port():
+    env = launcher.cluster_env({"PORT": "8080", "DISCORD_TOKEN": "t"}, 2, [4, 5], 8, metrics_port=8080)
+    assert env["SHARD_IDS"] == "4,5" and env["SHARD_COUNT"] == "8" and env["CLUSTER_ID"] == "2"
+    assert env["METRICS_PORT"] == "8082" and "PORT" not in env and env["DISCORD_TOKEN"] == "t"
+
+def test_cluster_env_gives_each_process_its_own_files():
+    base = {"AUDIO_CACHE_DIR": "/data/audio", "SNAPSHOT_DB": "/data/kaivoxx.db", "STARTUP_REPORT": "startup.json"}
+    env = launcher.cluster_env(base, 1, [2, 3], 4, metrics_port=0)
+    assert env["AUDIO_CACHE_DIR"] == "/data/audio/cluster-1"
+    assert env["SNAPSHOT_DB"] == "/data/kaivoxx.cluster-1.db"
+    assert env["STARTUP_REPORT"] == "startup.cluster-1.json"
+    assert launcher.cluster_env({}, 0, [0], 1, metrics_port=0).get("AUDIO_CACHE_DIR") is None
+
+def test_make_bot_picks_sharded_class():
+    assert not isinstance(make_bot(""), discord.AutoShardedClient)
+    bot = make_bot("4", [2, 3])
+    assert isinstance(bot, discord.AutoShardedClient)
+    assert bot.shard_count == 4 and bot.shard_ids == [2, 3]
+
+def test_launcher_starts_in_order_and_restarts_dead_clusters(monkeypatch):
+    monkeypatch.setattr(launcher, "IDENTIFY_INTERVAL", 0)
+    monkeypatch.setattr(launcher, "RESTART_BACKOFF", (0,))
+    started = []
+    real_exec = asyncio.create_subprocess_exec
+
+    async def spawn(*args, env):
+        started.append(env["CLUSTER_ID"])
+        return await real_exec(sys.executable, "-c", "pass")
+
+    monkeypatch.setattr(launcher.asyncio, "create_subprocess_exec", spawn)
+    cl = launcher.ClusterLauncher([[0, 1], [2]], 3, ["main.py"])
+
+    async def scenario():
+        run = asyncio.create_task(cl.run())
+        while cl.restarts < 3:
+            await asyncio.sleep(0.01)
+        cl.stop()
+        await run
+
+    asyncio.run(asyncio.wait_for(scenario(), 10))
+    assert started[:2] == ["0", "1"]
+    assert started.count("0") >= 2 or started.count("1") >= 2
+
+def test_backoff_resets_after_a_healthy_run(monkeypatch):
+    monkeypatch.setattr(launcher, "IDENTIFY_INTERVAL", 0)
+    monkeypatch.setattr(launcher, "RESTART_BACKOFF", (0, 30))  # sin reset, el 2º relanzamiento esperaría 30 s
+    monkeypatch.setattr(launcher, "HEALTHY_UPTIME", 0)
+    real_exec = asyncio.create_subprocess_exec
+
+    async def spawn(*args, env):
+        return await real_exec(sys.executable, "-c", "pass")
+
+    monkeypatch.setattr(launcher.asyncio, "create_subprocess_exec", spawn)
+    cl = launcher.ClusterLauncher([[0]], 1, ["main.py"])
+
+    async def scenario():
+        run = asyncio.create_task(cl.run())
+        while cl.restarts < 3:
+            await asyncio.sleep(0.01)
+        cl.stop()
+        await run
+
+    asyncio.run(asyncio.wait_for(scenario(), 10))
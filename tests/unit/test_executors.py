@@ -0,0 +1,39 @@
+import asyncio
+import threading
+import os
+from infrastructure.executors import BoundedExecutor, ProcessExecutor
+
+def test_pool_tracks_queue_and_wait():
+    ex = BoundedExecutor("test", 1)
+    gate = threading.Event()
+
+    async def scenario():
+        first = asyncio.ensure_future(ex.run(gate.wait))
+        second = asyncio.ensure_future(ex.run(lambda: 42))
+        await asyncio.sleep(0.05)
+        stats = ex.stats()
+        gate.set()
+        return stats, await first, await second
+
+    stats, _, result = asyncio.run(scenario())
+    assert stats["running"] == 1
+    assert stats["queued"] == 1
+    assert result == 42
+    after = ex.stats()
+    assert after["queued"] == 0 and after["completed"] == 2
+    assert after["wait_max"] > 0
+    ex.shutdown()
+
+def test_process_pool_recycles_workers_and_counts_in_flight():
+    ex = ProcessExecutor("proc-test", 1, max_tasks_per_child=2)
+
+    async def scenario():
+        await ex.warm(os.getpid)
+        return [await ex.run(os.getpid) for _ in range(4)]
+
+    pids = asyncio.run(scenario())
+    assert os.getpid() not in pids
+    assert len(set(pids)) >= 2  # el worker se recicló tras 2 trabajos
+    stats = ex.stats()
+    assert stats["completed"] == 5 and stats["running"] == 0 and stats["queued"] == 0
+    ex.shutdown()
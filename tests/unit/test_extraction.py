@@ -0,0 +1,44 @@
+import pytest
+from infrastructure.ytdlp import extraction
+
+FORMATS = [
+    {"url": "a140", "acodec": "mp4a.40.2", "vcodec": "none", "abr": 129, "protocol": "https"},
+    {"url": "a251", "acodec": "opus", "vcodec": "none", "abr": 135, "protocol": "https"},
+]
+
+def video(vid, **extra):
+    return {"id": vid, "title": vid, "webpage_url": f"https://www.youtube.com/watch?v={vid}", "extractor": "youtube",
+            "duration": 100, "formats": FORMATS, "http_headers": {"User-Agent": "ua"}, "subtitles": {"es": "..."},
+            **extra}
+
+def test_compact_result_drops_heavy_fields():
+    single = extraction.compact_result(video("aaaaaaaaaaa", url="a251", acodec="opus"))
+    assert single["url"] == "a251" and single["acodec"] == "opus" and single["extractor"] == "youtube"
+    assert "formats" not in single and "subtitles" not in single
+    assert [f["url"] for f in single["audio_formats"]] == ["a251", "a140"]
+
+    playlist = extraction.compact_result({"_type": "playlist", "title": "p", "entries": [
+        {"_type": "url", "id": "b", "url": "https://www.youtube.com/watch?v=b", "title": "B", "view_count": 9}, None,
+    ]})
+    assert playlist["entries"] == [{"_type": "url", "id": "b", "url": "https://www.youtube.com/watch?v=b", "title": "B"}]
+
+def test_resolve_with_follows_radio_entry_and_falls_back_to_formats():
+    calls = []
+
+    def extract(url):
+        calls.append(url)
+        if "list=" in url:
+            return {"entries": [{"url": "https://www.youtube.com/watch?v=ccccccccccc"}]}
+        return video("ccccccccccc")  # sin 'url': la elige resolve_with
+
+    resolved = extraction.resolve_with(extract, "https://www.youtube.com/watch?v=x&list=RDx")
+    assert calls[-1] == "https://www.youtube.com/watch?v=ccccccccccc"
+    assert resolved["url"] == "a251" and resolved["acodec"] == "opus"
+    assert resolved["http_headers"] == {"User-Agent": "ua"}
+
+def test_resolve_with_uses_known_entry_and_reports_failures():
+    hit = {"url": "cached"}
+    radio = {"entries": [{"url": "https://www.youtube.com/watch?v=ddddddddddd"}]}
+    assert extraction.resolve_with(lambda url: radio, "u", cached=lambda vid: hit) is hit
+    with pytest.raises(RuntimeError):
+        extraction.resolve_with(lambda url: None, "u")
@@ -0,0 +1,93 @@
+import asyncio
+from aiohttp import web
+from infrastructure.ia.groq_client import GroqClient, GroqError, retry_delay
+
+def _reply(text):
+    return {"choices": [{"message": {"content": text}}]}
+
+async def _serve(handler):
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    port = runner.addresses[0][1]
+    return runner, f"http://127.0.0.1:{port}/v1/chat/completions"
+
+def test_retry_delay_honors_retry_after():
+    assert retry_delay(0, "2") == 2.0
+    assert 0 <= retry_delay(3, None, base=0.5, cap=1.0) <= 1.0
+
+def test_retries_429_then_succeeds():
+    calls = []
+
+    async def handler(request):
+        calls.append(await request.json())
+        if len(calls) < 3:
+            return web.json_response({"error": "rate"}, status=429, headers={"Retry-After": "0"})
+        return web.json_response(_reply("hola"))
+
+    async def scenario():
+        runner, url = await _serve(handler)
+        client = GroqClient(url, max_retries=3)
+        try:
+            return await client.chat({"messages": []})
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    data = asyncio.run(scenario())
+    assert data["choices"][0]["message"]["content"] == "hola"
+    assert len(calls) == 3
+
+def test_gives_up_after_max_retries():
+    async def handler(request):
+        return web.json_response({}, status=503, headers={"Retry-After": "0"})
+
+    async def scenario():
+        runner, url = await _serve(handler)
+        client = GroqClient(url, max_retries=1)
+        try:
+            await client.chat({"messages": []})
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    try:
+        asyncio.run(scenario())
+    except GroqError:
+        pass
+    else:
+        raise AssertionError("se esperaba GroqError")
+
+def test_concurrency_caps_and_keepalive():
+    state = {"inflight": 0, "peak": 0, "peers": set()}
+
+    async def handler(request):
+        state["peers"].add(request.transport.get_extra_info("peername"))
+        state["inflight"] += 1
+        state["peak"] = max(state["peak"], state["inflight"])
+        await asyncio.sleep(0.02)
+        state["inflight"] -= 1
+        return web.json_response(_reply("ok"))
+
+    async def scenario():
+        runner, url = await _serve(handler)
+        client = GroqClient(url, max_concurrency=3, guild_concurrency=1)
+        try:
+            # una sola guild: nunca más de 1 petición a la vez
+            await asyncio.gather(*(client.chat({}, guild_id=1) for _ in range(4)))
+            single_guild_peak = state["peak"]
+            state["peak"] = 0
+            await asyncio.gather(*(client.chat({}, guild_id=g) for g in range(10)))
+            return single_guild_peak
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    single_guild_peak = asyncio.run(scenario())
+    assert single_guild_peak == 1
+    assert state["peak"] <= 3
+    # las conexiones se reutilizan en vez de abrir una por petición
+    assert len(state["peers"]) <= 3
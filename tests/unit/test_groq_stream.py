@@ -0,0 +1,154 @@
+import asyncio
+import json
+from aiohttp import web
+import infrastructure.ia.groq_client as groq
+from infrastructure.discord.views.streaming import send_streaming_reply
+
+def _sse_handler(pieces, fail_after=None, gap=0.005):
+    async def handler(request):
+        body = await request.json()
+        assert body["stream"] is True
+        resp = web.StreamResponse(headers={"Content-Type": "text/event-stream"})
+        await resp.prepare(request)
+        for i, piece in enumerate(pieces):
+            if fail_after is not None and i == fail_after:
+                request.transport.close()
+                return resp
+            chunk = {"choices": [{"delta": {"content": piece}}]}
+            await resp.write(f"data: {json.dumps(chunk)}\n\n".encode())
+            await asyncio.sleep(gap)
+        await resp.write(b"data: [DONE]\n\n")
+        return resp
+    return handler
+
+async def _serve(handler):
+    app = web.Application()
+    app.router.add_post("/v1/chat/completions", handler)
+    runner = web.AppRunner(app)
+    await runner.setup()
+    site = web.TCPSite(runner, "127.0.0.1", 0)
+    await site.start()
+    return runner, f"http://127.0.0.1:{runner.addresses[0][1]}/v1/chat/completions"
+
+class FakeMessage:
+    def __init__(self, content):
+        self.content = content
+        self.edits = []
+
+    async def edit(self, content):
+        self.content = content
+        self.edits.append(content)
+
+class FakeChannel:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, content):
+        msg = FakeMessage(content)
+        self.sent.append(msg)
+        return msg
+
+def _run_stream(monkeypatch, pieces, fail_after=None, gap=0.005, timeout=20):
+    async def scenario():
+        runner, url = await _serve(_sse_handler(pieces, fail_after, gap))
+        client = groq.GroqClient(url, max_retries=0, timeout=timeout)
+        monkeypatch.setattr(groq, "groq_client", client)
+        try:
+            out = []
+            async for piece in groq.groq_chat_stream("chan_test", "hola"):
+                out.append(piece)
+            return out
+        finally:
+            await client.close()
+            await runner.cleanup()
+    return asyncio.run(scenario())
+
+def test_iter_sse_deltas_skips_noise():
+    async def lines():
+        for raw in [b": keep-alive\n", b"\n", b'data: {"choices":[{"delta":{"role":"assistant"}}]}\n',
+                    b'data: {"choices":[{"delta":{"content":"Ho"}}]}\n', b"data: no-json\n",
+                    b'data: {"choices":[{"delta":{"content":"la"}}]}\n', b"data: [DONE]\n",
+                    b'data: {"choices":[{"delta":{"content":"tarde"}}]}\n']:
+            yield raw
+
+    async def collect():
+        return [p async for p in groq.iter_sse_deltas(lines())]
+
+    assert asyncio.run(collect()) == ["Ho", "la"]
+
+def test_stream_commits_history_on_completion(monkeypatch):
+    groq.conversation_history.pop("chan_test", None)
+    pieces = _run_stream(monkeypatch, ["Hola", " ", "mundo"])
+    assert "".join(pieces) == "Hola mundo"
+    history = groq.conversation_history["chan_test"].as_messages()
+    assert [m["role"] for m in history[-2:]] == ["user", "assistant"]
+    assert history[-1]["content"] == "Hola mundo"
+
+def test_stream_cut_does_not_touch_history(monkeypatch):
+    groq.conversation_history.pop("chan_test", None)
+    pieces = _run_stream(monkeypatch, ["a", "b", "c"], fail_after=1)
+    assert "chan_test" not in groq.conversation_history
+    assert pieces == ["a", groq.STREAM_CUT_NOTICE]
+
+def test_long_healthy_stream_is_not_cut_by_timeout(monkeypatch):
+    groq.conversation_history.pop("chan_test", None)
+    # 10 trozos cada 0.05 s: 0.5 s en total, más que el timeout, pero nunca en silencio tanto
+    pieces = _run_stream(monkeypatch, ["x"] * 10, gap=0.05, timeout=0.3)
+    assert pieces == ["x"] * 10
+
+def test_streaming_reply_coalesces_edits():
+    async def chunks():
+        for piece in ["uno ", "dos ", "tres ", "cuatro"]:
+            yield piece
+
+    channel = FakeChannel()
+    text = asyncio.run(send_streaming_reply(channel, chunks(), interval=60))
+    assert text == "uno dos tres cuatro"
+    assert len(channel.sent) == 1
+    msg = channel.sent[0]
+    # primer trozo publicado al instante, el resto en una única edición final
+    assert msg.edits == ["uno dos tres cuatro"]
+
+def test_habla_does_not_speak_a_cut_reply(monkeypatch):
+    import types
+    import contextlib
+    import infrastructure.discord.views.streaming as streaming
+    import infrastructure.discord.commands.ia_commands as ia_commands
+
+    spoken = []
+
+    async def speak(vc, text):
+        spoken.append(text)
+        return True
+
+    monkeypatch.setattr(streaming, "IA_STREAMING", True)
+    monkeypatch.setattr(ia_commands, "speak_text_in_voice", speak)
+
+    class Channel(FakeChannel):
+        id = 555
+
+        def typing(self):
+            return contextlib.nullcontext()
+
+    voice_channel = types.SimpleNamespace(id=9, name="voz")
+    vc = types.SimpleNamespace(channel=voice_channel)
+    channel = Channel()
+    message = types.SimpleNamespace(
+        channel=channel, guild=types.SimpleNamespace(id=1, voice_client=vc),
+        author=types.SimpleNamespace(voice=types.SimpleNamespace(channel=voice_channel)),
+    )
+
+    async def scenario(fail_after):
+        runner, url = await _serve(_sse_handler(["Hola", " a", " todos"], fail_after))
+        client = groq.GroqClient(url, max_retries=0)
+        monkeypatch.setattr(groq, "groq_client", client)
+        try:
+            await ia_commands._reply_to_message(message, "hola", speak=True)
+        finally:
+            await client.close()
+            await runner.cleanup()
+
+    asyncio.run(scenario(fail_after=1))
+    assert spoken == [] and channel.sent[-1].content.endswith(groq.STREAM_CUT_NOTICE)
+    asyncio.run(scenario(fail_after=None))
+    assert spoken == ["Hola a todos"]
@@ -0,0 +1,25 @@
+from infrastructure.ia.history import ConversationHistory, estimate_tokens
+
+def test_keeps_recent_turns_within_budget():
+    history = ConversationHistory(budget=60, summary_budget=30)
+    for i in range(10):
+        history.add("user", f"mensaje número {i}. " + "x" * 40)
+    messages = history.as_messages()
+    assert messages[-1]["content"].startswith("mensaje número 9.")
+    assert history.tokens + history.summary_tokens <= 60
+    assert sum(estimate_tokens(m["content"]) for m in messages[1:]) == history.tokens
+
+def test_old_turns_are_compacted_into_summary():
+    history = ConversationHistory(budget=40, summary_budget=100)
+    history.add("user", "Pon música de los 80. Y algo de rock también.")
+    history.add("assistant", "Claro, " + "y" * 120)
+    messages = history.as_messages()
+    assert messages[0]["role"] == "system"
+    assert "Usuario: Pon música de los 80." in messages[0]["content"]
+    assert "rock" not in messages[0]["content"]
+
+def test_last_turn_survives_even_if_oversized():
+    history = ConversationHistory(budget=10, summary_budget=0)
+    history.add("user", "z" * 400)
+    assert len(history) == 1
+    assert history.as_messages() == [{"role": "user", "content": "z" * 400}]
@@ -0,0 +1,43 @@
+import asyncio
+import threading
+import time
+from infrastructure.loop_monitor import LoopMonitor
+from infrastructure.metrics import Histogram
+from infrastructure.profiler import sample_stacks, write_folded
+
+def _blocking_handler():
+    time.sleep(0.3)
+
+def test_stall_is_logged_with_stack():
+    monitor = LoopMonitor(interval=0.02, threshold=0.05, histogram=Histogram("lag", "lag"))
+
+    async def scenario():
+        monitor.start()
+        await asyncio.sleep(0.05)
+        _blocking_handler()
+        await asyncio.sleep(0.05)
+        monitor.stop()
+
+    asyncio.run(scenario())
+    assert monitor.stalls == 1
+    assert "_blocking_handler" in monitor.last_stall_stack
+    assert monitor.histogram.count > 0
+
+def _busy_worker(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+def test_sampler_writes_folded_stacks(tmp_path):
+    stop = threading.Event()
+    worker = threading.Thread(target=_busy_worker, args=(stop,), name="busy")
+    worker.start()
+    try:
+        stacks = sample_stacks(0.1, interval=0.002)
+    finally:
+        stop.set()
+        worker.join()
+    assert any(s.startswith("busy;") and "_busy_worker" in s for s in stacks)
+    path = write_folded(stacks, str(tmp_path / "p.folded"))
+    line = open(path).readline().rstrip()
+    stack, count = line.rsplit(" ", 1)
+    assert int(count) > 0 and ";" in stack
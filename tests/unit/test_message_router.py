@@ -0,0 +1,53 @@
+from types import SimpleNamespace
+from infrastructure.discord.message_router import MessageRouter
+
+BOT_ID = 42
+
+
+async def ia(message, text):
+    pass
+
+
+async def habla(message, text):
+    pass
+
+
+def make_router() -> MessageRouter:
+    router = MessageRouter("#")
+    router.route("ia", default=True)(ia)
+    router.route("habla")(habla)
+    router.bind(BOT_ID)
+    return router
+
+
+def user(user_id: int):
+    return SimpleNamespace(id=user_id)
+
+
+def test_ignores_chatter_and_other_mentions():
+    router = make_router()
+    assert router.match("hola a todos") is None
+    assert router.match("<@7> mira esto", [user(7)]) is None
+    assert router.match("") is None
+
+def test_prefix_routes_and_plain_commands():
+    router = make_router()
+    assert router.match("#ia  qué tal  ") == (ia, "qué tal")
+    assert router.match("#habla\nhola") == (habla, "hola")
+    assert router.match("#ia") == (ia, "")
+    assert router.match("#play despacito") == (None, "#play despacito")
+    assert router.match("#iamusic") == (None, "#iamusic")  # no es la ruta `ia`
+    assert router.match("#IA hola") == (None, "#IA hola")  # los alias del comando siguen su camino
+
+def test_mentions_share_the_route_table():
+    router = make_router()
+    assert router.match("<@42> habla hola") == (habla, "hola")
+    assert router.match("<@!42> IA hola") == (ia, "hola")
+    assert router.match("<@42> cuéntame un chiste") == (ia, "cuéntame un chiste")
+    assert router.match("oye <@42> qué hora es", [user(7), user(BOT_ID)]) == (ia, "oye <@42> qué hora es")
+
+def test_unbound_router_only_sees_prefix():
+    router = MessageRouter("#")
+    router.route("ia", default=True)(ia)
+    assert router.match("<@42> hola", [user(BOT_ID)]) is None
+    assert router.match("#ia hola") == (ia, "hola")
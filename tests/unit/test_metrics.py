@@ -0,0 +1,43 @@
+import asyncio
+from aiohttp.test_utils import TestClient, TestServer
+from infrastructure.metrics import Histogram, Registry
+from integration.health_server import build_app
+
+def test_histogram_buckets_are_cumulative():
+    h = Histogram("x_seconds", "x", buckets=(0.1, 1.0))
+    for v in (0.05, 0.1, 0.5, 3.0):
+        h.observe(v)
+    text = h.render()
+    assert 'x_seconds_bucket{le="0.1"} 2' in text
+    assert 'x_seconds_bucket{le="1.0"} 3' in text
+    assert 'x_seconds_bucket{le="+Inf"} 4' in text
+    assert "x_seconds_count 4" in text
+    assert h.count == 4
+
+def test_registry_renders_labelled_gauges():
+    reg = Registry()
+    reg.gauge("pool_queued", "q", lambda: {"ytdl": 3, "tts": 0}, label="executor")
+    reg.gauge("songs", "s", lambda: 7)
+    text = reg.render()
+    assert 'pool_queued{executor="ytdl"} 3' in text
+    assert "# TYPE songs gauge\nsongs 7" in text
+
+class FakeBot:
+    def __init__(self, ready):
+        self.ready = ready
+        self.latency = 0.05
+    def is_ready(self): return self.ready
+    def is_closed(self): return False
+
+def test_health_routes():
+    async def scenario(ready):
+        async with TestClient(TestServer(build_app(FakeBot(ready)))) as client:
+            health = await client.get("/healthz")
+            readiness = await client.get("/readyz")
+            metrics = await client.get("/metrics")
+            return health.status, readiness.status, await metrics.text()
+
+    assert asyncio.run(scenario(False))[:2] == (200, 503)
+    health, ready, text = asyncio.run(scenario(True))
+    assert (health, ready) == (200, 200)
+    assert "kaivoxx_ytdlp_extract_seconds_bucket" in text
@@ -0,0 +1,156 @@
+import asyncio
+import numpy as np
+import discord
+import pytest
+from infrastructure.audio.mixer import MixerSource, find_mixer, ensure_mixer, FRAME_SIZE
+from infrastructure.audio.tracked_source import TrackedSource
+
+
+class PCM(discord.AudioSource):
+    def __init__(self, value: int, frames: int):
+        self.frame = np.full(FRAME_SIZE // 2, value, dtype=np.int16).tobytes()
+        self.frames = frames
+        self.cleaned = False
+
+    def read(self):
+        if self.frames <= 0:
+            return b''
+        self.frames -= 1
+        return self.frame
+
+    def cleanup(self):
+        self.cleaned = True
+
+
+def sample(data: bytes) -> int:
+    return int(np.frombuffer(data, dtype=np.int16)[0])
+
+
+def test_music_passes_through_untouched_without_voice():
+    music = PCM(1000, 3)
+    mixer = MixerSource(music)
+    assert mixer.read() is music.frame
+
+def test_rejects_opus_sources():
+    class Opus(PCM):
+        def is_opus(self):
+            return True
+    with pytest.raises(ValueError):
+        MixerSource(Opus(0, 1))
+
+def test_ducks_music_with_a_ramp_and_restores_it():
+    mixer = MixerSource(PCM(1000, 100), duck=0.5, ramp_frames=5)
+    mixer.play_overlay(PCM(100, 10))
+    first = sample(mixer.read())
+    assert 1000 * 0.5 + 100 < first < 1000 + 100  # la rampa no salta de golpe
+    for _ in range(9):
+        last = mixer.read()
+    assert sample(last) == 500 + 100
+    restored = [sample(mixer.read()) for _ in range(6)]
+    assert restored[-1] == 1000 and not mixer.speaking
+
+def test_clips_instead_of_wrapping():
+    mixer = MixerSource(PCM(30000, 5), duck=1.0)
+    mixer.play_overlay(PCM(30000, 5))
+    assert sample(mixer.read()) == 32767
+
+def test_voice_outlives_music_and_calls_after():
+    done = []
+    voice = PCM(200, 3)
+    mixer = MixerSource(PCM(1000, 1), duck=0.5, ramp_frames=1)
+    mixer.play_overlay(voice, after=done.append)
+    assert sample(mixer.read()) == 700
+    assert sample(mixer.read()) == 200  # música acabada: solo la voz
+    assert sample(mixer.read()) == 200
+    assert mixer.read() == b''
+    assert done == [None] and voice.cleaned
+
+def test_new_overlay_replaces_previous_one():
+    done = []
+    first, second = PCM(1, 10), PCM(2, 10)
+    mixer = MixerSource(PCM(0, 10))
+    mixer.play_overlay(first, after=lambda e: done.append("first"))
+    mixer.play_overlay(second, after=lambda e: done.append("second"))
+    assert done == ["first"] and first.cleaned
+    mixer.cleanup()
+    assert done == ["first", "second"]
+
+def test_find_mixer_through_wrappers():
+    mixer = MixerSource(PCM(0, 1))
+    assert find_mixer(TrackedSource(mixer)) is mixer
+    assert find_mixer(TrackedSource(PCM(0, 1))) is None
+
+def test_swap_discards_frames_already_played():
+    tracked = TrackedSource(PCM(1, 100))
+    for _ in range(10):
+        tracked.read()
+    results = []
+    replacement = PCM(2, 100)
+    tracked.swap(replacement, at=0.1, done=results.append)  # empieza 5 frames por detrás
+    assert sample(tracked.read()) == 2
+    assert results == [True] and replacement.frames == 94
+    assert tracked.position == 0.22
+
+def test_ensure_mixer_upgrades_passthrough_track():
+    music = PCM(1, 500)
+    tracked = TrackedSource(music)
+    built = []
+
+    def make_pcm(start):
+        built.append(start)
+        return MixerSource(PCM(2, 500))
+
+    tracked.make_pcm = make_pcm
+
+    async def scenario():
+        task = asyncio.ensure_future(ensure_mixer(tracked))
+        while not tracked._pending:
+            await asyncio.sleep(0)
+        tracked.read()  # el hilo del reproductor aplica el cambio
+        return await task
+
+    mixer = asyncio.run(scenario())
+    assert isinstance(mixer, MixerSource) and find_mixer(tracked) is mixer
+    assert built == [0.0] and music.cleaned
+    assert asyncio.run(ensure_mixer(tracked)) is mixer
+
+def test_ensure_mixer_gives_up_when_track_closed_during_catch_up():
+    tracked = TrackedSource(PCM(1, 500))
+    for _ in range(20):
+        tracked.read()
+    built = []
+
+    class StoppedMidway(PCM):
+        def read(self):
+            tracked.cleanup()  # skip/stop mientras FFmpeg se pone al día
+            return super().read()
+
+    def make_pcm(start):
+        tracked.frames += 5  # la canción sigue mientras arranca el FFmpeg nuevo
+        built.append(MixerSource(StoppedMidway(2, 500)))
+        return built[-1]
+
+    tracked.make_pcm = make_pcm
+    mixer = asyncio.run(asyncio.wait_for(ensure_mixer(tracked), 2))
+    assert mixer is None and built[0].music.cleaned
+    assert tracked._pending is None and tracked.mixer_task is None
+
+def test_swap_on_closed_source_fails_at_once():
+    tracked = TrackedSource(PCM(1, 10))
+    tracked.cleanup()
+    replacement, results = PCM(2, 10), []
+    tracked.swap(replacement, at=0.0, done=results.append)
+    assert results == [False] and replacement.cleaned and tracked._pending is None
+
+    tracked.make_pcm = lambda start: MixerSource(PCM(2, 10))
+    assert asyncio.run(asyncio.wait_for(ensure_mixer(tracked), 2)) is None
+
+def test_swap_not_applied_in_time_is_withdrawn(monkeypatch):
+    from infrastructure.audio import mixer as mixer_module
+    monkeypatch.setattr(mixer_module, "SWAP_TIMEOUT", 0.05)
+    tracked = TrackedSource(PCM(1, 10))  # en pausa: nadie llama a read()
+    built = []
+    tracked.make_pcm = lambda start: built.append(MixerSource(PCM(2, 10))) or built[-1]
+    assert asyncio.run(ensure_mixer(tracked)) is None
+    assert tracked._pending is None and built[0].music.cleaned
+    assert tracked.mixer_task is None
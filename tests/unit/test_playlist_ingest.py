@@ -0,0 +1,86 @@
+import asyncio
+import threading
+import infrastructure.ytdlp.ytdlp_client as ytdlp_client
+import integration.playlist_ingest as ingest
+from domain.repositories.queue_repository import MusicQueue
+
+URL = "https://www.youtube.com/watch?v=aaaaaaaaaaa&list=RDaaaaaaaaaaa"
+
+
+class FakeYDL:
+    def __init__(self, total, gate=None):
+        self.total = total
+        self.gate = gate
+
+    def _entries(self):
+        for i in range(self.total):
+            if i == 1 and self.gate:
+                self.gate.wait(2)
+            yield {"_type": "url", "url": f"https://www.youtube.com/watch?v=v{i}", "title": f"t{i}", "id": f"v{i}", "ie_key": "Youtube"}
+
+    def extract_info(self, url, download=False, process=True, ie_key=None):
+        if ie_key is None:
+            return {"_type": "url", "url": "https://www.youtube.com/playlist?list=RD", "ie_key": "YoutubeTab"}
+        return {"_type": "playlist", "entries": self._entries()}
+
+
+class FakeMessage:
+    def __init__(self):
+        self.embeds = []
+    async def edit(self, embed=None):
+        self.embeds.append(embed)
+
+class FakeCtx:
+    def __init__(self):
+        self.author = "alguien"
+        self.channel = type("C", (), {"id": 5})()
+        self.guild = type("G", (), {"id": 9})()
+        self.message = FakeMessage()
+    async def send(self, embed=None):
+        return self.message
+
+
+def test_first_entry_plays_before_playlist_finishes(monkeypatch):
+    gate = threading.Event()
+    monkeypatch.setattr(ytdlp_client, "get_ytdl", lambda: FakeYDL(120, gate))
+    queue = MusicQueue()
+    sizes = []
+
+    async def scenario():
+        async def start_playback():
+            sizes.append(len(queue))
+            gate.set()
+        await ingest.start_ingestion(FakeCtx(), URL, queue, start_playback)
+
+    asyncio.run(scenario())
+    assert sizes[0] == 1
+    assert len(queue) == 120
+    assert queue.peek().video_id == "v0"
+
+def test_cancel_stops_ingestion(monkeypatch):
+    gate = threading.Event()
+    monkeypatch.setattr(ytdlp_client, "get_ytdl", lambda: FakeYDL(120, gate))
+    queue = MusicQueue()
+    ctx = FakeCtx()
+
+    async def scenario():
+        async def start_playback():
+            ingest.cancel_ingestion(9)
+        task = ingest.start_ingestion(ctx, URL, queue, start_playback)
+        try:
+            await task
+        except asyncio.CancelledError:
+            pass
+        gate.set()
+        return task
+
+    task = asyncio.run(scenario())
+    assert task.cancelled()
+    assert len(queue) == 1
+    assert "cancelada" in ctx.message.embeds[-1].title
+    assert 9 not in ingest._ingestions
+
+def test_playlist_detection():
+    assert ingest.is_playlist_url(URL)
+    assert not ingest.is_playlist_url("never gonna give you up list=")
+    assert not ingest.is_playlist_url("https://www.youtube.com/watch?v=aaaaaaaaaaa")
@@ -0,0 +1,109 @@
+import asyncio
+import time
+import integration.prefetch as prefetch
+from domain.repositories.queue_repository import MusicQueue
+from domain.entities.song import Song
+
+def _fake_resolver(calls):
+    async def _resolve(url):
+        calls.append(url)
+        await asyncio.sleep(0)
+        return {"url": f"https://x.googlevideo.com/videoplayback?expire={int(time.time()) + 3600}", "http_headers": {}}
+    return _resolve
+
+def test_prefetch_hands_over_head(monkeypatch):
+    calls = []
+    monkeypatch.setattr(prefetch, "resolve_stream", _fake_resolver(calls))
+
+    async def scenario():
+        q = MusicQueue()
+        s1 = Song("u1", "t1", "r1", None)
+        q.enqueue(s1)
+        prefetch.schedule_prefetch(1, q)
+        prefetch.schedule_prefetch(1, q)  # misma cabeza: no se relanza
+        song = q.dequeue()
+        return await prefetch.take_prefetched(1, song)
+
+    resolved = asyncio.run(scenario())
+    assert resolved is not None
+    assert calls == ["u1"]
+
+def test_prefetch_discarded_when_head_changes(monkeypatch):
+    calls = []
+    monkeypatch.setattr(prefetch, "resolve_stream", _fake_resolver(calls))
+
+    async def scenario():
+        q = MusicQueue()
+        q.enqueue(Song("u1", "t1", "r1", None))
+        prefetch.schedule_prefetch(2, q)
+        q.clear()
+        prefetch.invalidate(2)
+        other = Song("u2", "t2", "r2", None)
+        return await prefetch.take_prefetched(2, other)
+
+    assert asyncio.run(scenario()) is None
+
+def test_stale_prefetch_rejected_by_head_identity_without_invalidate(monkeypatch):
+    calls = []
+
+    async def slow_resolve(url):
+        calls.append(url)
+        await asyncio.sleep(10)
+
+    monkeypatch.setattr(prefetch, "resolve_stream", slow_resolve)
+
+    async def scenario():
+        results = []
+        # reordenada: la cabeza pasa a ser otra canción
+        q = MusicQueue()
+        s1, s2 = Song("u1", "t1", "r1", None), Song("u2", "t2", "r2", None)
+        q.enqueue(s1)
+        q.enqueue(s2)
+        prefetch.schedule_prefetch(3, q)
+        task = prefetch._prefetched[3][1]
+        q.move(1, 0)
+        results.append((await prefetch.take_prefetched(3, q.dequeue()), task))
+        # sustituida: misma URL, pero otra entrada de la cola
+        q = MusicQueue()
+        q.enqueue(Song("u3", "t3", "r3", None))
+        prefetch.schedule_prefetch(3, q)
+        task = prefetch._prefetched[3][1]
+        q.clear()
+        q.enqueue(Song("u3", "t3", "r3", None))
+        results.append((await prefetch.take_prefetched(3, q.dequeue()), task))
+        await asyncio.sleep(0)
+        return results
+
+    for resolved, task in asyncio.run(scenario()):
+        assert resolved is None
+        assert task.cancelled()
+    assert 3 not in prefetch._prefetched
+
+def test_reorder_commands_prefetch_the_new_head(monkeypatch):
+    from types import SimpleNamespace
+    import infrastructure.discord.commands.music_commands as music_commands
+    from integration.queue_shim import music_queues
+    scheduled, sent = [], []
+    monkeypatch.setattr(music_commands, "schedule_prefetch", lambda guild_id, queue: scheduled.append(queue.peek()))
+
+    async def send(embed=None):
+        sent.append(embed)
+
+    vc = SimpleNamespace(is_playing=lambda: True, is_paused=lambda: False)
+    guild = SimpleNamespace(id=88, voice_client=vc)
+    ctx = SimpleNamespace(guild=guild, send=send)
+    songs = [Song(f"u{i}", f"t{i}", "r", None) for i in range(3)]
+    q = music_queues[88] = MusicQueue()
+    q.enqueue_many(songs)
+
+    async def scenario():
+        await music_commands.cmd_move.callback(ctx, 3, 1)
+        await music_commands.cmd_remove.callback(ctx, 1)
+        await music_commands.cmd_remove.callback(ctx, 9)  # fuera de rango: ni cambia ni prefetch
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        music_queues.pop(88, None)
+    assert scheduled == [songs[2], songs[0]]
+    assert len(sent) == 3
@@ -0,0 +1,101 @@
+import asyncio
+import types
+import discord
+from infrastructure.audio.tracked_source import TrackedSource
+from infrastructure.discord.views.progress_scheduler import NowPlayingScheduler
+
+class FakeSource(discord.AudioSource):
+    def read(self):
+        return b"\x00" * 3840
+
+class FakeVoice:
+    def __init__(self, source):
+        self.source = source
+        self.playing = True
+
+    def is_connected(self):
+        return True
+
+    def is_playing(self):
+        return self.playing
+
+    def is_paused(self):
+        return False
+
+class FakeMessage:
+    def __init__(self, mid, channel_id, vc):
+        self.id = mid
+        self.channel = types.SimpleNamespace(id=channel_id)
+        self.guild = types.SimpleNamespace(voice_client=vc)
+        embed = discord.Embed(title="np")
+        for name in ("Requested by", "Source", "Time Elapsed"):
+            embed.add_field(name=name, value="0:00")
+        self.embeds = [embed]
+        self.edits = 0
+
+    async def edit(self, embed):
+        self.edits += 1
+
+def _setup(n, **kwargs):
+    sched = NowPlayingScheduler(min_interval=0, tick=1.0, **kwargs)
+    msgs = []
+    for i in range(n):
+        src = TrackedSource(FakeSource())
+        vc = FakeVoice(src)
+        msg = FakeMessage(100 + i, 10 + i, vc)
+        msgs.append((msg, src, vc))
+    return sched, msgs
+
+def test_position_counts_consumed_frames_only():
+    src = TrackedSource(FakeSource(), start_offset=10)
+    for _ in range(150):
+        src.read()
+    assert abs(src.position - 13.0) < 1e-9
+
+def test_global_budget_and_coalescing():
+    async def scenario():
+        sched, msgs = _setup(6, edits_per_second=2)
+        for gid, (msg, src, _) in enumerate(msgs):
+            sched.track(gid, msg, src)
+            src.frames = 100
+        await sched.run_once()
+        first = sum(m.edits for m, _, _ in msgs)
+        for entry in sched._entries.values():
+            entry.next_due = 0
+        await sched.run_once()
+        second = sum(m.edits for m, _, _ in msgs)
+        # sin avance de posición no hay nada que editar
+        for entry in sched._entries.values():
+            entry.next_due = 0
+        await sched.run_once()
+        third = sum(m.edits for m, _, _ in msgs)
+        sched._task.cancel()
+        return first, second, third
+
+    first, second, third = asyncio.run(scenario())
+    assert first == 2
+    assert second == 4
+    assert third == 6
+
+def test_untracks_stopped_and_skips_buried():
+    async def scenario():
+        sched, msgs = _setup(2, edits_per_second=10, offscreen_after=3)
+        for gid, (msg, src, _) in enumerate(msgs):
+            sched.track(gid, msg, src)
+            src.frames = 100
+        msgs[0][2].playing = False
+        for i in range(3):
+            sched.note_message(msgs[1][0].channel.id, 999 + i)
+        await sched.run_once()
+        sched._task.cancel()
+        return sched, msgs
+
+    sched, msgs = asyncio.run(scenario())
+    assert 0 not in sched._entries
+    assert msgs[1][0].edits == 0
+    assert 1 in sched._entries
+
+def test_interval_grows_with_load():
+    sched = NowPlayingScheduler(min_interval=5, edits_per_second=2)
+    sched._entries = {i: None for i in range(40)}
+    assert sched.interval() == 20
@@ -19,3 +19,77 @@ def test_enqueue_and_dequeue():
 def test_list_titles_empty():
     q = MusicQueue()
     assert q.list_titles() == []
+
+def _songs(n):
+    return [Song(f"u{i}", f"t{i}", "r", None) for i in range(n)]
+
+def test_enqueue_many_respects_limit_once():
+    q = MusicQueue(limit=3)
+    assert q.enqueue(Song("u0", "t0", "r", None))
+    assert q.enqueue_many(iter(_songs(5))) == 2
+    assert len(q) == 3
+    assert q.enqueue_many(_songs(1)) == 0
+
+def test_remove_move_and_url_index():
+    q = MusicQueue()
+    q.enqueue_many(_songs(5))
+    assert q.contains_url("u2")
+    assert q.remove_at(2).title == "t2"
+    assert not q.contains_url("u2")
+    assert q.move(0, 2) is True
+    assert q.list_titles() == ["t1", "t3", "t0", "t4"]
+    assert q.move(3, 0) is True
+    assert q.list_titles() == ["t4", "t1", "t3", "t0"]
+    entry_id, song = next(q.items())
+    assert q.remove(entry_id) is song
+    assert q.remove(entry_id) is None
+    assert q.remove_at(10) is None
+
+def test_duplicate_urls_counted():
+    q = MusicQueue()
+    q.enqueue(Song("u", "a", "r", None))
+    q.enqueue(Song("u", "b", "r", None))
+    q.dequeue()
+    assert q.contains_url("u")
+    q.dequeue()
+    assert not q.contains_url("u")
+
+def test_shuffle_keeps_items():
+    q = MusicQueue()
+    q.enqueue_many(_songs(20))
+    q.shuffle()
+    assert sorted(q.list_titles()) == sorted(s.title for s in _songs(20))
+    assert q.contains_url("u7")
+
+def test_page_slicing():
+    q = MusicQueue()
+    q.enqueue_many(_songs(120))
+    assert q.page_count() == 3
+    assert [s.title for s in q.page(2)] == [f"t{i}" for i in range(100, 120)]
+    assert list(q.page(5)) == []
+
+def test_positional_ops_across_blocks_match_a_list():
+    import random
+    rng = random.Random(3)
+    q = MusicQueue(limit=2000)
+    songs = _songs(700)
+    q.enqueue_many(songs)
+    model = list(songs)
+    for _ in range(1500):
+        op = rng.random()
+        if op < 0.5 and model:
+            i, j = rng.randrange(len(model)), rng.randrange(len(model))
+            assert q.move(i, j)
+            model.insert(j, model.pop(i))
+        elif op < 0.75 and model:
+            i = rng.randrange(len(model))
+            assert q.remove_at(i) is model.pop(i)
+        elif model:
+            assert q.dequeue() is model.pop(0)
+        if rng.random() < 0.3:
+            song = Song(f"n{len(model)}", "nuevo", "r", None)
+            q.enqueue(song)
+            model.append(song)
+    assert list(q) == model
+    assert list(q.page(1, 40)) == model[40:80]
+    assert [song for _, song in q.items()] == model
@@ -0,0 +1,189 @@
+import asyncio
+import discord
+import integration.recovery as recovery
+import infrastructure.discord.commands.music_commands as music_commands
+from infrastructure.audio.tracked_source import TrackedSource
+from domain.entities.song import Song
+
+
+class Frames(discord.AudioSource):
+    def __init__(self, frames: int):
+        self.frames = frames
+
+    def read(self):
+        if self.frames <= 0:
+            return b''
+        self.frames -= 1
+        return b'\x00' * 3840
+
+
+def played(frames: int, consume: int = None) -> TrackedSource:
+    source = TrackedSource(Frames(frames))
+    for _ in range(frames + 1 if consume is None else consume):
+        source.read()
+    return source
+
+
+def song(duration=60):
+    return Song("https://www.youtube.com/watch?v=abcdefghijk", "t", "r", None, duration=duration,
+                video_id="abcdefghijk")
+
+
+def test_premature_end_is_recovered_at_position():
+    s = song(duration=60)
+    assert recovery.note_end(1, s, played(500)) is True  # 10 s de 60
+    assert recovery.take(1) == (s, 10.0)
+    assert recovery.take(1) is None
+
+def test_normal_end_and_skip_are_not_recovered():
+    assert recovery.note_end(2, song(duration=10), played(500)) is False
+    assert recovery.note_end(2, song(duration=60), played(500, consume=100)) is False  # stop() a los 2 s
+    assert recovery.note_end(2, song(duration=None), played(500)) is False
+    assert not recovery.has_pending(2)
+
+def test_player_error_is_recovered_even_without_eof():
+    assert recovery.note_end(3, song(), played(500, consume=100), error=OSError("boom")) is True
+    recovery.forget(3)
+    assert not recovery.has_pending(3)
+
+def test_gives_up_after_max_recoveries_and_reresolves_on_retry(monkeypatch):
+    invalidated = []
+    monkeypatch.setattr(recovery.stream_cache, "invalidate", invalidated.append)
+    s = song()
+    for _ in range(recovery.MAX_RECOVERIES):
+        assert recovery.note_end(4, s, played(50)) is True
+        recovery.take(4)
+    assert invalidated == ["abcdefghijk"] * (recovery.MAX_RECOVERIES - 1)
+    assert recovery.note_end(4, s, played(50)) is False
+
+def test_hold_recovers_an_external_stop():
+    s = song()
+    recovery.hold(5)
+    assert recovery.note_end(5, s, played(500, consume=250)) is True
+    recovery.release(5)
+    assert recovery.take(5) == (s, 5.0)
+
+
+class FakeVC:
+    def __init__(self, guild_id):
+        self.guild = type("Guild", (), {"id": guild_id, "voice_client": self})()
+        self.source = self.after = None
+
+    def is_connected(self):
+        return True
+
+    def is_playing(self):
+        return False
+
+    def is_paused(self):
+        return False
+
+    def play(self, source, after):
+        self.source, self.after = source, after
+
+
+def test_playback_resumes_same_song_with_seek(monkeypatch):
+    resolves, starts = [], []
+
+    async def resolve(url):
+        resolves.append(url)
+        return {"url": "https://x.googlevideo.com/videoplayback", "http_headers": {}, "duration": 60}
+
+    def make_source(resolved, start=0.0, pcm=False, bitrate=None):
+        starts.append(start)
+        return Frames(5 if not starts[1:] else 1000)
+
+    async def no_embed(bot, s):
+        return None
+
+    monkeypatch.setattr(music_commands, "resolve_stream", resolve)
+    monkeypatch.setattr(music_commands, "make_ffmpeg_source", make_source)
+    monkeypatch.setattr(music_commands, "send_now_playing_embed", no_embed)
+    monkeypatch.setattr(music_commands, "TTS_MIXING", False)
+    monkeypatch.setattr(music_commands, "schedule_prefetch", lambda guild_id, queue: None)
+
+    async def scenario():
+        vc = FakeVC(77)
+        queue = await music_commands.ensure_queue_for_guild(77)
+        first, second = song(), song()
+        queue.enqueue(first)
+        queue.enqueue(second)
+        await music_commands.start_playback_if_needed(vc.guild)
+        while vc.source.read():
+            pass  # FFmpeg se rinde a los 5 frames
+        await music_commands._on_track_end(vc.guild, first, vc.source, None)
+        current = music_commands.bot._current_song[77]
+        queue.clear()
+        return current, first, len(resolves)
+
+    current, first, n = asyncio.run(scenario())
+    assert current is first
+    assert starts == [0.0, 0.1]
+    assert n == 2
+
+def test_progress_bar_follows_resumed_source(monkeypatch):
+    import types
+    from infrastructure.discord.views.progress_scheduler import now_playing_scheduler
+
+    async def resolve(url):
+        return {"url": "https://x.googlevideo.com/videoplayback", "http_headers": {}, "duration": 60}
+
+    starts = []
+
+    def make_source(resolved, start=0.0, pcm=False, bitrate=None):
+        starts.append(start)
+        return Frames(5 if len(starts) == 1 else 1000)
+
+    async def no_embed(bot, s):
+        return None
+
+    monkeypatch.setattr(music_commands, "resolve_stream", resolve)
+    monkeypatch.setattr(music_commands, "make_ffmpeg_source", make_source)
+    monkeypatch.setattr(music_commands, "send_now_playing_embed", no_embed)
+    monkeypatch.setattr(music_commands, "TTS_MIXING", False)
+    monkeypatch.setattr(music_commands, "schedule_prefetch", lambda guild_id, queue: None)
+
+    class PlayingVC(FakeVC):
+        playing = True
+
+        def is_playing(self):
+            return self.playing
+
+    class Message:
+        id = 1
+        channel = types.SimpleNamespace(id=78)
+
+        def __init__(self, vc):
+            self.guild = vc.guild
+            self.embeds = [discord.Embed(title="np")]
+            for name in ("Requested by", "Source", "Time Elapsed"):
+                self.embeds[0].add_field(name=name, value="00:00")
+            self.shown = []
+
+        async def edit(self, embed):
+            self.shown.append(embed.fields[2].value)
+
+    async def scenario():
+        vc = PlayingVC(78)
+        queue = await music_commands.ensure_queue_for_guild(78)
+        first = song()
+        queue.enqueue(first)
+        vc.playing = False
+        await music_commands.start_playback_if_needed(vc.guild)
+        vc.playing = True
+        msg = Message(vc)
+        now_playing_scheduler.track(78, msg, vc.source)
+        while vc.source.read():
+            pass
+        vc.playing = False  # FFmpeg cortado: la barra deja de actualizarse…
+        await now_playing_scheduler.run_once()
+        assert 78 not in now_playing_scheduler._entries
+        await music_commands._on_track_end(vc.guild, first, vc.source, None)
+        vc.playing = True
+        for _ in range(100):
+            vc.source.read()
+        await now_playing_scheduler.run_once()  # …y vuelve con la canción retomada
+        now_playing_scheduler.untrack(78)
+        return msg.shown
+
+    assert asyncio.run(scenario()) == ["00:02"]
@@ -0,0 +1,60 @@
+import asyncio
+import infrastructure.ytdlp.ytdlp_client as ytdlp_client
+from infrastructure.executors import BoundedExecutor
+from infrastructure.persistence.snapshot_store import SnapshotStore
+from infrastructure.ytdlp.search_cache import SearchCache, normalize_search
+
+def test_normalize_search():
+    assert normalize_search("  Canción   ÑAÑA ") == "cancion nana"
+    assert normalize_search("Despacito (Official Video)") == "despacito"
+    assert normalize_search("despacito official music video") == "despacito"
+    assert normalize_search("Despacito - Video Oficial") == "despacito"
+    assert normalize_search("official") == "official"
+
+def test_lru_and_counters():
+    cache = SearchCache(maxsize=2)
+
+    async def scenario():
+        cache.put("a", {"id": "A", "title": "a"})
+        cache.put("b", {"id": "B", "title": "b"})
+        assert (await cache.get("A"))["id"] == "A"
+        cache.put("c", {"id": "C", "title": "c"})
+        assert await cache.get("b") is None
+
+    asyncio.run(scenario())
+    stats = cache.stats()
+    assert stats["size"] == 2 and stats["hits"] == 1 and stats["misses"] == 1
+    assert stats["hit_rate"] == 0.5
+
+def test_disk_backing_survives_restart(tmp_path):
+    store = SnapshotStore(str(tmp_path / "s.db"), executor=BoundedExecutor("search-test", 1))
+
+    async def scenario():
+        first = SearchCache(store=store, disk_size=1)
+        first.put("Bad Bunny Tití", {"id": "vvvvvvvvvvv", "title": "Tití Me Preguntó", "duration": 243})
+        await first.flush()
+        second = SearchCache(store=store)
+        return await second.get("bad bunny titi"), second
+
+    video, second = asyncio.run(scenario())
+    assert video["id"] == "vvvvvvvvvvv" and second.disk_hits == 1
+
+def test_hit_skips_search(monkeypatch):
+    calls = []
+
+    async def fake_extract(search):
+        calls.append(search)
+        return {"entries": [{"id": "xxxxxxxxxxx", "title": "T", "url": "https://www.youtube.com/watch?v=xxxxxxxxxxx"}]}
+
+    monkeypatch.setattr(ytdlp_client, "_extract_info", fake_extract)
+    monkeypatch.setattr(ytdlp_client, "search_cache", SearchCache())
+
+    async def scenario():
+        first = await ytdlp_client.extract_info("ytsearch:Mi Canción")
+        second = await ytdlp_client.extract_info("ytsearch:mi cancion (official video)")
+        return first, second
+
+    first, second = asyncio.run(scenario())
+    assert calls == ["ytsearch:Mi Canción"]
+    assert second["id"] == first["id"] == "xxxxxxxxxxx"
+    assert second["url"] == "https://www.youtube.com/watch?v=xxxxxxxxxxx"
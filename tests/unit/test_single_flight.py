@@ -0,0 +1,59 @@
+import asyncio
+import pytest
+from infrastructure.ytdlp.single_flight import SingleFlight, flight_key
+
+def test_flight_key_normalizes():
+    assert flight_key("https://youtu.be/dQw4w9WgXcQ") == flight_key("https://www.youtube.com/watch?v=dQw4w9WgXcQ")
+    assert flight_key("ytsearch:Never  Gonna") == flight_key("ytsearch:never gonna")
+    assert flight_key("https://www.youtube.com/watch?v=dQw4w9WgXcQ&list=RDx") != flight_key("https://youtu.be/dQw4w9WgXcQ")
+
+def test_concurrent_callers_share_one_call():
+    flight = SingleFlight()
+    calls = []
+
+    async def work():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {"ok": True}
+
+    async def scenario():
+        return await asyncio.gather(*(flight.do("k", work) for _ in range(5)))
+
+    results = asyncio.run(scenario())
+    assert len(calls) == 1 and flight.shared == 4
+    assert all(r is results[0] for r in results)
+    assert len(flight) == 0
+
+def test_errors_propagate_and_are_not_kept():
+    flight = SingleFlight()
+    attempts = []
+
+    async def failing():
+        attempts.append(1)
+        await asyncio.sleep(0)
+        raise RuntimeError("403")
+
+    async def scenario():
+        results = await asyncio.gather(flight.do("k", failing), flight.do("k", failing), return_exceptions=True)
+        assert all(isinstance(r, RuntimeError) for r in results)
+        with pytest.raises(RuntimeError):
+            await flight.do("k", failing)
+
+    asyncio.run(scenario())
+    assert len(attempts) == 2
+
+def test_cancelled_caller_does_not_cancel_others():
+    flight = SingleFlight()
+
+    async def slow():
+        await asyncio.sleep(0.02)
+        return 7
+
+    async def scenario():
+        first = asyncio.ensure_future(flight.do("k", slow))
+        second = asyncio.ensure_future(flight.do("k", slow))
+        await asyncio.sleep(0)
+        first.cancel()
+        return await second
+
+    assert asyncio.run(scenario()) == 7
@@ -0,0 +1,73 @@
+import asyncio
+from domain.entities.song import Song
+from domain.repositories.queue_repository import MusicQueue
+from infrastructure.executors import BoundedExecutor
+from infrastructure.persistence.snapshot_store import SnapshotStore
+import infrastructure.ia.groq_client as groq
+import integration.snapshots as snapshots
+from integration.queue_shim import music_queues
+
+
+class FakeVoice:
+    def __init__(self, position):
+        self.source = type("Src", (), {"position": position})()
+    def is_playing(self): return True
+    def is_paused(self): return False
+
+class FakeBot:
+    def __init__(self, current=None, position=0.0):
+        self._current_song = current or {}
+        self._guilds = {gid: type("G", (), {"voice_client": FakeVoice(position)})() for gid in self._current_song}
+    def get_guild(self, gid): return self._guilds.get(gid)
+
+
+def _use_store(monkeypatch, tmp_path):
+    store = SnapshotStore(str(tmp_path / "state.db"), executor=BoundedExecutor("snap-test", 1))
+    monkeypatch.setattr(snapshots, "snapshot_store", store)
+    monkeypatch.setattr(groq, "snapshot_store", store)
+    for mod_state in (snapshots._written, snapshots._resume, snapshots._persisted_histories,
+                      music_queues, groq.conversation_history, groq.restored_histories):
+        mod_state.clear()
+    return store
+
+def test_flush_is_coalesced_and_restores_with_resume(monkeypatch, tmp_path):
+    store = _use_store(monkeypatch, tmp_path)
+    playing = Song("u0", "t0", "r", 1, video_id="v0")
+    queue = MusicQueue()
+    queue.enqueue_many(Song(f"u{i}", f"t{i}", "r", 1) for i in range(1, 4))
+    music_queues[7] = queue
+    bot = FakeBot({7: playing}, position=42.5)
+
+    asyncio.run(snapshots.flush(bot))
+    asyncio.run(snapshots.flush(bot))
+    assert store.writes == 1
+
+    music_queues.clear()
+    snapshots._written.clear()
+    restored = asyncio.run(snapshots.restore_queue(7, 500))
+    assert restored.list_titles() == ["t0", "t1", "t2", "t3"]
+    head = restored.peek()
+    assert head.video_id == "v0"
+    # sin cambios tras restaurar no hay que volver a escribir
+    music_queues[7] = restored
+    asyncio.run(snapshots.flush(FakeBot()))
+    assert store.writes == 1
+    assert snapshots.take_resume_offset(7, head) == 42.5
+    assert snapshots.take_resume_offset(7, head) == 0.0
+
+def test_history_roundtrip_and_clear(monkeypatch, tmp_path):
+    store = _use_store(monkeypatch, tmp_path)
+    groq._history_checked.clear()
+    groq.add_to_history("chan_1", "user", "hola")
+    groq.add_to_history("chan_1", "assistant", "qué tal")
+    groq.add_to_history("temp_resumen_1", "user", "no se guarda")
+    asyncio.run(snapshots.flush(FakeBot()))
+
+    groq.conversation_history.clear()
+    asyncio.run(groq.load_history("chan_1"))
+    assert [m["content"] for m in groq.conversation_history["chan_1"].as_messages()] == ["hola", "qué tal"]
+    assert asyncio.run(store.load_history("temp_resumen_1")) is None
+
+    del groq.conversation_history["chan_1"]
+    asyncio.run(snapshots.flush(FakeBot()))
+    assert asyncio.run(store.load_history("chan_1")) is None
@@ -0,0 +1,23 @@
+import pytest
+from domain.entities.song import Song
+
+def test_song_is_slotted():
+    song = Song("u", "t", "r", 1)
+    assert not hasattr(song, "__dict__")
+    with pytest.raises(AttributeError):
+        song.channel = object()
+
+def test_from_info_fills_optional_fields():
+    entry = {"url": "https://www.youtube.com/watch?v=abc123def45", "title": "T", "id": "abc123def45", "ie_key": "Youtube", "duration": 215.0}
+    song = Song.from_info(entry, "r", 42)
+    assert (song.url, song.channel_id, song.video_id, song.duration) == (entry["url"], 42, "abc123def45", 215)
+    assert song.thumbnail is None
+
+def test_fill_from_keeps_existing_values():
+    song = Song("u", "t", "r", 1, video_id="known", duration=10)
+    song.fill_from({"id": "other", "extractor": "youtube", "duration": 99, "thumbnail": "https://i/x.jpg"})
+    assert (song.video_id, song.duration, song.thumbnail) == ("known", 10, "https://i/x.jpg")
+
+def test_non_youtube_ids_are_not_video_ids():
+    song = Song.from_info({"url": "https://soundcloud.com/a/b", "id": "123", "extractor": "soundcloud"}, "r", 1)
+    assert song.video_id is None
@@ -0,0 +1,43 @@
+from infrastructure.startup import StartupTimer
+from tests.bench import startup_report
+
+IMPORTTIME = """\
+import time: self [us] | cumulative | imported package
+import time:       100 |        100 |   _io
+import time:      2000 |       5000 | discord
+import time:      3000 |       3000 |   discord.voice_client
+import time:       500 |        500 | infrastructure.discord.bot_client
+"""
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 10.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_phases_are_measured_from_previous_mark_and_only_once():
+    clock = FakeClock()
+    timer = StartupTimer(clock)
+    clock.now = 10.5
+    assert timer.mark("imports")
+    clock.now = 12.0
+    assert timer.mark("ready")
+    clock.now = 30.0
+    assert not timer.mark("ready")  # reconexión: no cuenta
+    assert timer.phases() == {"imports": 0.5, "ready": 1.5}
+    report = timer.report()
+    assert report["total"] == 2.0 and set(report["loaded_at_ready"]) == {"yt_dlp", "gtts", "numpy"}
+
+def test_importtime_breakdown_by_package():
+    report = startup_report.summarize(startup_report.parse_importtime(IMPORTTIME))
+    assert report["packages_ms"] == {"discord": 5.0, "infrastructure": 0.5, "_io": 0.1}
+    assert report["total_ms"] == 5.6 and report["deferred_loaded"] == []
+    assert startup_report.check({**report, "deferred_loaded": ["yt_dlp"]}, 0)
+    assert startup_report.check(report, budget_ms=1.0)
+
+def test_creating_the_bot_does_not_load_deferred_dependencies():
+    report = startup_report.measure()
+    assert report["deferred_loaded"] == []
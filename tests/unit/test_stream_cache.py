@@ -0,0 +1,70 @@
+import time
+from infrastructure.ytdlp.stream_cache import (
+    StreamCache, extract_video_id, stream_expiry, audio_formats, select_audio_format, pick_stream, compact_info,
+)
+
+def _info(vid, expire):
+    return {"id": vid, "url": f"https://rr1.googlevideo.com/videoplayback?expire={int(expire)}&id=x", "http_headers": {}}
+
+def test_extract_video_id():
+    assert extract_video_id("https://www.youtube.com/watch?v=dQw4w9WgXcQ") == "dQw4w9WgXcQ"
+    assert extract_video_id("https://youtu.be/dQw4w9WgXcQ?t=3") == "dQw4w9WgXcQ"
+    assert extract_video_id("https://www.youtube.com/watch?list=RD1&v=dQw4w9WgXcQ") == "dQw4w9WgXcQ"
+    assert extract_video_id("ytsearch:never gonna") is None
+
+def test_stream_expiry_query_and_path():
+    assert stream_expiry("https://x.googlevideo.com/videoplayback?expire=1700000000&a=b") == 1700000000
+    assert stream_expiry("https://manifest.googlevideo.com/api/manifest/hls/expire/1700000000/ei/x") == 1700000000
+    assert stream_expiry("https://example.com/audio.mp3") is None
+
+def test_entries_expire_with_stream_url():
+    cache = StreamCache(maxsize=4, margin=60)
+    assert cache.put(_info("aaaaaaaaaaa", time.time() + 3600))
+    assert cache.get("aaaaaaaaaaa")["id"] == "aaaaaaaaaaa"
+    # dentro del margen de seguridad ya no se guarda ni se sirve
+    assert not cache.put(_info("bbbbbbbbbbb", time.time() + 30))
+    assert cache.get("bbbbbbbbbbb") is None
+    # sin expire= no hay forma de saber cuándo caduca
+    assert not cache.put({"id": "ccccccccccc", "url": "https://example.com/a.mp3"})
+
+def test_lru_bound_and_aliases():
+    cache = StreamCache(maxsize=2, margin=0)
+    exp = time.time() + 3600
+    cache.put(_info("v1xxxxxxxxx", exp))
+    cache.put(_info("v2xxxxxxxxx", exp))
+    cache.get("v1xxxxxxxxx")
+    cache.put(_info("v3xxxxxxxxx", exp))
+    assert cache.get("v2xxxxxxxxx") is None
+    assert cache.get("v1xxxxxxxxx") is not None
+    cache.put(_info("v4xxxxxxxxx", exp), "alias")
+    assert cache.get("alias")["id"] == "v4xxxxxxxxx"
+    assert len(cache) == 2
+
+YT_FORMATS = [
+    {"format_id": "18", "url": "v18", "acodec": "mp4a.40.2", "vcodec": "avc1", "abr": 96, "protocol": "https"},
+    {"format_id": "139", "url": "a139", "acodec": "mp4a.40.5", "vcodec": "none", "abr": 48, "protocol": "https"},
+    {"format_id": "140", "url": "a140", "acodec": "mp4a.40.2", "vcodec": "none", "abr": 129, "protocol": "https"},
+    {"format_id": "249", "url": "a249", "acodec": "opus", "vcodec": "none", "abr": 50, "protocol": "https"},
+    {"format_id": "250", "url": "a250", "acodec": "opus", "vcodec": "none", "abr": 70, "protocol": "https"},
+    {"format_id": "251", "url": "a251", "acodec": "opus", "vcodec": "none", "abr": 135, "protocol": "https"},
+    {"format_id": "233", "url": "hls", "acodec": "opus", "vcodec": "none", "abr": 64, "protocol": "m3u8_native"},
+]
+
+def test_audio_formats_keeps_opus_and_best_fallback():
+    urls = [f["url"] for f in audio_formats({"formats": YT_FORMATS})]
+    assert urls == ["a249", "a250", "a251", "a140"]
+
+def test_select_prefers_opus_closest_to_channel_bitrate():
+    formats = audio_formats({"formats": YT_FORMATS})
+    assert select_audio_format(formats, 64)["url"] == "a250"
+    assert select_audio_format(formats, 128)["url"] == "a251"
+    assert select_audio_format(formats, 384)["url"] == "a251"
+    assert select_audio_format([f for f in formats if f["acodec"] != "opus"], 64)["url"] == "a140"
+    assert select_audio_format([], 64) is None
+
+def test_pick_stream_never_trades_opus_for_transcoding():
+    resolved = compact_info({"url": "a251", "acodec": "opus", "formats": YT_FORMATS}, "a251")
+    assert pick_stream(resolved, 64)["url"] == "a250"
+    assert pick_stream(resolved, 160) is resolved
+    only_aac = {**resolved, "audio_formats": [{"url": "a140", "acodec": "mp4a.40.2", "abr": 129}]}
+    assert pick_stream(only_aac, 64) is only_aac
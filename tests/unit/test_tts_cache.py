@@ -0,0 +1,16 @@
+from infrastructure.tts.tts_cache import TTSCache, tts_cache_key
+
+def test_key_normalizes_text_but_not_language():
+    assert tts_cache_key("Hola   Mundo ", "es") == tts_cache_key("hola mundo", "es")
+    assert tts_cache_key("hola mundo", "es") != tts_cache_key("hola mundo", "en")
+
+def test_evicts_by_bytes_in_lru_order():
+    cache = TTSCache(max_bytes=10)
+    cache.put("a", b"1234")
+    cache.put("b", b"1234")
+    assert cache.get("a") == b"1234"
+    cache.put("c", b"1234")
+    assert cache.get("b") is None
+    assert cache.get("a") is not None and cache.get("c") is not None
+    assert cache.size == 8
+    assert cache.put("big", b"x" * 11) is False